@@ -0,0 +1,42 @@
+"""
+Throughput benchmark for collocation extraction.
+
+Compares the FreqDist-based ``nlp.statistics.collocations`` with the
+vectorized ``nlp.statistics.association.collocations``.
+
+    python -m benchmarks.collocations [n_tokens]
+"""
+import random
+import sys
+import time
+
+from nlp.statistics import association, collocations
+
+WORDS = (
+    u'el la de que y en un ser se no haber por con su para como estar '
+    u'tener le lo todo pero m\xe1s hacer o poder decir este ir otro ese '
+    u'Nueva York Buenos Aires Estados Unidos Naciones Unidas'
+).split()
+
+
+def tokens(n_tokens, seed=0):
+    rnd = random.Random(seed)
+    return [rnd.choice(WORDS) for _ in xrange(n_tokens)]
+
+
+def main(n_tokens=1000000):
+    sample = tokens(n_tokens)
+    for name, function in (
+            ('FreqDist', lambda: collocations(sample)),
+            ('numpy count', lambda: association.collocations(sample)),
+            ('numpy llr', lambda: association.collocations(
+                sample, measure='likelihood_ratio', top=100))):
+        start = time.time()
+        function()
+        elapsed = time.time() - start
+        print '%-12s %8.2f s %12.0f tokens/s' % (
+            name, elapsed, n_tokens / elapsed)
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
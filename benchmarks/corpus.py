@@ -0,0 +1,67 @@
+"""
+Deterministic synthetic Spanish corpora and HTML pages for benchmarks.
+
+Every generator takes a ``seed``, so the same sizes always produce the
+same input and timings are comparable between runs and machines.
+"""
+import random
+
+WORDS = (
+    u'el la de que y en un ser se no haber por con su para como estar '
+    u'tener le lo todo pero m\xe1s hacer o poder decir este ir otro ese '
+    u'Garc\xeda Madrid EE.UU. 2.113 24% , ; \xbfqu\xe9 Sr. L\xf3pez'
+).split()
+
+
+def sentence(rnd, n_words):
+    words = [rnd.choice(WORDS) for _ in xrange(n_words)]
+    words[0] = words[0].capitalize()
+    return u' '.join(words) + rnd.choice(u'.?!')
+
+
+def documents(n_documents, seed=0):
+    """
+    Generate documents of 5 to 30 sentences.
+    """
+    rnd = random.Random(seed)
+    for _ in xrange(n_documents):
+        yield u' '.join(sentence(rnd, rnd.randint(3, 25))
+                        for _ in xrange(rnd.randint(5, 30)))
+
+
+def text(n_words, seed=0):
+    """
+    Return a text of about ``n_words`` words in sentences and paragraphs.
+    """
+    rnd = random.Random(seed)
+    sentences, words = [], 0
+    while words < n_words:
+        n = min(rnd.randint(3, 25), n_words - words)
+        sentences.append(sentence(rnd, n))
+        if rnd.random() < 0.1:
+            sentences.append(u'\n')
+        words += n
+    return u' '.join(sentences)
+
+
+def paragraph(rnd, n_words):
+    words = [rnd.choice(WORDS) for _ in xrange(n_words)]
+    for i in xrange(0, n_words, 12):
+        words[i] = u'<a href="/%d">%s</a>' % (i, words[i])
+    return u' '.join(words)
+
+
+def pages(n_pages, seed=0):
+    """
+    Generate HTML pages with a head, a script and 5 to 20 content blocks.
+    """
+    rnd = random.Random(seed)
+    for _ in xrange(n_pages):
+        body = []
+        for _ in xrange(rnd.randint(5, 20)):
+            body.append(u'<div class="c"><p>%s.</p><ul><li>%s</li></ul>'
+                        u'</div>' % (paragraph(rnd, rnd.randint(20, 80)),
+                                     paragraph(rnd, 5)))
+        yield (u'<html><head><title>%s</title><script>var x = 1;</script>'
+               u'</head><body><h1>%s</h1>%s</body></html>' % (
+                   paragraph(rnd, 4), paragraph(rnd, 4), u''.join(body)))
@@ -0,0 +1,33 @@
+"""
+Pages per second of html.sanitize with html5lib and with lxml's parser.
+
+    python -m benchmarks.html [n_pages]
+"""
+import sys
+import time
+
+from benchmarks.corpus import pages
+from nlp import html
+
+REPEAT = 3
+
+
+def best(function):
+    timings = []
+    for _ in range(REPEAT):
+        start = time.time()
+        function()
+        timings.append(time.time() - start)
+    return min(timings)
+
+
+def main(n_pages=50):
+    sample = list(pages(n_pages))
+    for name, streaming in (('html5lib', False), ('lxml streaming', True)):
+        elapsed = best(lambda: [html.sanitize(p, streaming=streaming)
+                                for p in sample])
+        print '%-16s %8.1f pages/s' % (name, n_pages / elapsed)
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
@@ -0,0 +1,73 @@
+"""
+Load-time and memory benchmark for token classifier model formats.
+
+Trains a classifier with many synthetic classes, saves it as a pickle
+and in the binary format, then loads each in a fresh process and reports
+load time, resident memory and classify lookups per second.
+
+    python -m benchmarks.models [n_classes]
+"""
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+
+from nlp.statistics.tokens import Token, TokenClassifier
+
+CHILD = """
+import sys, time
+
+def rss():
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith('VmRSS:'):
+                return int(line.split()[1])
+
+start = time.time()
+from nlp.statistics.tokens import Token, TokenClassifier
+classifier = TokenClassifier(sys.argv[1])
+loaded = time.time() - start
+tokens = [Token(w) for w in sys.argv[2].decode('utf-8').split()]
+start = time.time()
+for t in tokens:
+    classifier.classify(t)
+lookups = len(tokens) / (time.time() - start)
+print loaded, rss(), lookups
+"""
+
+
+def words(n_classes, seed=0):
+    rnd = random.Random(seed)
+    letters = u'abcdefghijklmnopqrstuvwxyz\xe1\xe9\xed\xf3\xfa\xf1'
+    for _ in xrange(n_classes):
+        word = u''.join(rnd.choice(letters)
+                        for _ in xrange(rnd.randint(2, 12)))
+        yield word.capitalize() if rnd.random() < 0.2 else word
+
+
+def main(n_classes=200000):
+    vocabulary = list(words(n_classes))
+    classifier = TokenClassifier()
+    classifier.train([Token(w) for w in vocabulary * 2])
+    sample = u' '.join(random.Random(1).sample(vocabulary, 10000))
+
+    path = tempfile.mkdtemp()
+    try:
+        for name, binary in (('pickle', False), ('binary', True)):
+            file_name = os.path.join(path, name)
+            classifier.save(file_name, binary=binary)
+            output = subprocess.check_output(
+                [sys.executable, '-c', CHILD, file_name,
+                 sample.encode('utf-8')])
+            loaded, rss, lookups = map(float, output.split())
+            print '%-7s %8.1f MB  load %8.1f ms  RSS %8.1f MB  %9.0f lookups/s' % (
+                name, os.path.getsize(file_name) / 1e6, loaded * 1000,
+                rss / 1024, lookups)
+    finally:
+        shutil.rmtree(path)
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
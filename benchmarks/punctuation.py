@@ -0,0 +1,66 @@
+"""
+Import-time benchmark for the punctuation tables.
+
+Compares importing ``nlp.punctuation`` (built from the precomputed range
+table) with the legacy approach of scanning every BMP code point through
+``unicodedata`` and compiling one alternation per character.
+
+    python -m benchmarks.punctuation
+"""
+import re
+import subprocess
+import sys
+import timeit
+
+from nlp import punctuation
+from nlp.punctuation_table import scan
+
+REPEAT = 5
+
+
+def legacy_pattern():
+    ranges = scan()
+    characters = [
+        unichr(x) for start, end in ranges for x in range(start, end + 1)
+    ] + punctuation.NON_UNICODE_PUNCTUATION
+    return r'%s|%s' % (
+        punctuation.ELLIPSES_PATTERN,
+        u'|'.join([re.escape(p) for p in characters])
+    )
+
+
+def table_pattern():
+    return r'%s|%s' % (
+        punctuation.ELLIPSES_PATTERN,
+        punctuation.character_class(punctuation.PUNCTUATION_RANGES,
+                                    punctuation.NON_UNICODE_PUNCTUATION)
+    )
+
+
+def best(function, number=1):
+    return min(timeit.repeat(function, number=number, repeat=REPEAT)) / number
+
+
+def main():
+    command = [sys.executable, '-c', 'import nlp.punctuation']
+    baseline = [sys.executable, '-c', 'pass']
+    interpreter = best(lambda: subprocess.call(baseline))
+    imported = best(lambda: subprocess.call(command))
+    print 'import nlp.punctuation:  %8.2f ms' % ((imported - interpreter) * 1000)
+
+    legacy = best(lambda: re.compile(legacy_pattern(), re.U | re.I | re.X))
+    table = best(lambda: re.compile(table_pattern(), re.U | re.I | re.X))
+    print 'legacy scan + compile:   %8.2f ms' % (legacy * 1000)
+    print 'table + compile:         %8.2f ms' % (table * 1000)
+
+    text = u'Hola, mundo... \xbfQu\xe9 tal? (s\xed) - \xa1bien! ' * 1000
+    legacy_re = re.compile(legacy_pattern(), re.U | re.I | re.X)
+    table_re = re.compile(table_pattern(), re.U | re.I | re.X)
+    print 'legacy findall:          %8.2f ms' % (
+        best(lambda: legacy_re.findall(text), 10) * 1000)
+    print 'table findall:           %8.2f ms' % (
+        best(lambda: table_re.findall(text), 10) * 1000)
+
+
+if __name__ == '__main__':
+    main()
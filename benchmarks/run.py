@@ -0,0 +1,234 @@
+"""
+Benchmark suite for the tokenizer, segmenter, statistics and HTML hot paths.
+
+Each case runs at several input sizes on deterministic synthetic input
+from ``benchmarks.corpus``. Throughput (units per second of the best
+run), latency (median seconds per run) and peak memory growth are written
+as JSON, and can be compared against a saved baseline:
+
+    python -m benchmarks.run --output baseline.json
+    python -m benchmarks.run --baseline baseline.json --threshold 0.1
+
+The comparison exits with status 1 if the throughput of any case dropped
+by more than the threshold. Cases whose dependencies are missing are
+skipped.
+"""
+from __future__ import division
+
+import argparse
+import gc
+import json
+import platform
+import sys
+import time
+
+from benchmarks import corpus
+
+SIZES = (1000, 10000, 100000)
+REPEAT = 5
+THRESHOLD = 0.1
+
+
+def _rss(field):
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith(field):
+                    return int(line.split()[1]) * 1024
+    except IOError:
+        return None
+
+
+def _reset_peak():
+    # Writing 5 to clear_refs resets the peak RSS to the current RSS
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+    except IOError:
+        pass
+
+
+def _tokens(n_words):
+    from nlp.tokenizers import es
+    return es.tokenize(corpus.text(n_words))
+
+
+def _classifier(tokens):
+    from nlp.statistics.tokens import TokenClassifier
+    classifier = TokenClassifier()
+    classifier.train(tokens)
+    return classifier
+
+
+def case_tokenize(n):
+    from nlp.tokenizers import es
+    text = corpus.text(n)
+    return lambda: es.tokenize(text), len(es.tokenize(text)), 'tokens'
+
+
+def case_segment(n):
+    from nlp.tokenizers import es
+    tokens = _tokens(n)
+    classifier = _classifier(tokens)
+    return (lambda: es.segment(tokens, classifier=classifier),
+            len(tokens), 'tokens')
+
+
+def case_train(n):
+    tokens = _tokens(n)
+    return lambda: _classifier(tokens), len(tokens), 'tokens'
+
+
+def case_classify(n):
+    tokens = _tokens(n)
+    classifier = _classifier(tokens)
+
+    def run():
+        for t in tokens:
+            classifier.classify(t)
+    return run, len(tokens), 'tokens'
+
+
+def case_ngrams(n):
+    from nlp.statistics import ngrams
+    tokens = [t.type for t in _tokens(n)]
+    return lambda: list(ngrams(tokens, 3)), len(tokens), 'tokens'
+
+
+def case_collocations(n):
+    from nlp.statistics import collocations
+    tokens = [t.type for t in _tokens(n)]
+    return lambda: collocations(tokens), len(tokens), 'tokens'
+
+
+def case_sanitize(n):
+    from nlp import html
+    pages = list(corpus.pages(max(1, n // 1000)))
+    return (lambda: [html.sanitize(p) for p in pages],
+            len(pages), 'pages')
+
+
+def case_is_word(n):
+    from nlp.word import is_word
+    tokens = [t.type for t in _tokens(n)]
+    return (lambda: [is_word(t, 'es') for t in tokens],
+            len(tokens), 'tokens')
+
+
+def case_filter_words(n):
+    from nlp.word import WordFilter
+    tokens = [t.type for t in _tokens(n)]
+    # A fresh filter per run, so the cost of filling the cache is included
+    return (lambda: WordFilter('es').filter(tokens),
+            len(tokens), 'tokens')
+
+
+CASES = (
+    ('tokenize', case_tokenize),
+    ('segment', case_segment),
+    ('train', case_train),
+    ('classify', case_classify),
+    ('ngrams', case_ngrams),
+    ('collocations', case_collocations),
+    ('html.sanitize', case_sanitize),
+    ('word.is_word', case_is_word),
+    ('word.filter_words', case_filter_words),
+)
+
+
+def measure(setup, size, repeat=REPEAT):
+    """
+    Run a case at one size and return its measurements.
+    """
+    run, units, unit = setup(size)
+    gc.collect()
+    _reset_peak()
+    baseline = _rss('VmRSS:')
+    timings = []
+    for _ in xrange(repeat):
+        start = time.time()
+        run()
+        timings.append(time.time() - start)
+    peak = _rss('VmHWM:')
+
+    timings.sort()
+    return {
+        'size': size,
+        'units': units,
+        'unit': unit,
+        'best': timings[0],
+        'latency': timings[len(timings) // 2],
+        'throughput': units / timings[0] if timings[0] else None,
+        'peak_memory': peak - baseline if peak and baseline else None,
+    }
+
+
+def run(cases=None, sizes=SIZES, repeat=REPEAT, out=sys.stdout):
+    results = {}
+    for name, setup in CASES:
+        if cases and name not in cases:
+            continue
+        for size in sizes:
+            key = '%s/%d' % (name, size)
+            try:
+                result = measure(setup, size, repeat)
+            except ImportError as e:
+                print >> out, '%-24s skipped (%s)' % (key, e)
+                break
+            results[key] = result
+            print >> out, '%-24s %12.0f %s/s %10.2f ms %8.1f MB' % (
+                key, result['throughput'], result['unit'],
+                result['latency'] * 1000, (result['peak_memory'] or 0) / 1e6)
+    return results
+
+
+def compare(results, baseline, threshold=THRESHOLD, out=sys.stdout):
+    """
+    Print the throughput change of every case in both runs and return the
+    keys that slowed down by more than ``threshold``.
+    """
+    regressions = []
+    for key in sorted(results):
+        if key not in baseline:
+            continue
+        ratio = results[key]['throughput'] / baseline[key]['throughput']
+        regressed = ratio < 1 - threshold
+        if regressed:
+            regressions.append(key)
+        print >> out, '%-24s %+7.1f%%%s' % (
+            key, (ratio - 1) * 100, '  REGRESSION' if regressed else '')
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--cases', nargs='*', help='cases to run')
+    parser.add_argument('--sizes', nargs='*', type=int, default=SIZES)
+    parser.add_argument('--repeat', type=int, default=REPEAT)
+    parser.add_argument('--output', help='write results to this JSON file')
+    parser.add_argument('--baseline', help='compare with this JSON file')
+    parser.add_argument('--threshold', type=float, default=THRESHOLD,
+                        help='tolerated throughput loss (default 0.1)')
+    args = parser.parse_args(argv)
+
+    results = run(args.cases, args.sizes, args.repeat)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({
+                'python': platform.python_version(),
+                'platform': platform.platform(),
+                'date': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                'results': results,
+            }, f, indent=2, sort_keys=True)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)['results']
+        print
+        if compare(results, baseline, args.threshold):
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
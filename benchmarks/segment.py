@@ -0,0 +1,37 @@
+"""
+Per-token cost of es.segment with a trained and a compiled classifier.
+
+    python -m benchmarks.segment [n_documents]
+"""
+import sys
+import time
+
+from benchmarks.corpus import documents
+from nlp.statistics.tokens import TokenClassifier
+from nlp.tokenizers import es
+
+REPEAT = 3
+
+
+def best(function):
+    timings = []
+    for _ in range(REPEAT):
+        start = time.time()
+        function()
+        timings.append(time.time() - start)
+    return min(timings)
+
+
+def main(n_documents=500):
+    tokens = es.tokenize(u'\n'.join(documents(n_documents)))
+    classifier = TokenClassifier()
+    classifier.train(tokens)
+    compiled = classifier.compile()
+
+    for name, c in (('TokenClassifier', classifier), ('compiled', compiled)):
+        elapsed = best(lambda: es.segment(tokens, classifier=c))
+        print '%-16s %8.2f us/token' % (name, elapsed / len(tokens) * 1e6)
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
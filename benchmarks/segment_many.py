@@ -0,0 +1,34 @@
+"""
+Throughput benchmark for es.segment_many.
+
+Segments a synthetic corpus with 1 to N worker processes and reports
+documents per second.
+
+    python -m benchmarks.segment_many [n_documents] [max_workers]
+"""
+import multiprocessing
+import sys
+import time
+
+from benchmarks.corpus import documents
+from nlp.statistics.tokens import TokenClassifier
+from nlp.tokenizers import es
+
+
+def main(n_documents=2000, max_workers=multiprocessing.cpu_count()):
+    texts = list(documents(n_documents))
+    classifier = TokenClassifier()
+    classifier.train(es.tokenize(u'\n'.join(texts[:200])))
+
+    for workers in range(1, max_workers + 1):
+        start = time.time()
+        for _ in es.segment_many(texts, workers=workers, chunksize=32,
+                                 classifier=classifier):
+            pass
+        elapsed = time.time() - start
+        print '%2d workers: %8.1f documents/s' % (
+            workers, n_documents / elapsed)
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
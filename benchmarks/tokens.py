@@ -0,0 +1,76 @@
+"""
+Memory benchmark for token storage.
+
+Compares a list of dict-backed token objects (the previous ``Token``
+layout), a list of slotted ``Token`` objects and a ``TokenArray``.
+
+    python -m benchmarks.tokens [n_words]
+"""
+import random
+import sys
+
+from nlp.statistics.tokens import Token, TokenArray
+from nlp.tokenizers import es
+
+WORDS = (
+    u'el la de que y en un ser se no haber por con su para como estar '
+    u'tener le lo todo pero m\xe1s hacer o poder decir este ir otro ese '
+    u'Sr. Garc\xeda EE.UU. 2.113 24% . , ; ... \xbfqu\xe9 ? \xa1s\xed !'
+).split()
+
+
+class DictToken(object):
+    def __init__(self, type, start=None, end=None):
+        self.type = type
+        self.start = start
+        self.end = end
+
+
+def text(n_words, seed=0):
+    rnd = random.Random(seed)
+    return u' '.join(rnd.choice(WORDS) for _ in xrange(n_words))
+
+
+def deep_size(obj, seen=None):
+    """
+    Approximate the memory held by ``obj`` and everything it references.
+    """
+    seen = set() if seen is None else seen
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(deep_size(k, seen) + deep_size(v, seen)
+                    for k, v in obj.iteritems())
+    elif isinstance(obj, (list, tuple)):
+        size += sum(deep_size(i, seen) for i in obj)
+    elif isinstance(obj, (DictToken, Token)):
+        size += sum(deep_size(getattr(obj, a), seen)
+                    for a in ('type', 'start', 'end'))
+        if hasattr(obj, '__dict__'):
+            size += sys.getsizeof(obj.__dict__)
+    elif isinstance(obj, TokenArray):
+        size += sum(deep_size(c, seen) for c in
+                    (obj.types, obj.type_ids, obj.ids, obj.starts, obj.ends))
+    return size
+
+
+def main(n_words=200000):
+    sample = text(n_words)
+    tokens = es.tokenize(sample)
+    candidates = (
+        ('list of dict tokens', [DictToken(t.type, t.start, t.end)
+                                 for t in tokens]),
+        ('list of Token', tokens),
+        ('TokenArray', es.tokenize(sample, as_array=True)),
+    )
+    print '%d tokens' % len(tokens)
+    for name, value in candidates:
+        size = deep_size(value)
+        print '%-20s %10.1f MB %8.1f bytes/token' % (
+            name, size / 1e6, size / float(len(tokens)))
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:]))
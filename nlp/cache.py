@@ -0,0 +1,51 @@
+"""
+A bounded least-recently-used cache.
+"""
+from collections import OrderedDict
+
+
+class LRUCache(object):
+    """
+    A dict-like cache that keeps at most ``capacity`` entries.
+
+    The least recently used entry is evicted when the cache is full. Hits,
+    misses and evictions are counted so callers can size the cache.
+    """
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, key):
+        return key in self.entries
+
+    def __getitem__(self, key):
+        try:
+            value = self.entries.pop(key)
+        except KeyError:
+            self.misses += 1
+            raise
+        self.entries[key] = value
+        self.hits += 1
+        return value
+
+    def __setitem__(self, key, value):
+        self.entries.pop(key, None)
+        self.entries[key] = value
+        if len(self.entries) > self.capacity:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def clear(self):
+        self.entries.clear()
@@ -0,0 +1,254 @@
+"""
+A local corpus format read through ``mmap``.
+
+A corpus is a directory of three files:
+
+    text             the documents, UTF-8 encoded and concatenated
+    index            header (magic, version, number of documents) followed
+                     by (documents + 1) offsets into ``text`` and as many
+                     offsets into ``metadata``, all little-endian unsigned
+                     64-bit integers
+    metadata.jsonl   one JSON object per document (URL, date, etc.)
+
+``CorpusWriter`` builds a corpus one document at a time. ``Corpus`` maps
+the files, so opening one costs nothing whatever its size; documents are
+decoded one at a time as they are read or iterated, and slices and shards
+share the mapping. A corpus pickles as its path and range, so worker
+processes map the files themselves instead of receiving the texts.
+
+    python -m nlp.corpus <directory> <file>...
+"""
+import codecs
+import json
+import mmap
+import os
+import struct
+from functools import partial
+
+from nlp import parallel
+
+MAGIC = 'NLPCORP\x00'
+VERSION = 1
+
+HEADER = struct.Struct('<8sIQ')
+OFFSET = struct.Struct('<Q')
+
+TEXT_FILE = 'text'
+INDEX_FILE = 'index'
+METADATA_FILE = 'metadata.jsonl'
+
+
+def is_corpus(path):
+    return os.path.isfile(os.path.join(path, INDEX_FILE))
+
+
+class CorpusWriter(object):
+    """
+    Write documents and their metadata to a new corpus directory.
+
+    The index is written by ``close``, so a corpus is only readable once
+    its writer is closed (or left as a context manager).
+    """
+    def __init__(self, path):
+        self.path = path
+        if not os.path.isdir(path):
+            os.makedirs(path)
+        self.text = open(os.path.join(path, TEXT_FILE), 'wb')
+        self.metadata = open(os.path.join(path, METADATA_FILE), 'wb')
+        self.text_offsets = [0]
+        self.metadata_offsets = [0]
+
+    def __len__(self):
+        return len(self.text_offsets) - 1
+
+    def add(self, text, metadata=None):
+        """
+        Append a unicode document and return its index.
+        """
+        data = text.encode('utf-8')
+        record = json.dumps(metadata or {}, sort_keys=True) + '\n'
+        self.text.write(data)
+        self.metadata.write(record)
+        self.text_offsets.append(self.text_offsets[-1] + len(data))
+        self.metadata_offsets.append(self.metadata_offsets[-1] + len(record))
+        return len(self) - 1
+
+    def extend(self, texts):
+        for text in texts:
+            self.add(text)
+
+    def close(self):
+        if self.text.closed:
+            return
+        self.text.close()
+        self.metadata.close()
+        n = len(self)
+        with open(os.path.join(self.path, INDEX_FILE), 'wb') as f:
+            f.write(HEADER.pack(MAGIC, VERSION, n))
+            f.write(struct.pack('<%dQ' % (n + 1), *self.text_offsets))
+            f.write(struct.pack('<%dQ' % (n + 1), *self.metadata_offsets))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def _map_chunk(function, documents):
+    return [function(document) for document in documents]
+
+
+def _map(file_name):
+    with open(file_name, 'rb') as f:
+        if not os.fstat(f.fileno()).st_size:
+            return ''
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+class Corpus(object):
+    """
+    A read-only sequence of the documents of a corpus directory.
+
+    Indexing returns unicode documents and slicing returns a ``Corpus``
+    over a range of them that shares the mapped files. ``raw`` gives the
+    UTF-8 bytes of a document as a buffer into the mapping, without
+    copying them. Only the corpus that mapped the files closes them;
+    closing a slice or shard of it does nothing.
+    """
+    def __init__(self, path, start=0, stop=None):
+        self.path = path
+        self._open()
+        self.start, self.stop, _ = slice(start, stop).indices(self.size)
+
+    def _open(self):
+        self.owner = True
+        self.index = _map(os.path.join(self.path, INDEX_FILE))
+        magic, version, self.size = HEADER.unpack_from(self.index, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError('%s is not a version %d corpus' %
+                             (self.path, VERSION))
+        self.text = _map(os.path.join(self.path, TEXT_FILE))
+        self.metadata_map = _map(os.path.join(self.path, METADATA_FILE))
+
+    def _offsets(self, column, i):
+        position = HEADER.size + OFFSET.size * (column * (self.size + 1) + i)
+        return struct.unpack_from('<QQ', self.index, position)
+
+    def _document(self, i):
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError('document index out of range')
+        return self.start + i
+
+    def __len__(self):
+        return self.stop - self.start
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            start, stop, step = i.indices(len(self))
+            if step != 1:
+                raise ValueError('corpus slices must be contiguous')
+            return self._view(self.start + start, self.start + max(start, stop))
+        start, end = self._offsets(0, self._document(i))
+        return self.text[start:end].decode('utf-8')
+
+    def _view(self, start, stop):
+        view = object.__new__(Corpus)
+        view.__dict__.update(self.__dict__)
+        view.start, view.stop = start, stop
+        view.owner = False
+        return view
+
+    def raw(self, i):
+        """
+        Return the UTF-8 bytes of document ``i`` as a buffer.
+        """
+        start, end = self._offsets(0, self._document(i))
+        return buffer(self.text, start, end - start)
+
+    def metadata(self, i):
+        start, end = self._offsets(1, self._document(i))
+        return json.loads(self.metadata_map[start:end])
+
+    def __iter__(self):
+        decode = codecs.utf_8_decode
+        for i in xrange(len(self)):
+            yield decode(self.raw(i))[0]
+
+    def items(self):
+        """
+        Generate ``(document, metadata)`` pairs.
+        """
+        for i, document in enumerate(self):
+            yield document, self.metadata(i)
+
+    def shard(self, index, count):
+        """
+        Return the ``index``-th of ``count`` contiguous, near-equal shards.
+        """
+        if not 0 <= index < count:
+            raise IndexError('shard index out of range')
+        n = len(self)
+        return self[n * index // count:n * (index + 1) // count]
+
+    def chunks(self, size):
+        """
+        Generate consecutive slices of ``size`` documents.
+        """
+        for start in xrange(0, len(self), size):
+            yield self[start:start + size]
+
+    def imap(self, function, workers=1, chunksize=16, ordered=True,
+             initializer=None, initargs=()):
+        """
+        Map ``function`` over the documents like ``parallel.imap``.
+
+        Workers are sent slices of ``chunksize`` documents, which pickle as
+        the path and a range, and read the documents from their own
+        mapping of the files.
+        """
+        results = parallel.imap(partial(_map_chunk, function),
+                                self.chunks(chunksize), workers=workers,
+                                ordered=ordered, initializer=initializer,
+                                initargs=initargs)
+        if ordered:
+            for chunk in results:
+                for result in chunk:
+                    yield result
+        else:
+            for i, chunk in results:
+                for j, result in enumerate(chunk):
+                    yield i * chunksize + j, result
+
+    def close(self):
+        if not self.owner:
+            return
+        for m in (self.index, self.text, self.metadata_map):
+            if m:
+                m.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __getstate__(self):
+        return {'path': self.path, 'start': self.start, 'stop': self.stop}
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._open()
+
+
+if __name__ == '__main__':
+    import sys
+    from nlp.statistics.abbreviations import read_files
+
+    file_names = sys.argv[2:]
+    with CorpusWriter(sys.argv[1]) as writer:
+        for file_name, text in zip(file_names, read_files(file_names)):
+            writer.add(text, {'file_name': file_name})
+    print '%d documents' % len(writer)
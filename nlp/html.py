@@ -1,13 +1,32 @@
 import re
+import time
+from array import array
+from htmlentitydefs import name2codepoint
 
 import html5lib
+from html5lib.constants import spaceCharacters, voidElements
 from html5lib.tokenizer import HTMLTokenizer
 from html5lib.sanitizer import HTMLSanitizerMixin
 from html5lib.serializer.htmlserializer import HTMLSerializer
 from html5lib.treewalkers import lxmletree
+from lxml import etree
 from lxml.html import fromstring
 
+from nlp import parallel, punctuation
+from nlp.statistics.tokens import NEWLINE, Token
+
 WHITESPACE_RE = re.compile(r'^(&nbsp;|\s)*$', re.U)
+# A tag ends at the first > outside a quoted attribute value, or at the
+# first > at all if a quote is left open
+MARKUP_RE = re.compile(
+    r'<!--.*?(?:-->|$)|'
+    r'<(/?)([a-zA-Z][a-zA-Z0-9]*)(?:(?:[^>"\']|"[^"]*"|\'[^\']*\')*|[^>]*)>|'
+    r'<[!?][^>]*>', re.S)
+ENTITY_RE = re.compile(
+    r'&(?:#([0-9]{1,7})|#[xX]([0-9a-fA-F]{1,6})|([a-zA-Z][a-zA-Z0-9]*));?')
+NEWLINES = {ord(u'\n'): u' ', ord(u'\r'): u' '}
+SPACE_CHARACTERS = u''.join(spaceCharacters)
+CHUNK_SIZE = 64 * 1024
 
 namespace = u'http://www.w3.org/1999/xhtml'
 container_elements = ['div', 'span']
@@ -40,6 +59,7 @@ readable_blocks = (
     'ol', 'p', 'pre', 'ul',
     # 'table' # Tables are out for now
 )
+skipped_elements = ('script', 'style', 'title')
 text_types = ('Characters', 'SpaceCharacters')
 empty_types = ('StartTag', 'EndTag', 'SpaceCharacters', 'EmptyTag',)
 newlines = {'data': u'\n\n', 'type': 'Characters'}
@@ -79,6 +99,52 @@ class ReadableTokenizer(HTMLTokenizer, HTMLSanitizerMixin):
                 yield token
 
 
+def readable_tokens(tokens):
+    """
+    Filter tree walker tokens down to the readable blocks of a document.
+    """
+    inline_cache, block_cache, block_stack = [], [], []
+    for e in tokens:
+        # Push the next readable block start tag onto the stack
+        if e.get('name') in readable_blocks and e['type'] == 'StartTag':
+            # Push a new block to the stack if the stack is empty or
+            # if a block of the same type is nested in our current stack
+            if not block_stack or block_stack[-1] == e['name']:
+                block_stack.append(e['name'])
+                block_cache.append(e)
+            # If this is the start of a new top-level reading block,
+            # flush the inline cache as a new P element
+            if len(block_stack) == 1 and inline_cache:
+                if not is_empty(inline_cache):
+                    yield {'namespace': namespace,
+                           'type': 'StartTag', 'name': u'p', 'data': {}}
+                    for i in inline_cache:
+                        yield i
+                    yield {'namespace': namespace,
+                           'type': 'EndTag', 'name': u'p', 'data': {}}
+                    yield newlines
+                inline_cache = []
+        # Pop the next level of nested block from the stack on end tag
+        elif ('name' in e and e['type'] == 'EndTag' and
+                block_stack and block_stack[-1] == e['name']):
+            block_stack.pop()
+            block_cache.append(e)
+            # If we're back at the top, flush the current readable block
+            if not block_stack:
+                if not is_empty(block_cache):
+                    for e in block_cache:
+                        yield e
+                    yield newlines
+                block_cache = []
+        # If we encounter a text element outside a readable block,
+        # cache it until we encounter the next readable block
+        elif not block_stack and e['type'] in text_types:
+            inline_cache.append(e)
+        # Include all other elements in the current block
+        elif block_stack and e.get('name') not in container_elements:
+            block_cache.append(e)
+
+
 class ReadableTreewalker(lxmletree.TreeWalker):
     """
     A tree walker that only yields the readable elements of a document.
@@ -90,60 +156,444 @@ class ReadableTreewalker(lxmletree.TreeWalker):
     A blank line is also emitted between readable blocks.
     """
     def __iter__(self):
-        inline_cache, block_cache, block_stack = [], [], []
-        for e in super(ReadableTreewalker, self).__iter__():
-            # Push the next readable block start tag onto the stack
-            if e.get('name') in readable_blocks and e['type'] == 'StartTag':
-                # Push a new block to the stack if the stack is empty or
-                # if a block of the same type is nested in our current stack
-                if not block_stack or block_stack[-1] == e['name']:
-                    block_stack.append(e['name'])
-                    block_cache.append(e)
-                # If this is the start of a new top-level reading block,
-                # flush the inline cache as a new P element
-                if len(block_stack) == 1 and inline_cache:
-                    if not is_empty(inline_cache):
-                        yield {'namespace': namespace,
-                               'type': 'StartTag', 'name': u'p', 'data': {}}
-                        for i in inline_cache:
-                            yield i
-                        yield {'namespace': namespace,
-                               'type': 'EndTag', 'name': u'p', 'data': {}}
-                        yield newlines
-                    inline_cache = []
-            # Pop the next level of nested block from the stack on end tag
-            elif ('name' in e and e['type'] == 'EndTag' and
-                    block_stack and block_stack[-1] == e['name']):
-                block_stack.pop()
-                block_cache.append(e)
-                # If we're back at the top, flush the current readable block
-                if not block_stack:
-                    if not is_empty(block_cache):
-                        for e in block_cache:
-                            yield e
-                        yield newlines
-                    block_cache = []
-            # If we encounter a text element outside a readable block,
-            # cache it until we encounter the next readable block
-            elif not block_stack and e['type'] in text_types:
-                inline_cache.append(e)
-            # Include all other elements in the current block
-            elif block_stack and e.get('name') not in container_elements:
-                block_cache.append(e)
+        return readable_tokens(super(ReadableTreewalker, self).__iter__())
 
 
-def sanitize(html, strip_whitespace=False):
+def text_tokens(data):
     """
-    Sanitize HTML to leave only the readable top-level elements.
+    Split text into tree walker tokens the way html5lib's walkers do.
+    """
+    middle = data.lstrip(SPACE_CHARACTERS)
+    left = data[:len(data) - len(middle)]
+    if left:
+        yield {'type': 'SpaceCharacters', 'data': left}
+    data = middle
+    middle = data.rstrip(SPACE_CHARACTERS)
+    right = data[len(middle):]
+    if middle:
+        yield {'type': 'Characters', 'data': middle}
+    if right:
+        yield {'type': 'SpaceCharacters', 'data': right}
+
+
+class ReadableTarget(object):
+    """
+    An lxml parser target that collects readable, sanitized tokens.
+
+    It applies the filtering of ``ReadableTokenizer`` to the events of
+    lxml's native parser and emits the tokens a ``ReadableTreewalker``
+    would walk, without building a tree. The content of titles, scripts
+    and styles is skipped, where html5lib keeps the text of scripts and
+    the escaped markup of styles as readable text.
+    """
+    sanitizer = HTMLSanitizerMixin()
+
+    def __init__(self):
+        self.tokens = []
+        self.text = []
+        self.skipping = None
+
+    def _flush(self):
+        if self.text:
+            self.tokens.extend(text_tokens(u''.join(self.text)))
+            self.text = []
+
+    def _tag(self, type, tag, attrib=None):
+        token = self.sanitizer.sanitize_token({
+            'type': type, 'name': tag,
+            'data': [[name, value] for name, value in (attrib or {}).items()],
+        })
+        if 'name' not in token:
+            # Disallowed elements are escaped into text
+            self.text.append(token['data'])
+            return
+        self._flush()
+        if tag in voidElements:
+            type = 'EmptyTag'
+        data = dict(((None, unicode(name)), unicode(value))
+                    for name, value in token['data'])
+        self.tokens.append({'namespace': namespace, 'type': type,
+                            'name': unicode(tag), 'data': data})
+
+    def start(self, tag, attrib):
+        if self.skipping:
+            return
+        if tag in skipped_elements:
+            self.skipping = tag
+        elif tag in readable_elements:
+            self._tag('StartTag', tag, attrib)
+
+    def end(self, tag):
+        if self.skipping:
+            if tag == self.skipping:
+                self.skipping = None
+        elif tag in readable_elements and tag not in voidElements:
+            self._tag('EndTag', tag)
+
+    def data(self, data):
+        if not self.skipping:
+            self.text.append(data)
+
+    def drain(self):
+        """
+        Return the tokens collected so far, except for pending text that
+        the next chunk of the page may continue.
+        """
+        tokens, self.tokens = self.tokens, []
+        return tokens
+
+    def close(self):
+        self._flush()
+        return self.drain()
+
+
+def _chunks(html, chunk_size):
+    """
+    Generate chunks of a string or file-like object that end before a
+    ``<``, so that no tag is split between two chunks.
+
+    libxml2's push parser misses the end tag of a script or style that is
+    split, and takes the rest of the page for its raw text.
+    """
+    if hasattr(html, 'read'):
+        reads = iter(lambda: html.read(chunk_size), html.read(0))
+    else:
+        reads = (html[i:i + chunk_size]
+                 for i in xrange(0, len(html), chunk_size))
+    pending = None
+    for chunk in reads:
+        if pending:
+            chunk = pending + chunk
+        split = chunk.rfind('<')
+        if split == -1:
+            split = len(chunk)
+        pending = chunk[split:]
+        if split:
+            yield chunk[:split]
+    if pending:
+        yield pending
+
+
+def _parse_readable(html, chunk_size=CHUNK_SIZE):
+    """
+    Generate the tokens of ``ReadableTarget`` for a page, a string or a
+    file-like object, feeding lxml's parser ``chunk_size`` characters at
+    a time.
+    """
+    target = ReadableTarget()
+    parser = None
+    for chunk in _chunks(html, chunk_size):
+        if parser is None:
+            encoding = 'utf-8' if isinstance(chunk, unicode) else None
+            parser = etree.HTMLParser(target=target, encoding=encoding)
+        if isinstance(chunk, unicode):
+            chunk = chunk.encode('utf-8')
+        parser.feed(chunk)
+        for token in target.drain():
+            yield token
+    if parser is not None:
+        for token in parser.close():
+            yield token
+
+
+def iter_readable_blocks(html, chunk_size=CHUNK_SIZE):
+    """
+    Generate the readable blocks of a document as ``(html, text)`` pairs
+    from a single pass of lxml's parser.
+
+    ``html`` is a string or a file-like object, which is read
+    ``chunk_size`` characters at a time. Each block is yielded as soon as
+    it closes, so memory is bounded by the largest block rather than the
+    page.
+    """
+    serializer = HTMLSerializer(omit_optional_tags=False)
+    block = []
+    for token in readable_tokens(_parse_readable(html, chunk_size)):
+        if token is newlines:
+            text = u''.join(t['data'] for t in block
+                            if t['type'] in text_types)
+            yield serializer.render(block), text
+            block = []
+        else:
+            block.append(token)
+
+
+def readable_parser():
+    """
+    Return an html5lib parser that keeps the readable elements.
+
+    A parser resets itself on every parse, so it can be reused.
     """
     TreeBuilder = html5lib.treebuilders.getTreeBuilder("lxml")
-    parser = html5lib.HTMLParser(tree=TreeBuilder, tokenizer=ReadableTokenizer)
+    return html5lib.HTMLParser(tree=TreeBuilder, tokenizer=ReadableTokenizer)
+
+
+def sanitize(html, strip_whitespace=False, streaming=False, parser=None):
+    """
+    Sanitize HTML to leave only the readable top-level elements.
+
+    If ``streaming``, the document is parsed by lxml's native parser
+    instead of html5lib, see ``iter_readable_blocks``. Otherwise
+    ``parser`` is an optional parser from ``readable_parser`` to reuse.
+
+    The two parsers give the same output except for scripts and styles:
+    html5lib leaves the code of a script, and a style escaped as text, in
+    the readable text, while the streaming parser drops both.
+    """
+    if streaming:
+        serializer = HTMLSerializer(strip_whitespace=strip_whitespace)
+        return serializer.render(readable_tokens(_parse_readable(html)))
+
+    if parser is None:
+        parser = readable_parser()
     tree = parser.parse(html)
     walker = ReadableTreewalker(tree)
     serializer = HTMLSerializer(strip_whitespace=strip_whitespace)
     return serializer.render(walker)
 
 
+class SanitizedPage(object):
+    """
+    The outcome of sanitizing one page in ``sanitize_many``.
+
+    ``html`` is None if sanitizing failed, in which case ``error``
+    describes the exception or ``timed_out`` is set.
+    """
+    __slots__ = ('html', 'error', 'timed_out', 'elapsed')
+
+    def __init__(self, html=None, error=None, timed_out=False, elapsed=0.0):
+        self.html = html
+        self.error = error
+        self.timed_out = timed_out
+        self.elapsed = elapsed
+
+    def __getstate__(self):
+        return self.html, self.error, self.timed_out, self.elapsed
+
+    def __setstate__(self, state):
+        self.html, self.error, self.timed_out, self.elapsed = state
+
+    @property
+    def ok(self):
+        return self.html is not None
+
+
+class BatchStats(object):
+    """
+    Throughput counters of a ``sanitize_many`` batch.
+
+    ``busy`` is the time spent sanitizing summed over workers,
+    ``elapsed`` the wall clock time since the batch started and
+    ``timed_out`` the input indices of the pages that timed out.
+    """
+    def __init__(self):
+        self.pages = 0
+        self.errors = 0
+        self.timeouts = 0
+        self.timed_out = []
+        self.busy = 0.0
+        self.started = time.time()
+
+    def record(self, page):
+        self.busy += page.elapsed
+        if page.timed_out:
+            self.timeouts += 1
+            self.timed_out.append(self.pages)
+        elif page.error is not None:
+            self.errors += 1
+        self.pages += 1
+
+    @property
+    def elapsed(self):
+        return time.time() - self.started
+
+    @property
+    def pages_per_second(self):
+        return self.pages / self.elapsed if self.pages else 0.0
+
+
+_worker_parser = None
+_worker_options = {}
+
+
+def _init_sanitize_worker(streaming, strip_whitespace):
+    global _worker_parser
+    _worker_parser = None if streaming else readable_parser()
+    _worker_options.update(streaming=streaming,
+                           strip_whitespace=strip_whitespace)
+
+
+def _sanitize_worker(html):
+    start = time.time()
+    try:
+        result = SanitizedPage(html=sanitize(
+            html, strip_whitespace=_worker_options['strip_whitespace'],
+            streaming=_worker_options['streaming'], parser=_worker_parser))
+    except Exception as e:
+        result = SanitizedPage(error='%s: %s' % (type(e).__name__, e))
+    result.elapsed = time.time() - start
+    return result
+
+
+def sanitize_many(pages, workers=1, timeout=None, chunksize=1,
+                  strip_whitespace=False, streaming=False, stats=None):
+    """
+    Sanitize many pages with a pool of ``workers`` processes.
+
+    Each worker builds its parser once. A page that raises or takes longer
+    than ``timeout`` seconds yields a failed ``SanitizedPage`` instead of
+    stopping the batch. Results are generated in input order and recorded
+    in ``stats``, a ``BatchStats``, if given.
+
+    With a ``timeout``, pages are sent one at a time (``chunksize`` is
+    ignored), even to a single worker, and the deadline is kept by the
+    calling process: a worker stuck on a page, even inside libxml2, is
+    killed and replaced.
+    """
+    initargs = (streaming, strip_whitespace)
+    if timeout:
+        results = parallel.imap_timeout(
+            _sanitize_worker, pages, timeout, workers=workers,
+            initializer=_init_sanitize_worker, initargs=initargs)
+    else:
+        results = parallel.imap(
+            _sanitize_worker, pages, workers=workers, chunksize=chunksize,
+            initializer=_init_sanitize_worker, initargs=initargs)
+    for result in results:
+        if isinstance(result, parallel.WorkerFailure):
+            result = SanitizedPage(
+                error=result.error, timed_out=result.timed_out,
+                elapsed=timeout if result.timed_out else 0.0)
+        if stats is not None:
+            stats.record(result)
+        yield result
+
+
+def _entity(m):
+    decimal, hexadecimal, name = m.groups()
+    try:
+        if decimal:
+            return unichr(int(decimal))
+        if hexadecimal:
+            return unichr(int(hexadecimal, 16))
+        return unichr(name2codepoint[name])
+    except (KeyError, ValueError):
+        return None
+
+
+class _TextBlock(object):
+    """
+    The text of one block of a page and the source offsets of each of its
+    characters.
+    """
+    def __init__(self, encoding):
+        self.encoding = encoding
+        self.parts = []
+        self.starts = array('l')
+        self.ends = array('l')
+
+    def _literal(self, raw, offset):
+        if isinstance(raw, unicode):
+            text = raw
+        else:
+            text = raw.decode(self.encoding)
+        self.parts.append(text.translate(NEWLINES))
+        if len(text) == len(raw):
+            self.starts.extend(xrange(offset, offset + len(text)))
+            self.ends.extend(xrange(offset + 1, offset + len(text) + 1))
+        else:
+            for c in text:
+                self.starts.append(offset)
+                offset += len(c.encode(self.encoding))
+                self.ends.append(offset)
+
+    def add(self, raw, offset):
+        """
+        Add the text ``raw`` found at ``offset``, decoding its entities.
+        """
+        position = 0
+        for m in ENTITY_RE.finditer(raw):
+            character = _entity(m)
+            if character is None:
+                continue
+            if m.start() > position:
+                self._literal(raw[position:m.start()], offset + position)
+            self.parts.append(character.translate(NEWLINES))
+            self.starts.append(offset + m.start())
+            self.ends.append(offset + m.end())
+            position = m.end()
+        if position < len(raw):
+            self._literal(raw[position:], offset + position)
+
+    def tokens(self, tokenize, ignore_abbreviations=False):
+        if not self.parts:
+            return
+        text = u''.join(self.parts)
+        starts, ends = self.starts, self.ends
+        for t in tokenize(text, ignore_abbreviations=ignore_abbreviations):
+            if t.kind == NEWLINE:
+                # Newlines in the text are spaces, so this is a decoded
+                # entity such as &lt;br&gt;: keep the text between the
+                # brackets rather than break the line
+                offset = t.start + 1
+                for u in tokenize(text[offset:t.end - 1],
+                                  ignore_abbreviations=ignore_abbreviations):
+                    yield Token(u.type, starts[u.start + offset],
+                                ends[u.end + offset - 1], u.kind)
+                continue
+            yield Token(t.type, starts[t.start], ends[t.end - 1], t.kind)
+
+
+def iter_tokens(html, encoding='utf-8', ignore_abbreviations=False):
+    """
+    Generate the tokens of the text of a page in one pass over its markup.
+
+    Token offsets point into ``html``: byte offsets if it is a byte
+    string in ``encoding``, character offsets if it is unicode. Titles,
+    scripts and styles are skipped, and every tag other than an inline
+    element ends a block with a line break token, so a sentence never
+    spans two blocks. Line breaks inside the text are plain whitespace.
+    """
+    from nlp.tokenizers import es
+    tokenize = es.tokenize
+    block = _TextBlock(encoding)
+    position = 0
+    while True:
+        m = MARKUP_RE.search(html, position)
+        end = m.start() if m else len(html)
+        if end > position:
+            block.add(html[position:end], position)
+        if m is None:
+            break
+        position = m.end()
+
+        closing, name = m.group(1), (m.group(2) or '').lower()
+        if not name or (name in inline_elements and name != 'br'):
+            continue
+        if block.parts:
+            for t in block.tokens(tokenize, ignore_abbreviations):
+                yield t
+            yield Token(punctuation.BR, m.start(), m.end(), NEWLINE)
+            block = _TextBlock(encoding)
+        if name in skipped_elements and not closing:
+            close = re.compile(r'</%s\s*>' % name, re.I).search(html, position)
+            position = close.end() if close else len(html)
+
+    for t in block.tokens(tokenize, ignore_abbreviations):
+        yield t
+
+
+def iter_sentences(html, classifier=None, encoding='utf-8'):
+    """
+    Generate the sentences of a page, as lists of tokens, from its markup.
+
+    Tokens keep their offsets into ``html`` (see ``iter_tokens``), so
+    ``html[s[0].start:s[-1].end]`` is the source of a sentence ``s``.
+    """
+    from nlp.tokenizers import es
+    return es.iter_segment(iter_tokens(html, encoding), classifier)
+
+
 def get_text(html):
     root = fromstring(html)
     return root.text_content()
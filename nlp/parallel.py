@@ -0,0 +1,176 @@
+"""
+Helpers to spread work over a pool of processes.
+"""
+import multiprocessing
+import select
+import time
+
+
+def _apply_indexed(args):
+    function, i, item = args
+    return i, function(item)
+
+
+def imap(function, items, workers=1, chunksize=1, ordered=True,
+         initializer=None, initargs=()):
+    """
+    Map ``function`` over ``items`` with a pool of ``workers`` processes.
+
+    Results are generated in input order, or as ``(index, result)`` pairs
+    in completion order if ``ordered`` is false. ``initializer`` runs once
+    per worker, so it is the place to load read-only state such as models.
+    With a single worker everything runs in the current process.
+    """
+    if workers <= 1:
+        if initializer:
+            initializer(*initargs)
+        for i, item in enumerate(items):
+            yield function(item) if ordered else (i, function(item))
+        return
+
+    pool = multiprocessing.Pool(workers, initializer, initargs)
+    try:
+        if ordered:
+            results = pool.imap(function, items, chunksize)
+        else:
+            results = pool.imap_unordered(
+                _apply_indexed,
+                ((function, i, item) for i, item in enumerate(items)),
+                chunksize)
+        for result in results:
+            yield result
+        pool.close()
+    finally:
+        pool.terminate()
+        pool.join()
+
+
+class WorkerFailure(object):
+    """
+    The result of an item whose worker timed out or died in
+    ``imap_timeout``.
+    """
+    __slots__ = ('error', 'timed_out')
+
+    def __init__(self, error, timed_out=False):
+        self.error = error
+        self.timed_out = timed_out
+
+
+def _worker_loop(connection, function, initializer, initargs):
+    if initializer:
+        initializer(*initargs)
+    while True:
+        item = connection.recv()
+        if item is None:
+            break
+        try:
+            connection.send((True, function(item[0])))
+        except Exception as e:
+            connection.send((False, e))
+
+
+class _Worker(object):
+    """
+    A process that maps ``function`` over the items sent to it, one at a
+    time, and can be killed mid-item.
+    """
+    def __init__(self, function, initializer, initargs):
+        self.connection, child = multiprocessing.Pipe()
+        self.process = multiprocessing.Process(
+            target=_worker_loop,
+            args=(child, function, initializer, initargs))
+        self.process.daemon = True
+        self.process.start()
+        child.close()
+        self.index = None
+        self.started = None
+
+    def send(self, index, item):
+        self.index, self.started = index, time.time()
+        self.connection.send((item,))
+
+    def fileno(self):
+        return self.connection.fileno()
+
+    def terminate(self):
+        self.process.terminate()
+        self.process.join()
+        self.connection.close()
+
+
+def imap_timeout(function, items, timeout, workers=1, initializer=None,
+                 initargs=()):
+    """
+    Map ``function`` over ``items`` in ``workers`` processes, giving up on
+    any item that runs for more than ``timeout`` seconds.
+
+    The deadline is kept by the calling process, so it holds even while a
+    worker is stuck in C code. A worker that times out or dies is
+    terminated and replaced, and its item yields a ``WorkerFailure``.
+    Results are generated in input order; exceptions raised by
+    ``function`` are raised here, as with ``imap``. Items are sent one at
+    a time and at most ``2 * workers`` results are held back for
+    ordering.
+    """
+    workers = max(workers, 1)
+    window = 2 * workers
+    items = enumerate(items)
+    pool = [_Worker(function, initializer, initargs)
+            for _ in xrange(workers)]
+    results = {}
+    next_index = dispatched = 0
+    exhausted = False
+
+    def replace(worker):
+        worker.terminate()
+        pool[pool.index(worker)] = _Worker(function, initializer, initargs)
+
+    try:
+        while True:
+            for worker in pool:
+                if worker.index is not None or exhausted or \
+                        dispatched >= next_index + window:
+                    continue
+                try:
+                    index, item = next(items)
+                except StopIteration:
+                    exhausted = True
+                    break
+                worker.send(index, item)
+                dispatched += 1
+
+            while next_index in results:
+                ok, result = results.pop(next_index)
+                next_index += 1
+                if not ok:
+                    raise result
+                yield result
+
+            running = [w for w in pool if w.index is not None]
+            if not running:
+                if exhausted:
+                    break
+                continue
+            deadline = min(w.started for w in running) + timeout
+            ready, _, _ = select.select(
+                running, [], [], max(deadline - time.time(), 0))
+            for worker in running:
+                if worker in ready:
+                    try:
+                        results[worker.index] = worker.connection.recv()
+                    except EOFError:
+                        worker.process.join()
+                        results[worker.index] = (True, WorkerFailure(
+                            'worker exited with code %s' %
+                            worker.process.exitcode))
+                        replace(worker)
+                        continue
+                    worker.index = None
+                elif time.time() - worker.started >= timeout:
+                    results[worker.index] = (True, WorkerFailure(
+                        'timed out after %gs' % timeout, timed_out=True))
+                    replace(worker)
+    finally:
+        for worker in pool:
+            worker.terminate()
@@ -2,9 +2,9 @@
 from __future__ import division
 
 import re
-import unicodedata
 
 from nlp.encoding import decode
+from nlp.punctuation_table import PUNCTUATION_RANGES
 
 BR = u'<br>'
 
@@ -13,13 +13,27 @@ ELLIPSES_RE = re.compile(ELLIPSES_PATTERN)
 
 NON_UNICODE_PUNCTUATION = [u'`', u'\xb4', u'\xa9', u'\xa3', u'$', u'=', u'+']
 PUNCTUATION = [
-    unicode(unichr(x)) for x in range(65536)
-    if unicodedata.category(unichr(x)).startswith('P')
+    unichr(x) for start, end in PUNCTUATION_RANGES
+    for x in range(start, end + 1)
 ] + NON_UNICODE_PUNCTUATION
-PUNCTUATION_PATTERN = r'%s|%s' % (
-    ELLIPSES_PATTERN,
-    u'|'.join([re.escape(p) for p in PUNCTUATION])
-)
+
+
+def character_class(ranges, characters=()):
+    """
+    Build a regex character class from code point ranges and characters.
+    """
+    items = []
+    for start, end in ranges:
+        if start == end:
+            items.append(re.escape(unichr(start)))
+        else:
+            items.append(u'%s-%s' % (re.escape(unichr(start)),
+                                     re.escape(unichr(end))))
+    items.extend(re.escape(c) for c in characters)
+    return u'[%s]' % u''.join(items)
+
+PUNCTUATION_CLASS = character_class(PUNCTUATION_RANGES, NON_UNICODE_PUNCTUATION)
+PUNCTUATION_PATTERN = r'%s|%s' % (ELLIPSES_PATTERN, PUNCTUATION_CLASS)
 PUNCTUATION_RE = re.compile(PUNCTUATION_PATTERN, re.U)
 PUNCTUATION_ES = decode("—»«¿¡•°^><|£~§„–™“”©■€®№±―…・¥♦，□►。·´▼▲")
 
@@ -28,6 +42,8 @@ NEWLINE_RE = re.compile(NEWLINE_PATTERN)
 
 SEGMENT_PATTERN = r'%s|\.|\?|\!|%s' % (ELLIPSES_PATTERN, NEWLINE_PATTERN)
 SEGMENT_RE = re.compile(SEGMENT_PATTERN)
+# First characters of the punctuation tokens that SEGMENT_RE matches
+SEGMENT_MARKS = u'.?!'
 
 ALPHA_START_PATTERN = r'^\w(?<=[^\d\-])'
 ALPHA_START_RE = re.compile(ALPHA_START_PATTERN, re.U)
@@ -123,35 +139,32 @@ def is_capitalized(t):
         return False
 
 
-def find_abbreviations():
-    import db
-    from tokenizers import es
-    from nltk import FreqDist
-
-    corpus = db.connect()
-    #text = '\n'.join([a['text'] for a in corpus.articles.find().limit(10)])
-    text = '\n'.join([a['text'] for a in corpus.articles.find()])
-    tokens = es.tokenize(text, ignore_abbreviations=True)
-
-    fd = FreqDist()
-    fd_abbr = FreqDist()
-    fd_n_abbr = FreqDist()
-    n_tokens = len(tokens)
-    for i in range(n_tokens):
-        fd.inc(tokens[i])
-        if i < (n_tokens - 1) and tokens[i + 1] == u'.':
-            fd_abbr.inc(tokens[i])
-        else:
-            fd_n_abbr.inc(tokens[i])
-
-    adjusted = {}
-    f_avg = len(fd.keys()) / fd.N()
-    for t, n in fd_abbr.iteritems():
-        f = fd.get(t, 0) / fd.N()
-        deviation = 1 + (f - f_avg)
-        adjusted[t] = n * deviation / fd_n_abbr.get(t, 1) / len(t)
-
-    items = adjusted.items()
-    items.sort(key=lambda i: i[1], reverse=True)
-    for t, n in items[:100]:
-        print u'%s. %f (%d, %d)' % (t, n, fd_abbr[t], fd_n_abbr.get(t, 0))
+def abbreviation_score(abbr_count, non_abbr_count, count, n_tokens, n_types,
+                       length):
+    """
+    Score how likely a type is an abbreviation.
+
+    The ratio of occurrences followed by a period to other occurrences is
+    adjusted by how much the type's frequency deviates from the average
+    frequency and normalized by its length.
+    """
+    f_avg = n_types / n_tokens
+    f = count / n_tokens
+    deviation = 1 + (f - f_avg)
+    return abbr_count * deviation / (non_abbr_count or 1) / length
+
+
+def find_abbreviations(texts, n=100, vocabulary=None):
+    """
+    Return the ``n`` types of an iterable of texts most likely to be
+    abbreviations, as ``(type, score)`` pairs.
+
+    If a ``Vocabulary`` is given, types are counted by their ids in it.
+    See ``nlp.statistics.abbreviations`` to mine a corpus incrementally.
+    """
+    from nlp.statistics.abbreviations import AbbreviationMiner
+
+    miner = AbbreviationMiner(vocabulary)
+    for text in texts:
+        miner.feed_text(text)
+    return miner.top(n)
@@ -0,0 +1,90 @@
+"""
+Registries of language-specific models that load on first use.
+"""
+import importlib
+import threading
+import time
+
+
+class Registry(object):
+    """
+    A thread-safe map of languages to lazily loaded models.
+
+    A model is registered with a loader, either a callable or the dotted
+    name of a module, under a language name, its ISO 639 codes and
+    optional hints such as ``register='twitter'``. The first lookup runs
+    the loader and later lookups, from any thread, share its result.
+    """
+    def __init__(self, kind):
+        self.kind = kind
+        self.loaders = {}
+        self.aliases = {}
+        self.models = {}
+        self.load_times = {}
+        self.lock = threading.RLock()
+
+    def register(self, loader, name, iso2=None, iso3=None, aliases=(),
+                 **hints):
+        for alias in (name, iso2, iso3) + tuple(aliases):
+            if alias:
+                self.aliases[alias.lower()] = name
+        self.loaders[name, _hints(hints)] = loader
+
+    def language(self, name=None, iso2=None, iso3=None):
+        """
+        Return the registered name of a language given any of its names.
+        """
+        for alias in (name, iso2, iso3):
+            if alias and alias.lower() in self.aliases:
+                return self.aliases[alias.lower()]
+        raise LookupError('no %s registered for %s' % (
+            self.kind, name or iso2 or iso3))
+
+    def _key(self, language, hints):
+        key = (language, _hints(hints))
+        if key not in self.loaders:
+            # Fall back to the default model of the language
+            key = (language, ())
+        return key
+
+    def get_for_language(self, name=None, iso2=None, iso3=None, **hints):
+        """
+        Return the model for a language, loading it on first use.
+
+        Hints select a model registered for them, falling back to the
+        language's default model.
+        """
+        key = self._key(self.language(name, iso2, iso3), hints)
+        try:
+            return self.models[key]
+        except KeyError:
+            pass
+
+        with self.lock:
+            if key not in self.models:
+                loader = self.loaders[key]
+                start = time.time()
+                if isinstance(loader, basestring):
+                    model = importlib.import_module(loader)
+                else:
+                    model = loader()
+                self.load_times[key] = time.time() - start
+                self.models[key] = model
+            return self.models[key]
+
+    def preload(self, *languages):
+        """
+        Load the models of ``languages``, or of every registered language,
+        so that forked workers inherit them.
+        """
+        names = set(self.language(l) for l in languages)
+        for language, hints in self.loaders.keys():
+            if not names or language in names:
+                self.get_for_language(language, **dict(hints))
+
+    def loaded(self):
+        return sorted(self.models)
+
+
+def _hints(hints):
+    return tuple(sorted(hints.items()))
@@ -0,0 +1,13 @@
+from nlp.registry import Registry
+
+
+def _load_es():
+    from nlp.segmenters import es
+    es.load()
+    return es
+
+registry = Registry('segmenter')
+registry.register(_load_es, 'spanish', iso2='es', iso3='spa',
+                  aliases=('esp',))
+
+get_for_language = registry.get_for_language
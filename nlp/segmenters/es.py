@@ -1,7 +1,22 @@
-import nltk.data
+import threading
 
-segmenter = nltk.data.load('tokenizers/punkt/spanish.pickle')
+PUNKT_MODEL = 'tokenizers/punkt/spanish.pickle'
+
+segmenter = None
+_lock = threading.Lock()
+
+
+def load():
+    """
+    Load the Punkt model on first use.
+    """
+    global segmenter
+    with _lock:
+        if segmenter is None:
+            import nltk.data
+            segmenter = nltk.data.load(PUNKT_MODEL)
+    return segmenter
 
 
 def segment(text):
-    return segmenter.tokenize(text)
+    return (segmenter or load()).tokenize(text)
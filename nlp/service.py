@@ -0,0 +1,274 @@
+"""
+A segmentation service with request batching and latency statistics.
+
+``SegmentationService`` segments texts for any number of threads with a
+frozen classifier, batching concurrent requests onto a pool of worker
+processes. ``serve`` puts it behind a line protocol over TCP, and
+``Client`` talks to that server with the same interface as the service,
+which stands in for it locally.
+
+Each request and response is one line of JSON:
+
+    {"text": "..."}       ->  {"sentences": ["...", ...]}
+    {"stats": true}       ->  {"count": ..., "p50": ..., "p99": ...}
+"""
+from __future__ import division
+
+import json
+import multiprocessing
+import Queue
+import socket
+import SocketServer
+import threading
+import time
+from collections import deque
+
+from nlp.statistics.tokens import CompiledTokenClassifier, TokenClassifier
+from nlp.tokenizers import es
+
+BATCH_SIZE = 16
+BATCH_DELAY = 0.002
+LATENCY_WINDOW = 10000
+PERCENTILES = (50, 90, 99)
+
+
+class LatencyStats(object):
+    """
+    Percentiles of the most recent ``window`` latencies, in seconds.
+    """
+    def __init__(self, window=LATENCY_WINDOW):
+        self.latencies = deque(maxlen=window)
+        self.count = 0
+        self.lock = threading.Lock()
+
+    def record(self, seconds):
+        with self.lock:
+            self.latencies.append(seconds)
+            self.count += 1
+
+    def percentile(self, p):
+        with self.lock:
+            latencies = sorted(self.latencies)
+        if not latencies:
+            return 0.0
+        i = int(round(p / 100 * (len(latencies) - 1)))
+        return latencies[i]
+
+    def summary(self, percentiles=PERCENTILES):
+        summary = dict(('p%d' % p, self.percentile(p)) for p in percentiles)
+        summary['count'] = self.count
+        return summary
+
+
+def frozen_classifier(classifier=None):
+    """
+    Return a classifier that is safe to share between threads.
+
+    ``classifier`` is a ``TokenClassifier``, the file name of a saved one
+    or None for an empty model. ``CompiledTokenClassifier`` never changes
+    after it is built. An empty one is falsy, so it must be passed on as
+    is: ``es.segment`` only trains a classifier on its input when given
+    None.
+    """
+    if isinstance(classifier, CompiledTokenClassifier):
+        return classifier
+    if classifier is None or isinstance(classifier, basestring):
+        classifier = TokenClassifier(classifier, read_only=True)
+    return classifier.compile()
+
+
+class _Request(object):
+    __slots__ = ('text', 'started', 'done', 'result', 'error')
+
+    def __init__(self, text):
+        self.text = text
+        self.started = time.time()
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SegmentationService(object):
+    """
+    Segment texts concurrently with a shared, frozen classifier.
+
+    Requests queue up and a dispatcher thread sends them in batches of up
+    to ``batch_size``, waiting at most ``batch_delay`` seconds to fill a
+    batch, to a pool of ``workers`` processes that each hold the
+    classifier.
+
+    With one worker there is no pool: batches run in the dispatcher thread
+    itself, one request after another, so the service uses a single core
+    and a long text delays every request queued behind it. That saves the
+    round trip to a process for short texts; use more workers when
+    throughput matters.
+    """
+    def __init__(self, classifier=None, workers=1, batch_size=BATCH_SIZE,
+                 batch_delay=BATCH_DELAY):
+        self.classifier = frozen_classifier(classifier)
+        self.batch_size = batch_size
+        self.batch_delay = batch_delay
+        self.stats = LatencyStats()
+        self.pool = None
+        if workers > 1:
+            self.pool = multiprocessing.Pool(workers, es._init_worker,
+                                             (self.classifier,))
+        self.queue = Queue.Queue()
+        self.dispatcher = threading.Thread(target=self._dispatch)
+        self.dispatcher.daemon = True
+        self.dispatcher.start()
+
+    def _segment(self, texts):
+        if self.pool is not None:
+            return self.pool.map(es._segment_worker, texts)
+        return [es.segment(text, raw=True, classifier=self.classifier)
+                for text in texts]
+
+    def _batch(self, request):
+        batch = [request]
+        deadline = time.time() + self.batch_delay
+        while len(batch) < self.batch_size:
+            timeout = deadline - time.time()
+            if timeout <= 0:
+                break
+            try:
+                request = self.queue.get(timeout=timeout)
+            except Queue.Empty:
+                break
+            if request is None:
+                self.queue.put(None)
+                break
+            batch.append(request)
+        return batch
+
+    def _dispatch(self):
+        while True:
+            request = self.queue.get()
+            if request is None:
+                return
+            batch = self._batch(request)
+            try:
+                results = self._segment([r.text for r in batch])
+            except Exception:
+                # Retry one by one so a bad text only fails its own request
+                for r in batch:
+                    try:
+                        r.result = self._segment([r.text])[0]
+                    except Exception as e:
+                        r.error = e
+            else:
+                for r, sentences in zip(batch, results):
+                    r.result = sentences
+            for r in batch:
+                self.stats.record(time.time() - r.started)
+                r.done.set()
+
+    def segment(self, text):
+        """
+        Return the sentences of ``text``. Safe to call from any thread.
+        """
+        request = _Request(text)
+        self.queue.put(request)
+        request.done.wait()
+        if request.error is not None:
+            raise request.error
+        return request.result
+
+    def segment_many(self, texts):
+        requests = [_Request(text) for text in texts]
+        for request in requests:
+            self.queue.put(request)
+        results = []
+        for request in requests:
+            request.done.wait()
+            if request.error is not None:
+                raise request.error
+            results.append(request.result)
+        return results
+
+    def latency(self):
+        return self.stats.summary()
+
+    def close(self):
+        self.queue.put(None)
+        self.dispatcher.join()
+        if self.pool is not None:
+            self.pool.close()
+            self.pool.join()
+
+
+class _LineHandler(SocketServer.StreamRequestHandler):
+    def handle(self):
+        service = self.server.service
+        for line in iter(self.rfile.readline, ''):
+            try:
+                request = json.loads(line)
+                if request.get('stats'):
+                    response = service.latency()
+                else:
+                    response = {'sentences': service.segment(request['text'])}
+            except Exception as e:
+                response = {'error': '%s: %s' % (type(e).__name__, e)}
+            self.wfile.write(json.dumps(response) + '\n')
+            self.wfile.flush()
+
+
+class SegmentationServer(SocketServer.ThreadingMixIn, SocketServer.TCPServer):
+    """
+    A TCP server answering the line protocol with a ``SegmentationService``.
+
+    Each connection is served by its own thread, so requests from several
+    connections are batched together by the service.
+    """
+    allow_reuse_address = True
+    daemon_threads = True
+
+    def __init__(self, address, service):
+        SocketServer.TCPServer.__init__(self, address, _LineHandler)
+        self.service = service
+
+
+def serve(service, host='127.0.0.1', port=8642):
+    server = SegmentationServer((host, port), service)
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+
+
+class Client(object):
+    """
+    A connection to a ``SegmentationServer``.
+
+    It has the same ``segment`` and ``latency`` methods as the service, so
+    code can use a local ``SegmentationService`` in its place.
+    """
+    def __init__(self, host='127.0.0.1', port=8642):
+        self.socket = socket.create_connection((host, port))
+        self.file = self.socket.makefile('rb+')
+
+    def _call(self, request):
+        self.file.write(json.dumps(request) + '\n')
+        self.file.flush()
+        response = json.loads(self.file.readline())
+        if 'error' in response:
+            raise RuntimeError(response['error'])
+        return response
+
+    def segment(self, text):
+        return self._call({'text': text})['sentences']
+
+    def latency(self):
+        return self._call({'stats': True})
+
+    def close(self):
+        self.file.close()
+        self.socket.close()
+
+
+if __name__ == '__main__':
+    import sys
+
+    classifier = sys.argv[1] if len(sys.argv) > 1 else None
+    workers = int(sys.argv[2]) if len(sys.argv) > 2 else 1
+    serve(SegmentationService(classifier, workers=workers))
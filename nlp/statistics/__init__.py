@@ -1,19 +1,60 @@
 from __future__ import division
 
 import string
+from collections import defaultdict
+from itertools import islice, izip, tee
 
 from nltk import FreqDist
 
+from nlp.statistics.vocabulary import Vocabulary
+
+NGRAM_ID_BITS = 24
+
 
 def ngrams(tokens, n=1):
     """
     Generate the set of n adjacent tokens.
+
+    The n-grams are tuples taken from a sliding window, so ``tokens`` can
+    be any iterable, including a generator, and no slices are copied.
     """
-    n_tokens = len(tokens)
-    for first, t in enumerate(tokens):
-        last = first + n
-        if last <= n_tokens:
-            yield tokens[first:last]
+    iterators = tee(tokens, n)
+    for i, iterator in enumerate(iterators):
+        for _ in xrange(i):
+            next(iterator, None)
+    return izip(*iterators)
+
+
+def ngram_ids(tokens, n=1, vocabulary=None, bits=NGRAM_ID_BITS):
+    """
+    Generate the set of n adjacent tokens packed into single integers.
+
+    Tokens are integer ids below ``2 ** bits``, or any hashable values if
+    a ``vocabulary`` dict or ``Vocabulary`` is given, in which case unseen
+    tokens are added to it with the next free id. The first token of each
+    n-gram takes the highest bits, see ``unpack_ngram``.
+    """
+    if isinstance(vocabulary, Vocabulary):
+        tokens = vocabulary.iter_encode(tokens)
+    elif vocabulary is not None:
+        tokens = (vocabulary.setdefault(t, len(vocabulary)) for t in tokens)
+
+    limit, mask = 1 << bits, (1 << (bits * n)) - 1
+    code = 0
+    for i, t in enumerate(tokens):
+        if not 0 <= t < limit:
+            raise ValueError('token id %d does not fit in %d bits' % (t, bits))
+        code = ((code << bits) | t) & mask
+        if i >= n - 1:
+            yield code
+
+
+def unpack_ngram(code, n=1, bits=NGRAM_ID_BITS):
+    """
+    Return the tuple of token ids packed by ``ngram_ids``.
+    """
+    mask = (1 << bits) - 1
+    return tuple((code >> (bits * i)) & mask for i in reversed(xrange(n)))
 
 
 def bigrams(tokens):
@@ -30,10 +71,16 @@ def trigrams(tokens):
     return ngrams(tokens, n=3)
 
 
-def collocations(tokens):
+def collocations(tokens, vocabulary=None):
     """
     Return a list of bigrams that occur together above chance probability.
+
+    If a ``Vocabulary`` is given, ``tokens`` are its ids and are counted
+    by the ids of their lowercase forms; the bigrams returned are types.
     """
+    if vocabulary is not None:
+        return _id_collocations(vocabulary.lower_ids(tokens), vocabulary)
+
     fd_unigrams = FreqDist()
     for u in tokens:
         fd_unigrams.inc(u.lower())
@@ -54,14 +101,40 @@ def collocations(tokens):
     return candidates
 
 
+def _id_collocations(ids, vocabulary):
+    unigrams = defaultdict(int)
+    for i in ids:
+        unigrams[i] += 1
+
+    bigrams = defaultdict(int)
+    for b in izip(ids, islice(ids, 1, None)):
+        bigrams[b] += 1
+
+    n = len(ids)
+    types = vocabulary.types
+    candidates = []
+    for b, count in bigrams.iteritems():
+        f_b = count / unigrams[b[0]]
+        f_w2 = unigrams[b[1]] / n
+        if f_b > f_w2:
+            candidates.append(((types[b[0]], types[b[1]]), count))
+
+    candidates.sort(key=lambda i: i[1], reverse=True)
+
+    return candidates
+
+
 if __name__ == '__main__':
-    import corpus.db
-    import corpus.tokenizers.es
+    import sys
+    from array import array
+    from nlp.corpus import Corpus
+    from nlp.tokenizers import es
 
-    db = corpus.db.connect()
-    text = u'\n'.join(a['text'] for a in db.articles.find())
-    tokens = corpus.tokenizers.es.tokenize(text)
-    collocations = collocations(tokens)
+    vocabulary = Vocabulary()
+    ids = array('i')
+    for text in Corpus(sys.argv[1]):
+        ids.extend(vocabulary.encode(es.tokenize(text)))
+    collocations = collocations(ids, vocabulary=vocabulary)
 
     for b, n in collocations[:100]:
-        print b, n
+        print u' '.join(b).encode('utf-8'), n
@@ -0,0 +1,139 @@
+"""
+Single-pass abbreviation discovery.
+
+``AbbreviationMiner`` counts how often each type is followed by a period
+while documents stream through it. Memory grows with the vocabulary, not
+with the corpus, and the counts can be checkpointed and resumed.
+"""
+import codecs
+import pickle
+from collections import defaultdict
+
+from nlp import punctuation
+from nlp.punctuation import abbreviation_score
+
+PERIOD = u'.'
+
+# The id counted for the break between documents when the vocabulary is
+# frozen without a BR type; no vocabulary gives it to a type
+BOUNDARY = -1
+
+
+def read_files(file_names, encoding='utf-8'):
+    """
+    Generate the text of each file as one document.
+    """
+    for file_name in file_names:
+        with codecs.open(file_name, encoding=encoding) as f:
+            yield f.read()
+
+
+class AbbreviationMiner(object):
+    """
+    Running counts of types followed and not followed by a period.
+
+    Documents are separated by a line break, so feeding them one at a time
+    gives the same counts as tokenizing them joined by newlines. With a
+    ``vocabulary``, documents are sequences of its ids and the counts are
+    kept by id.
+    """
+    def __init__(self, vocabulary=None):
+        self.vocabulary = vocabulary
+        self.counts = defaultdict(int)
+        self.abbr_counts = defaultdict(int)
+        self.non_abbr_counts = defaultdict(int)
+        self.n_tokens = 0
+        self.pending = None
+
+    def _count(self, t, is_abbreviation):
+        self.counts[t] += 1
+        if is_abbreviation:
+            self.abbr_counts[t] += 1
+        else:
+            self.non_abbr_counts[t] += 1
+
+    def feed(self, tokens):
+        """
+        Count the unicode tokens of one document.
+
+        Tokens must come from a tokenizer called with
+        ``ignore_abbreviations=True`` so periods are split off.
+        """
+        vocabulary = self.vocabulary
+        if vocabulary is None:
+            period, br = PERIOD, punctuation.BR
+        else:
+            period = vocabulary.lookup(PERIOD)
+            br = vocabulary.lookup(punctuation.BR)
+            if br is None:
+                br = BOUNDARY
+
+        previous = self.pending
+        if previous is not None:
+            self._count(previous, False)
+            previous = br
+            self.n_tokens += 1
+        for t in tokens:
+            if previous is not None:
+                self._count(previous, t == period)
+            previous = t
+            self.n_tokens += 1
+        self.pending = previous
+
+    def feed_text(self, text):
+        from nlp.tokenizers import es
+        tokens = es.tokenize(text, ignore_abbreviations=True, as_unicode=True)
+        if self.vocabulary is not None:
+            tokens = self.vocabulary.iter_encode(tokens)
+        self.feed(tokens)
+
+    def top(self, n=100):
+        """
+        Return the ``n`` best scoring ``(type, score)`` pairs.
+        """
+        counts, non_abbr_counts = self.counts, self.non_abbr_counts
+        pending = self.pending
+        n_types = len(counts)
+        if pending is not None and pending not in counts:
+            n_types += 1
+
+        types = self.vocabulary.types if self.vocabulary is not None else None
+        scores = []
+        for t, abbr_count in self.abbr_counts.iteritems():
+            if t == BOUNDARY:
+                continue
+            extra = 1 if t == pending else 0
+            type = types[t] if types is not None else t
+            scores.append((type, abbreviation_score(
+                abbr_count, non_abbr_counts.get(t, 0) + extra,
+                counts[t] + extra, self.n_tokens, n_types, len(type))))
+        scores.sort(key=lambda i: i[1], reverse=True)
+        return scores[:n]
+
+    def save(self, file_name):
+        """
+        Checkpoint the counts so mining can resume with ``load``.
+        """
+        with open(file_name, 'wb') as f:
+            pickle.dump(self, f, pickle.HIGHEST_PROTOCOL)
+
+    @classmethod
+    def load(cls, file_name):
+        with open(file_name, 'rb') as f:
+            return pickle.load(f)
+
+
+if __name__ == '__main__':
+    import sys
+    from nlp.corpus import Corpus, is_corpus
+
+    miner = AbbreviationMiner()
+    if len(sys.argv) == 2 and is_corpus(sys.argv[1]):
+        texts = Corpus(sys.argv[1])
+    else:
+        texts = read_files(sys.argv[1:])
+    for text in texts:
+        miner.feed_text(text)
+    for t, score in miner.top(100):
+        print u'%s. %f (%d, %d)' % (t, score, miner.abbr_counts[t],
+                                   miner.non_abbr_counts.get(t, 0))
@@ -0,0 +1,156 @@
+"""
+Vectorized bigram association measures with NumPy.
+
+Tokens are lowercased and mapped to integer ids once, or come as ids of a
+``Vocabulary``. Bigrams are packed into single integers and counted by
+sorting, so scoring every candidate pair takes a handful of array
+operations instead of a Python loop.
+"""
+from __future__ import division
+
+import numpy as np
+
+MEASURES = ('count', 'likelihood_ratio', 'pmi')
+
+
+def _g2_term(observed, expected):
+    observed = np.maximum(observed, 0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        term = observed * np.log(observed / expected)
+    return np.where(observed > 0, term, 0.0)
+
+
+class BigramStatistics(object):
+    """
+    Unigram and bigram counts of a sequence of token ids.
+
+    ``vocabulary`` lists the types by id and ``unigrams`` holds their
+    counts. ``first``, ``second`` and ``counts`` hold the ids and count of
+    every distinct bigram.
+    """
+    def __init__(self, ids, vocabulary):
+        ids = np.asarray(ids, dtype=np.int64)
+        size = len(vocabulary)
+        self.vocabulary = vocabulary
+        self.n = len(ids)
+
+        if self.n:
+            self.unigrams = np.bincount(ids, minlength=size)
+        else:
+            self.unigrams = np.zeros(size, dtype=np.int64)
+
+        pairs = ids[:-1] * size + ids[1:]
+        pairs.sort()
+        if len(pairs):
+            changes = np.concatenate(([True], pairs[1:] != pairs[:-1]))
+            starts = np.flatnonzero(changes)
+            self.counts = np.diff(np.append(starts, len(pairs)))
+            pairs = pairs[starts]
+        else:
+            self.counts = np.zeros(0, dtype=np.int64)
+        self.first, self.second = pairs // size, pairs % size
+
+    @classmethod
+    def from_tokens(cls, tokens):
+        """
+        Count the lowercased unicode tokens of a sequence.
+        """
+        index = {}
+        ids = np.fromiter(
+            (index.setdefault(t.lower(), len(index)) for t in tokens),
+            dtype=np.int64)
+        vocabulary = [None] * len(index)
+        for t, i in index.items():
+            vocabulary[i] = t
+        return cls(ids, vocabulary)
+
+    @classmethod
+    def from_ids(cls, ids, vocabulary):
+        """
+        Count the lowercase forms of ids of a ``Vocabulary``.
+        """
+        lower = np.frombuffer(vocabulary.lower_ids(ids), dtype=np.intc)
+        return cls(lower, vocabulary.types)
+
+    def _contingency(self):
+        n_ii = self.counts.astype(np.float64)
+        n_ix = self.unigrams[self.first].astype(np.float64)
+        n_xi = self.unigrams[self.second].astype(np.float64)
+        return n_ii, n_ix, n_xi, float(self.n)
+
+    def above_chance(self):
+        """
+        Mask of bigrams whose second word follows the first more often
+        than its overall frequency.
+        """
+        n_ii, n_ix, n_xi, n = self._contingency()
+        return n_ii / n_ix > n_xi / n
+
+    def likelihood_ratio(self):
+        """
+        Dunning's log-likelihood ratio (G-squared) of each bigram.
+        """
+        n_ii, n_ix, n_xi, n = self._contingency()
+        n_io = n_ix - n_ii
+        n_oi = n_xi - n_ii
+        n_oo = n - n_ii - n_io - n_oi
+        n_ox, n_xo = n - n_ix, n - n_xi
+        return 2 * (_g2_term(n_ii, n_ix * n_xi / n) +
+                    _g2_term(n_io, n_ix * n_xo / n) +
+                    _g2_term(n_oi, n_ox * n_xi / n) +
+                    _g2_term(n_oo, n_ox * n_xo / n))
+
+    def pmi(self):
+        """
+        Pointwise mutual information, in bits, of each bigram.
+        """
+        n_ii, n_ix, n_xi, n = self._contingency()
+        return np.log2(n_ii * n / (n_ix * n_xi))
+
+    def scores(self, measure):
+        if measure == 'count':
+            return self.counts
+        if measure not in MEASURES:
+            raise ValueError('unknown association measure %r' % measure)
+        return getattr(self, measure)()
+
+    def top(self, scores, k=None, mask=None):
+        """
+        Return the ``k`` best ``((first, second), score)`` pairs, best first.
+        """
+        if mask is None:
+            indices = np.arange(len(scores))
+        else:
+            indices = np.flatnonzero(mask)
+        values = scores[indices]
+
+        if k is not None and 0 < k < len(indices) and \
+                hasattr(np, 'argpartition'):
+            best = np.argpartition(-values, k - 1)[:k]
+            indices, values = indices[best], values[best]
+        order = np.argsort(-values, kind='mergesort')[:k]
+        indices, values = indices[order], values[order]
+
+        vocabulary = self.vocabulary
+        return [((vocabulary[first], vocabulary[second]), score)
+                for first, second, score in zip(self.first[indices].tolist(),
+                                                self.second[indices].tolist(),
+                                                values.tolist())]
+
+
+def collocations(tokens, measure='count', top=None, min_count=1,
+                 vocabulary=None):
+    """
+    Return bigrams that occur together above chance, best first.
+
+    This is the vectorized counterpart of ``nlp.statistics.collocations``:
+    candidates must pass the same chance test and are ranked by
+    ``measure``, one of ``count``, ``likelihood_ratio`` or ``pmi``. If a
+    ``Vocabulary`` is given, ``tokens`` are its ids.
+    """
+    if vocabulary is not None:
+        statistics = BigramStatistics.from_ids(tokens, vocabulary)
+    else:
+        statistics = BigramStatistics.from_tokens(tokens)
+    mask = statistics.above_chance() & (statistics.counts >= min_count)
+    return statistics.top(statistics.scores(measure), top, mask)
@@ -0,0 +1,243 @@
+"""
+Compact binary storage for token classifier models.
+
+A model file is laid out as:
+
+    header       magic, version, number of classes, number of types and
+                 size of the string table
+    key offsets  (classes + 1) offsets of the class keys in the string table
+    records      count, upper count, abbreviation count, decision flags,
+                 first type and number of types of each class
+    type offsets (types + 1) offsets of the surface types in the string table
+    strings      UTF-8 keys, sorted bytewise, followed by the surface types
+
+All integers are little-endian unsigned 32-bit values. The file is read
+through ``mmap``, so worker processes share its pages and lookups binary
+search the keys in place instead of unpickling a dict of objects.
+"""
+import mmap
+import struct
+from collections import MutableMapping
+from functools import partial
+
+from nlp.statistics.tokens import TokenClass, ABBREVIATION, PROPER_NOUN
+
+MAGIC = 'NLPTCLS\x00'
+VERSION = 1
+
+HEADER = struct.Struct('<8sIIII')
+RECORD = struct.Struct('<IIIIII')
+OFFSETS = struct.Struct('<II')
+OFFSET_SIZE = 4
+
+# The flags are the fourth integer of a record
+FLAGS = struct.Struct('<I')
+FLAGS_OFFSET = 3 * OFFSET_SIZE
+
+CACHE_SIZE = 100000
+
+
+def is_model(file_name):
+    with open(file_name, 'rb') as f:
+        return f.read(len(MAGIC)) == MAGIC
+
+
+def write(classes, file_name):
+    """
+    Write a dict of token classes to ``file_name`` in the binary format.
+    """
+    items = sorted((key.encode('utf-8'), c) for key, c in classes.iteritems())
+    key_offsets, records, strings = [0], [], []
+    size = 0
+    for key, c in items:
+        strings.append(key)
+        size += len(key)
+        key_offsets.append(size)
+
+    type_offsets, n_types = [size], 0
+    for key, c in items:
+        flags = c.decisions
+        types = sorted(t.encode('utf-8') for t in c.types)
+        records.append(RECORD.pack(c.count, c.upper_count, c.abbr_count,
+                                   flags, n_types, len(types)))
+        for t in types:
+            strings.append(t)
+            size += len(t)
+            type_offsets.append(size)
+        n_types += len(types)
+
+    with open(file_name, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, VERSION, len(items), n_types, size))
+        f.write(struct.pack('<%dI' % len(key_offsets), *key_offsets))
+        f.write(''.join(records))
+        f.write(struct.pack('<%dI' % len(type_offsets), *type_offsets))
+        f.write(''.join(strings))
+
+
+class MappedTokenClass(TokenClass):
+    """
+    A token class read from a model file with precomputed decisions.
+
+    The surface types are only decoded from the file when first used.
+    """
+    def __init__(self, count, upper_count, abbr_count, flags, read_types):
+        self.count = count
+        self.upper_count = upper_count
+        self.abbr_count = abbr_count
+        self.length = 0
+        self.flags = flags
+        self._types = None
+        self._read_types = read_types
+
+    @property
+    def types(self):
+        if self._types is None:
+            self._types = self._read_types()
+        return self._types
+
+    def record(self, *args, **kwargs):
+        self.flags = None
+        super(MappedTokenClass, self).record(*args, **kwargs)
+
+    def merge(self, other):
+        self.flags = None
+        return super(MappedTokenClass, self).merge(other)
+
+    @property
+    def decisions(self):
+        if self.flags is None:
+            return TokenClass.decisions.fget(self)
+        return self.flags
+
+    @property
+    def is_abbreviation(self):
+        if self.flags is None:
+            return TokenClass.is_abbreviation.fget(self)
+        return bool(self.flags & ABBREVIATION)
+
+    @property
+    def is_proper_noun(self):
+        if self.flags is None:
+            return TokenClass.is_proper_noun.fget(self)
+        return bool(self.flags & PROPER_NOUN)
+
+
+class MappedClasses(MutableMapping):
+    """
+    A mapping of keys to token classes backed by a memory-mapped model.
+
+    Classes read from the file are read-only; keys set afterwards (such as
+    the unknown tokens recorded by ``TokenClassifier.classify``) are kept
+    in an in-memory overlay. The positions of looked up keys are cached,
+    up to ``cache_size`` keys, so frequent tokens skip the binary search.
+    """
+    def __init__(self, file_name, cache_size=CACHE_SIZE):
+        with open(file_name, 'rb') as f:
+            self.map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.n_classes, self.n_types, _ = \
+            HEADER.unpack_from(self.map, 0)
+        if magic != MAGIC or version != VERSION:
+            self.map.close()
+            raise ValueError('%s is not a version %d token class model' %
+                             (file_name, VERSION))
+
+        self.key_offsets = HEADER.size
+        self.records = self.key_offsets + (self.n_classes + 1) * OFFSET_SIZE
+        self.type_offsets = self.records + self.n_classes * RECORD.size
+        self.strings = self.type_offsets + (self.n_types + 1) * OFFSET_SIZE
+        self.overlay = {}
+        self.cache_size = cache_size
+        self.positions = {}
+
+    def close(self):
+        self.map.close()
+
+    def _string(self, offsets, i):
+        start, end = OFFSETS.unpack_from(self.map, offsets + i * OFFSET_SIZE)
+        return self.map[self.strings + start:self.strings + end]
+
+    def _find(self, key):
+        key = key.encode('utf-8')
+        lo, hi = 0, self.n_classes
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._string(self.key_offsets, mid) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < self.n_classes and self._string(self.key_offsets, lo) == key:
+            return lo
+        return None
+
+    def _position(self, key):
+        try:
+            return self.positions[key]
+        except KeyError:
+            if len(self.positions) >= self.cache_size:
+                self.positions.clear()
+            i = self.positions[key] = self._find(key)
+            return i
+
+    def _record(self, i):
+        return RECORD.unpack_from(self.map, self.records + i * RECORD.size)
+
+    def _types(self, first, n_types):
+        return set(self._string(self.type_offsets, t).decode('utf-8')
+                   for t in xrange(first, first + n_types))
+
+    def _class(self, i):
+        count, upper_count, abbr_count, flags, first, n_types = self._record(i)
+        return MappedTokenClass(count, upper_count, abbr_count, flags,
+                                partial(self._types, first, n_types))
+
+    def __getitem__(self, key):
+        try:
+            return self.overlay[key]
+        except KeyError:
+            i = self._position(key)
+            if i is None:
+                raise KeyError(key)
+            return self._class(i)
+
+    def decide(self, key):
+        """
+        Return the decision flags stored for ``key``, or None if it is not
+        in the file (or is shadowed by the overlay).
+        """
+        if key in self.overlay:
+            return None
+        i = self._position(key)
+        if i is None:
+            return None
+        return FLAGS.unpack_from(self.map, self.records + i * RECORD.size +
+                                 FLAGS_OFFSET)[0]
+
+    def __contains__(self, key):
+        return key in self.overlay or self._position(key) is not None
+
+    def __setitem__(self, key, value):
+        self.overlay[key] = value
+
+    def __delitem__(self, key):
+        if key not in self.overlay and self._find(key) is not None:
+            raise TypeError('mapped token classes are read-only')
+        del self.overlay[key]
+
+    def __iter__(self):
+        for i in xrange(self.n_classes):
+            key = self._string(self.key_offsets, i).decode('utf-8')
+            if key not in self.overlay:
+                yield key
+        for key in self.overlay:
+            yield key
+
+    def __len__(self):
+        shadowed = sum(1 for key in self.overlay
+                       if self._find(key) is not None)
+        return self.n_classes + len(self.overlay) - shadowed
+
+    def copy(self):
+        """
+        Return a dict of plain, mutable token classes.
+        """
+        return dict((key, TokenClass().merge(c)) for key, c in self.iteritems())
@@ -0,0 +1,394 @@
+"""
+Approximate counting in fixed memory.
+
+``CountMinSketch`` answers frequency queries, ``SpaceSaving`` keeps the
+heavy hitters of a stream and ``HyperLogLog`` counts its distinct items.
+All are sized by their error bounds rather than by the number of distinct
+items, are fed incrementally and can be merged, so each process can count
+a share of the corpus and the results can be combined afterwards.
+"""
+from __future__ import division
+
+import hashlib
+import heapq
+import math
+import struct
+import zlib
+from array import array
+
+from nlp.punctuation import abbreviation_score
+
+KEY_SEPARATOR = '\x1f'
+
+
+def _key(item):
+    """
+    Return a byte string for ``item`` that hashes the same in every process.
+    """
+    if isinstance(item, tuple):
+        return KEY_SEPARATOR.join(_key(i) for i in item)
+    if isinstance(item, unicode):
+        return item.encode('utf-8')
+    if isinstance(item, str):
+        return item
+    return repr(item)
+
+
+class CountMinSketch(object):
+    """
+    Estimate the frequency of items in a stream.
+
+    Estimates never undercount, and overcount by more than ``epsilon``
+    times the total count with probability at most ``delta``. The table
+    takes ``ceil(e / epsilon) * ceil(ln(1 / delta))`` counters whatever
+    the number of distinct items.
+    """
+    def __init__(self, epsilon=0.0001, delta=0.01, seed=0):
+        self.epsilon = epsilon
+        self.delta = delta
+        self.seed = seed
+        self.width = int(math.ceil(math.e / epsilon))
+        self.depth = int(math.ceil(math.log(1 / delta)))
+        self.table = array('L', [0]) * (self.width * self.depth)
+        self.n = 0
+
+    def _indices(self, item):
+        data = _key(item)
+        h1 = zlib.crc32(data, self.seed) & 0xffffffff
+        h2 = (zlib.crc32(data, ~self.seed) & 0xffffffff) | 1
+        width = self.width
+        return [row * width + (h1 + row * h2) % width
+                for row in xrange(self.depth)]
+
+    def add(self, item, count=1):
+        table = self.table
+        for i in self._indices(item):
+            table[i] += count
+        self.n += count
+
+    def update(self, items):
+        for item in items:
+            self.add(item)
+
+    def __getitem__(self, item):
+        table = self.table
+        return min(table[i] for i in self._indices(item))
+
+    def get(self, item, default=0):
+        return self[item] or default
+
+    @property
+    def error(self):
+        """
+        The overcount bound of an estimate.
+        """
+        return self.epsilon * self.n
+
+    def distinct(self):
+        """
+        Estimate the number of distinct items by linear counting.
+
+        The estimate saturates at about ``width * ln(width)`` items, so use
+        a ``HyperLogLog`` unless the width is well above the number of
+        distinct items.
+        """
+        zeros = self.table[:self.width].count(0)
+        return self.width * math.log(self.width / max(zeros, 1))
+
+    def merge(self, other):
+        """
+        Add the counts of a sketch built with the same parameters.
+        """
+        if (self.width, self.depth, self.seed) != \
+                (other.width, other.depth, other.seed):
+            raise ValueError('cannot merge sketches of different shapes')
+        table = self.table
+        for i, count in enumerate(other.table):
+            if count:
+                table[i] += count
+        self.n += other.n
+        return self
+
+
+class HyperLogLog(object):
+    """
+    Estimate the number of distinct items in a stream.
+
+    Items are hashed into ``2 ** precision`` registers, which keep the
+    longest run of leading zero bits seen. The relative standard error is
+    about ``1.04 / sqrt(2 ** precision)``, 0.8% with the default 16384
+    one-byte registers.
+    """
+    def __init__(self, precision=14):
+        if not 4 <= precision <= 16:
+            raise ValueError('precision must be between 4 and 16')
+        self.precision = precision
+        self.m = 1 << precision
+        self.registers = array('B', [0]) * self.m
+
+    def add(self, item):
+        x, = struct.unpack('<Q', hashlib.md5(_key(item)).digest()[:8])
+        bits = 64 - self.precision
+        j = x >> bits
+        rank = bits - (x & ((1 << bits) - 1)).bit_length() + 1
+        if rank > self.registers[j]:
+            self.registers[j] = rank
+
+    def update(self, items):
+        for item in items:
+            self.add(item)
+
+    def distinct(self):
+        m = self.m
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / sum(2.0 ** -r for r in self.registers)
+        zeros = self.registers.count(0)
+        if estimate <= 2.5 * m and zeros:
+            # Linear counting is more accurate for small cardinalities
+            return m * math.log(m / zeros)
+        return estimate
+
+    def merge(self, other):
+        """
+        Combine with an estimator of the same precision, as if it had seen
+        both streams.
+        """
+        if self.precision != other.precision:
+            raise ValueError('cannot merge estimators of different precision')
+        registers = self.registers
+        for j, r in enumerate(other.registers):
+            if r > registers[j]:
+                registers[j] = r
+        return self
+
+
+class SpaceSaving(object):
+    """
+    Track the most frequent items of a stream in ``capacity`` counters.
+
+    When the counters are full a new item replaces the least frequent one
+    and inherits its count as error, so counts are upper bounds and every
+    item more frequent than ``n / capacity`` is kept.
+    """
+    def __init__(self, capacity=10000):
+        self.capacity = capacity
+        self.counts = {}
+        self.errors = {}
+        self.heap = []
+        self.n = 0
+
+    def __len__(self):
+        return len(self.counts)
+
+    def __contains__(self, item):
+        return item in self.counts
+
+    def __getitem__(self, item):
+        return self.counts.get(item, 0)
+
+    def _push(self, item, count):
+        heap = self.heap
+        heapq.heappush(heap, (count, item))
+        if len(heap) > 4 * self.capacity:
+            self.heap = [(c, i) for i, c in self.counts.iteritems()]
+            heapq.heapify(self.heap)
+
+    def _pop_min(self):
+        # Entries are pushed on every increment, so skip the stale ones.
+        heap, counts = self.heap, self.counts
+        while True:
+            count, item = heapq.heappop(heap)
+            if counts.get(item) == count:
+                return item, count
+
+    def add(self, item, count=1):
+        counts = self.counts
+        self.n += count
+        if item in counts:
+            counts[item] += count
+        elif len(counts) < self.capacity:
+            counts[item] = count
+            self.errors[item] = 0
+        else:
+            evicted, minimum = self._pop_min()
+            del counts[evicted]
+            del self.errors[evicted]
+            counts[item] = minimum + count
+            self.errors[item] = minimum
+        self._push(item, counts[item])
+
+    def update(self, items):
+        for item in items:
+            self.add(item)
+
+    @property
+    def minimum(self):
+        """
+        The count an unseen item could have, zero until the counters fill.
+        """
+        if len(self.counts) < self.capacity:
+            return 0
+        return min(self.counts.itervalues())
+
+    def guaranteed(self, item):
+        """
+        Return the lower bound of an item's count.
+        """
+        return self.counts.get(item, 0) - self.errors.get(item, 0)
+
+    def top(self, k=None):
+        """
+        Return the ``k`` most frequent ``(item, count)`` pairs, best first.
+        """
+        items = self.counts.iteritems()
+        if k is None:
+            return sorted(items, key=lambda i: i[1], reverse=True)
+        return heapq.nlargest(k, items, key=lambda i: i[1])
+
+    def merge(self, other):
+        """
+        Combine the counters of another summary, keeping the largest.
+
+        Items missing from one summary are charged its minimum count, so
+        merged counts remain upper bounds.
+        """
+        min_self, min_other = self.minimum, other.minimum
+        counts, errors = {}, {}
+        for item in set(self.counts) | set(other.counts):
+            counts[item] = self.counts.get(item, min_self) + \
+                other.counts.get(item, min_other)
+            errors[item] = self.errors.get(item, min_self) + \
+                other.errors.get(item, min_other)
+
+        kept = heapq.nlargest(self.capacity, counts.iteritems(),
+                              key=lambda i: i[1])
+        self.counts = dict(kept)
+        self.errors = dict((item, errors[item]) for item, _ in kept)
+        self.heap = [(c, i) for i, c in kept]
+        heapq.heapify(self.heap)
+        self.n += other.n
+        return self
+
+
+class CollocationCounter(object):
+    """
+    Find collocations in fixed memory.
+
+    Unigram frequencies are estimated with a count-min sketch and the
+    candidate bigrams are the heavy hitters kept by space-saving. With a
+    ``vocabulary``, documents are sequences of its ids and the ids of
+    their lowercase forms are counted.
+    """
+    def __init__(self, epsilon=0.0001, delta=0.01, capacity=100000, seed=0,
+                 vocabulary=None):
+        self.unigrams = CountMinSketch(epsilon, delta, seed)
+        self.bigrams = SpaceSaving(capacity)
+        self.vocabulary = vocabulary
+
+    def feed(self, tokens):
+        """
+        Count the lowercased tokens of one document.
+        """
+        unigrams, bigrams = self.unigrams, self.bigrams
+        if self.vocabulary is not None:
+            tokens = self.vocabulary.lower_ids(tokens)
+        else:
+            tokens = (t.lower() for t in tokens)
+        previous = None
+        for t in tokens:
+            unigrams.add(t)
+            if previous is not None:
+                bigrams.add((previous, t))
+            previous = t
+
+    def merge(self, other):
+        self.unigrams.merge(other.unigrams)
+        self.bigrams.merge(other.bigrams)
+        return self
+
+    def collocations(self, top=None, min_count=1):
+        """
+        Return bigrams that occur together above chance, most frequent first.
+
+        This applies the test of ``nlp.statistics.collocations`` to the
+        approximate counts.
+        """
+        unigrams = self.unigrams
+        candidates = []
+        for b, n in self.bigrams.top():
+            if n < min_count:
+                break
+            f_b = n / unigrams[b[0]]
+            f_w2 = unigrams[b[1]] / unigrams.n
+            if f_b > f_w2:
+                candidates.append((b, n))
+                if top is not None and len(candidates) == top:
+                    break
+        if self.vocabulary is not None:
+            types = self.vocabulary.types
+            candidates = [((types[b[0]], types[b[1]]), n)
+                          for b, n in candidates]
+        return candidates
+
+
+class AbbreviationCounter(object):
+    """
+    Find likely abbreviations in fixed memory.
+
+    Feed it unicode tokens produced with ``ignore_abbreviations=True``, so
+    abbreviations are split from their period, or their ids if a
+    ``vocabulary`` is given. Types followed by a period are tracked with
+    space-saving, the other counts are sketched and the number of types is
+    estimated with a ``HyperLogLog``.
+    """
+    def __init__(self, epsilon=0.0001, delta=0.01, capacity=100000, seed=0,
+                 vocabulary=None):
+        self.tokens = CountMinSketch(epsilon, delta, seed)
+        self.types = HyperLogLog()
+        self.non_abbreviations = CountMinSketch(epsilon, delta, seed)
+        self.abbreviations = SpaceSaving(capacity)
+        self.vocabulary = vocabulary
+
+    def feed(self, tokens):
+        """
+        Count the tokens of one document.
+        """
+        vocabulary = self.vocabulary
+        period = u'.' if vocabulary is None else vocabulary.lookup(u'.')
+        previous = None
+        for t in tokens:
+            if previous is not None:
+                self._count(previous, t == period)
+            previous = t
+        if previous is not None:
+            self._count(previous, False)
+
+    def _count(self, t, is_abbreviation):
+        self.tokens.add(t)
+        self.types.add(t)
+        if is_abbreviation:
+            self.abbreviations.add(t)
+        else:
+            self.non_abbreviations.add(t)
+
+    def merge(self, other):
+        self.tokens.merge(other.tokens)
+        self.types.merge(other.types)
+        self.non_abbreviations.merge(other.non_abbreviations)
+        self.abbreviations.merge(other.abbreviations)
+        return self
+
+    def top(self, n=100):
+        """
+        Return the ``n`` best scoring ``(type, score)`` pairs.
+        """
+        tokens = self.tokens
+        n_tokens, n_types = tokens.n, self.types.distinct()
+        types = self.vocabulary.types if self.vocabulary is not None else None
+        scores = []
+        for t, count in self.abbreviations.top():
+            type = types[t] if types is not None else t
+            scores.append((type, abbreviation_score(
+                count, self.non_abbreviations[t], tokens[t],
+                n_tokens, n_types, len(type))))
+        return heapq.nlargest(n, scores, key=lambda i: i[1])
@@ -0,0 +1,205 @@
+"""
+A persistent n-gram frequency store backed by SQLite.
+
+Counts are kept on disk and updated in place, so a new batch of documents
+only costs a pass over that batch. Lookups and top-k queries run against
+indexed tables instead of loading the counts into memory.
+"""
+from __future__ import division
+
+import heapq
+import sqlite3
+from collections import defaultdict
+
+from nlp.statistics import ngrams
+
+SEPARATOR = u'\x1f'
+ORDERS = (1, 2, 3)
+FLUSH_SIZE = 100000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS ngrams (
+    n INTEGER NOT NULL,
+    gram TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (n, gram)
+);
+CREATE INDEX IF NOT EXISTS ngrams_count ON ngrams (n, count);
+CREATE TABLE IF NOT EXISTS totals (
+    n INTEGER PRIMARY KEY,
+    count INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS batches (
+    id INTEGER PRIMARY KEY,
+    documents INTEGER NOT NULL,
+    tokens INTEGER NOT NULL
+);
+"""
+
+
+def pack(gram):
+    return SEPARATOR.join(gram)
+
+
+def unpack(gram):
+    return tuple(gram.split(SEPARATOR))
+
+
+class FrequencyStore(object):
+    """
+    Unigram, bigram and trigram counts of a growing corpus.
+
+    Documents are sequences of unicode tokens and n-grams never span two
+    documents. Tokens are stored as given, so lowercase them first if
+    counts should ignore case.
+    """
+    def __init__(self, file_name=':memory:', orders=ORDERS):
+        self.orders = orders
+        self.connection = sqlite3.connect(file_name)
+        self.connection.executescript(SCHEMA)
+
+    def close(self):
+        self.connection.close()
+
+    def add_documents(self, documents, flush_size=FLUSH_SIZE):
+        """
+        Add the counts of a batch of documents as one transaction.
+
+        Pending counts are written whenever ``flush_size`` distinct
+        n-grams have accumulated, which bounds the memory of a batch.
+        """
+        counts = defaultdict(int)
+        totals = defaultdict(int)
+        n_documents = n_tokens = 0
+        with self.connection:
+            for tokens in documents:
+                tokens = list(tokens)
+                n_documents += 1
+                n_tokens += len(tokens)
+                for n in self.orders:
+                    for gram in ngrams(tokens, n):
+                        counts[n, pack(gram)] += 1
+                        totals[n] += 1
+                if len(counts) >= flush_size:
+                    self._flush(counts)
+                    counts.clear()
+            self._flush(counts)
+            for n, count in totals.iteritems():
+                self.connection.execute(
+                    'INSERT OR IGNORE INTO totals VALUES (?, 0)', (n,))
+                self.connection.execute(
+                    'UPDATE totals SET count = count + ? WHERE n = ?',
+                    (count, n))
+            self.connection.execute(
+                'INSERT INTO batches (documents, tokens) VALUES (?, ?)',
+                (n_documents, n_tokens))
+
+    def _flush(self, counts):
+        self.connection.executemany(
+            'INSERT OR IGNORE INTO ngrams VALUES (?, ?, 0)', counts.iterkeys())
+        self.connection.executemany(
+            'UPDATE ngrams SET count = count + ? WHERE n = ? AND gram = ?',
+            ((count, n, gram) for (n, gram), count in counts.iteritems()))
+
+    def count(self, gram):
+        """
+        Return the count of a token or a tuple of tokens.
+        """
+        if not isinstance(gram, tuple):
+            gram = (gram,)
+        row = self.connection.execute(
+            'SELECT count FROM ngrams WHERE n = ? AND gram = ?',
+            (len(gram), pack(gram))).fetchone()
+        return row[0] if row else 0
+
+    def total(self, n=1):
+        """
+        Return the number of n-grams counted.
+        """
+        row = self.connection.execute(
+            'SELECT count FROM totals WHERE n = ?', (n,)).fetchone()
+        return row[0] if row else 0
+
+    @property
+    def documents(self):
+        return self.connection.execute(
+            'SELECT COALESCE(SUM(documents), 0) FROM batches').fetchone()[0]
+
+    def prefix(self, tokens, n=None):
+        """
+        Generate the ``(gram, count)`` pairs of n-grams starting with the
+        tuple ``tokens``, or a single token, by default those one token
+        longer.
+        """
+        if isinstance(tokens, basestring):
+            tokens = (tokens,)
+        if n is None:
+            n = len(tokens) + 1
+        start = pack(tokens) + SEPARATOR
+        end = pack(tokens) + unichr(ord(SEPARATOR) + 1)
+        rows = self.connection.execute(
+            'SELECT gram, count FROM ngrams '
+            'WHERE n = ? AND gram >= ? AND gram < ? ORDER BY gram',
+            (n, start, end))
+        for gram, count in rows:
+            yield unpack(gram), count
+
+    def iter_ngrams(self, n=1, min_count=1):
+        """
+        Generate the ``(gram, count)`` pairs of order ``n``, most frequent
+        first.
+        """
+        rows = self.connection.execute(
+            'SELECT gram, count FROM ngrams WHERE n = ? AND count >= ? '
+            'ORDER BY count DESC', (n, min_count))
+        for gram, count in rows:
+            yield unpack(gram), count
+
+    def top(self, n=1, k=10, score=None, min_count=1):
+        """
+        Return the ``k`` best ``(gram, value)`` pairs of order ``n``.
+
+        N-grams are ranked by count unless a ``score(gram, count)``
+        function is given, in which case the rows are streamed and only
+        the best ``k`` are kept.
+        """
+        if score is None:
+            rows = self.connection.execute(
+                'SELECT gram, count FROM ngrams WHERE n = ? AND count >= ? '
+                'ORDER BY count DESC LIMIT ?', (n, min_count, k))
+            return [(unpack(gram), count) for gram, count in rows]
+        scored = ((gram, score(gram, count))
+                  for gram, count in self.iter_ngrams(n, min_count))
+        return heapq.nlargest(k, scored, key=lambda i: i[1])
+
+    def collocations(self, top=None, min_count=1):
+        """
+        Return bigrams that occur together above chance, most frequent first.
+
+        This is ``nlp.statistics.collocations`` over the stored counts, so
+        store lowercased tokens to get the same result. Bigrams are joined
+        to the counts of their two tokens and filtered in a single query;
+        a store without unigram counts has no collocations to find.
+        """
+        n_unigrams = self.total(1)
+        if not n_unigrams:
+            if self.total(2):
+                raise ValueError('collocations need the unigram counts')
+            return []
+        # n / count(first) > count(second) / n_unigrams, without division
+        query = (
+            'SELECT b.gram, b.count FROM ngrams AS b '
+            'JOIN ngrams AS u1 ON u1.n = 1 '
+            'AND u1.gram = substr(b.gram, 1, instr(b.gram, :separator) - 1) '
+            'JOIN ngrams AS u2 ON u2.n = 1 '
+            'AND u2.gram = substr(b.gram, instr(b.gram, :separator) + 1) '
+            'WHERE b.n = 2 AND b.count >= :min_count '
+            'AND b.count * :total > u1.count * u2.count '
+            'ORDER BY b.count DESC, b.gram')
+        parameters = {'separator': SEPARATOR, 'min_count': min_count,
+                      'total': n_unigrams}
+        if top is not None:
+            query += ' LIMIT :top'
+            parameters['top'] = top
+        return [(unpack(gram), count) for gram, count
+                in self.connection.execute(query, parameters)]
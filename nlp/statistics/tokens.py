@@ -1,8 +1,12 @@
 from __future__ import division
 import re
 import pickle
+from array import array
+from itertools import islice
 
-from nlp import punctuation
+from nlp import parallel, punctuation
+from nlp.cache import LRUCache
+from nlp.corpus import Corpus
 from nlp.encoding import encode
 
 ALPHA_START_PATTERN = r'^\w(?<=[^\d\-])'
@@ -14,12 +18,31 @@ ABBREVIATION_RE = re.compile(ABBREVIATION_PATTERN)
 ABBREVIATION_THRESHOLD = 0.788
 PROPER_NOUN_THRESHOLD = 0.9
 
+# Decision flags
+ABBREVIATION = 1
+PROPER_NOUN = 2
+
+# Token kinds, set by the tokenizer from the branch that matched a token
+WORD, NUMBER, URL, ABBR, PUNCT, NEWLINE, TAG = range(1, 8)
+NO_KIND = 0
+
+SHARD_SIZE = 100
+
 
 class Token(object):
-    def __init__(self, type, start=None, end=None):
+    __slots__ = ('type', 'start', 'end', 'kind')
+
+    def __init__(self, type, start=None, end=None, kind=None):
         self.type = type
         self.start = start
         self.end = end
+        self.kind = kind
+
+    def __getstate__(self):
+        return self.type, self.start, self.end, self.kind
+
+    def __setstate__(self, state):
+        self.type, self.start, self.end, self.kind = state
 
     def __nonzero__(self):
         return True if self.type else False
@@ -32,6 +55,96 @@ class Token(object):
 
 EMPTY_TOKEN = Token(u'')
 
+NO_OFFSET = -1
+
+
+class TokenArray(object):
+    """
+    A compact, column-oriented sequence of tokens.
+
+    Token types are interned in a type table and offsets and kinds are
+    stored in integer arrays, so a token costs a few bytes instead of a
+    ``Token`` object and its own string. Indexing and iteration build
+    lightweight ``Token`` objects on demand; slicing returns a new
+    ``TokenArray`` that shares the type table.
+    """
+    def __init__(self, tokens=(), types=None, type_ids=None):
+        self.types = [] if types is None else types
+        self.type_ids = {} if type_ids is None else type_ids
+        self.ids = array('i')
+        self.starts = array('l')
+        self.ends = array('l')
+        self.kinds = array('B')
+        for t in tokens:
+            self.append(t)
+
+    def add(self, type, start=None, end=None, kind=None):
+        try:
+            type_id = self.type_ids[type]
+        except KeyError:
+            type_id = self.type_ids[type] = len(self.types)
+            self.types.append(type)
+        self.ids.append(type_id)
+        self.starts.append(NO_OFFSET if start is None else start)
+        self.ends.append(NO_OFFSET if end is None else end)
+        self.kinds.append(NO_KIND if kind is None else kind)
+
+    def append(self, token):
+        self.add(token.type, token.start, token.end, token.kind)
+
+    def extend(self, tokens):
+        for t in tokens:
+            self.append(t)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def _token(self, i):
+        start, end, kind = self.starts[i], self.ends[i], self.kinds[i]
+        return Token(self.types[self.ids[i]],
+                     None if start == NO_OFFSET else start,
+                     None if end == NO_OFFSET else end,
+                     None if kind == NO_KIND else kind)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            tokens = TokenArray(types=self.types, type_ids=self.type_ids)
+            tokens.ids = self.ids[i]
+            tokens.starts = self.starts[i]
+            tokens.ends = self.ends[i]
+            tokens.kinds = self.kinds[i]
+            return tokens
+        if i < 0:
+            i += len(self.ids)
+        if not 0 <= i < len(self.ids):
+            raise IndexError('token index out of range')
+        return self._token(i)
+
+    def __iter__(self):
+        for i in xrange(len(self.ids)):
+            yield self._token(i)
+
+    def as_unicode(self):
+        types = self.types
+        return [types[i] for i in self.ids]
+
+
+def contexts(tokens):
+    """
+    Generate each token with its left and right context tokens.
+    """
+    tokens = iter(tokens)
+    for t in tokens:
+        break
+    else:
+        return
+
+    left_context = EMPTY_TOKEN
+    for right_context in tokens:
+        yield left_context, t, right_context
+        left_context, t = t, right_context
+    yield left_context, t, EMPTY_TOKEN
+
 
 class TokenClass(object):
     def __init__(self):
@@ -52,6 +165,15 @@ class TokenClass(object):
            (right_context.type == u'.' or token.type.endswith(u'.')):
             self.abbr_count += 1
 
+    def merge(self, other):
+        """Adds the counts and types of another class to this class"""
+        self.count += other.count
+        self.upper_count += other.upper_count
+        self.abbr_count += other.abbr_count
+        self.length += other.length
+        self.types.update(other.types)
+        return self
+
     @property
     def capitalized(self):
         """Returns the first capitalized type for this class if it exists"""
@@ -67,7 +189,7 @@ class TokenClass(object):
         return self.normalize()
 
     def normalize(self):
-        return list(self.types)[0].lower()
+        return next(iter(self.types)).lower()
 
     @property
     def p_abbreviation(self):
@@ -94,25 +216,64 @@ class TokenClass(object):
         else:
             return False
 
+    @property
+    def decisions(self):
+        """Returns the abbreviation and proper noun decisions as flags"""
+        return ((ABBREVIATION if self.is_abbreviation else 0) |
+                (PROPER_NOUN if self.is_proper_noun else 0))
+
+
+class FrozenTokenClass(TokenClass):
+    """
+    A token class shared between lookups that cannot record tokens.
+    """
+    def record(self, *args, **kwargs):
+        raise TypeError('frozen token classes cannot record tokens')
+
+    def merge(self, other):
+        raise TypeError('frozen token classes cannot be merged into')
+
+UNKNOWN_CLASS = FrozenTokenClass()
+UNKNOWN_CLASS.types.add(u'')
+
 
 class TokenClassifier(object):
     token_class = TokenClass
 
-    def __init__(self, file_name=None):
+    def __init__(self, file_name=None, read_only=False, unknown_cache_size=0):
+        """
+        In ``read_only`` mode ``classify`` never adds classes for unknown
+        tokens. It returns the shared ``UNKNOWN_CLASS`` or, if
+        ``unknown_cache_size`` is set, a class from a bounded LRU cache of
+        the unknown tokens passed to ``observe``.
+
+        The cache is not locked, so a classifier with one must be used by
+        one thread at a time; share a ``CompiledTokenClassifier`` instead.
+        """
         self.classes = {}
         self.count = None
+        self.read_only = read_only
+        self.unknown = LRUCache(unknown_cache_size) \
+            if unknown_cache_size else None
         if file_name:
-            with open(file_name) as f:
-                self.classes = pickle.load(f)
+            from nlp.statistics import models
+            if models.is_model(file_name):
+                self.classes = models.MappedClasses(file_name)
+            else:
+                with open(file_name) as f:
+                    self.classes = pickle.load(f)
+
+    def thaw(self):
+        """
+        Copy memory-mapped classes into a mutable dict for training.
+        """
+        if not isinstance(self.classes, dict):
+            self.classes = self.classes.copy()
 
     def train(self, tokens, verbose=False):
         self.count = None
-        n_tokens = len(tokens)
-        for i in range(n_tokens):
-            t = tokens[i]
-            left_context = tokens[i - 1] if i > 0 else EMPTY_TOKEN
-            right_context = tokens[i + 1] if i < n_tokens - 1 else EMPTY_TOKEN
-
+        self.thaw()
+        for left_context, t, right_context in contexts(tokens):
             key = self.normalize(t)
             self.classes.setdefault(key, TokenClass())
             self.classes[key].record(t, left_context, right_context)
@@ -132,9 +293,55 @@ class TokenClassifier(object):
 
             print '-' * 80
 
-    def save(self, file_name):
+    def train_parallel(self, documents, workers=1, tokenize=None,
+                       shard_size=SHARD_SIZE):
+        """
+        Train on shards of documents in ``workers`` processes and merge them.
+
+        Documents are token sequences, or texts if a picklable ``tokenize``
+        function is given. The result is identical to calling ``train`` on
+        each document in turn. A ``Corpus`` is sharded into slices, which
+        the workers read from their own mapping of its files.
+        """
+        if isinstance(documents, Corpus):
+            shards = documents.chunks(shard_size)
+        else:
+            documents = iter(documents)
+            shards = iter(lambda: list(islice(documents, shard_size)), [])
+        shards = ((shard, tokenize) for shard in shards)
+        for _, classes in parallel.imap(_train_shard, shards,
+                                        workers=workers, ordered=False):
+            self.merge(classes)
+
+    def merge(self, other):
+        """
+        Add the counts of another classifier, or its classes, to this one.
+        """
+        self.count = None
+        self.thaw()
+        classes = getattr(other, 'classes', other)
+        for key, c in classes.iteritems():
+            try:
+                self.classes[key].merge(c)
+            except KeyError:
+                self.classes[key] = TokenClass().merge(c)
+        return self
+
+    def save(self, file_name, binary=False):
+        """
+        Save the classes as a pickle or, if ``binary``, in the compact
+        memory-mappable format of ``nlp.statistics.models``.
+        """
+        if binary:
+            from nlp.statistics import models
+            models.write(self.classes, file_name)
+            return
+
+        classes = self.classes
+        if not isinstance(classes, dict):
+            classes = classes.copy()
         with open(file_name, 'w') as f:
-            pickle.dump(self.classes, f)
+            pickle.dump(classes, f)
 
     def __len__(self):
         if not self.count:
@@ -146,13 +353,64 @@ class TokenClassifier(object):
         try:
             return self.classes[key]
         except KeyError:
-            self.classes[key] = TokenClass()
-            self.classes[key].record(token)
-            return self.classes[key]
+            if not self.read_only:
+                self.classes[key] = TokenClass()
+                self.classes[key].record(token)
+                return self.classes[key]
+
+        if self.unknown is None:
+            return UNKNOWN_CLASS
+        return self.unknown.get(key, UNKNOWN_CLASS)
+
+    def observe(self, token):
+        """
+        Record a sighting of ``token`` in the unknown cache if a read-only
+        classifier has no class for it.
+
+        ``classify`` and ``decide`` only look the cache up, so a token that
+        is asked about more than once still counts once. ``iter_segment``
+        observes each token as it reaches it.
+        """
+        if self.unknown is None or not self.read_only:
+            return
+        key = self.normalize(token)
+        if key in self.classes:
+            return
+        try:
+            c = self.unknown[key]
+        except KeyError:
+            c = self.unknown[key] = TokenClass()
+        c.record(token)
+
+    def decide(self, token, flags=ABBREVIATION | PROPER_NOUN):
+        """
+        Return the decision flags of the class of ``token``.
+
+        Only the decisions asked for in ``flags`` are computed, so callers
+        that need one of them skip the probability of the other. Classes of
+        a memory-mapped model answer from the flags stored in the file,
+        without building a class object.
+        """
+        decide = getattr(self.classes, 'decide', None)
+        if decide is not None:
+            decisions = decide(self.normalize(token))
+            if decisions is not None:
+                return decisions & flags
+        c = self.classify(token)
+        return ((ABBREVIATION if flags & ABBREVIATION and c.is_abbreviation
+                 else 0) |
+                (PROPER_NOUN if flags & PROPER_NOUN and c.is_proper_noun
+                 else 0))
 
     def normalize(self, token):
         return token.type.lower()
 
+    def compile(self):
+        """
+        Return a frozen ``CompiledTokenClassifier`` of the current classes.
+        """
+        return CompiledTokenClassifier(self)
+
     @property
     def abbreviations(self):
         return [c for c in self.classes.values() if c.is_abbreviation]
@@ -162,13 +420,58 @@ class TokenClassifier(object):
         return [c for c in self.classes.values() if c.is_proper_noun]
 
 
+class CompiledTokenClassifier(object):
+    """
+    A frozen classifier that answers from flat lookup tables.
+
+    Decision flags and capitalized forms are computed once per class, so
+    ``decide`` is a single dict lookup instead of a chain of probability
+    properties. Unknown tokens get no flags, exactly like the fresh class
+    that ``TokenClassifier.classify`` records for them, but nothing is
+    ever added to the tables.
+
+    An empty compiled classifier is falsy, so test for a missing classifier
+    with ``is None``.
+    """
+    def __init__(self, classifier):
+        self.count = len(classifier)
+        self.decisions = {}
+        self.capitalized = {}
+        for key, c in classifier.classes.iteritems():
+            decisions = c.decisions
+            if decisions:
+                self.decisions[key] = decisions
+            self.capitalized[key] = c.capitalized
+
+    def __len__(self):
+        return self.count
+
+    def normalize(self, token):
+        return token.type.lower()
+
+    def decide(self, token, flags=ABBREVIATION | PROPER_NOUN):
+        return self.decisions.get(token.type.lower(), 0) & flags
+
+    def capitalize(self, token):
+        """
+        Return the capitalized form of ``token``'s class, or its own type.
+        """
+        return self.capitalized.get(token.type.lower(), token.type)
+
+
+def _train_shard(args):
+    documents, tokenize = args
+    classifier = TokenClassifier()
+    for document in documents:
+        classifier.train(tokenize(document) if tokenize else document)
+    return classifier.classes
+
+
 if __name__ == '__main__':
-    import corpus.text
-    from corpus.tokenizers import es
+    import sys
+    from nlp.tokenizers import es
 
-    text = corpus.text.articles(limit=None)
-    tokens = es.tokenize(text)
     c = TokenClassifier()
-    c.train(tokens)
+    c.train_parallel(Corpus(sys.argv[1]), tokenize=es.tokenize)
     for t in c.abbreviations:
-        print t.capitalized
+        print encode(t.capitalized)
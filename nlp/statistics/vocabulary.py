@@ -0,0 +1,326 @@
+"""
+Interning of token types to dense integer ids.
+
+A ``Vocabulary`` gives each type the next free id the first time it is
+seen, and interns its lowercase form along with it, so a sequence of ids
+can be lowercased or tested for capitalization by array lookups instead
+of string operations. The statistics modules accept id sequences with the
+vocabulary that encoded them.
+
+A saved vocabulary is laid out as:
+
+    header       magic, version, number of types and size of the string
+                 table
+    offsets      (types + 1) offsets of the types in the string table
+    lower        id of the lowercase form of each type
+    flags        capitalization flags of each type
+    order        ids sorted by their UTF-8 types, for lookups in place
+    strings      UTF-8 types in id order
+
+All integers are little-endian unsigned 32-bit values. A vocabulary
+loaded with ``mmap=True`` reads the file in place and is frozen.
+"""
+import mmap as _mmap
+import struct
+from array import array
+
+from nlp import punctuation
+
+MAGIC = 'NLPVOCB\x00'
+VERSION = 1
+
+HEADER = struct.Struct('<8sIII')
+OFFSETS = struct.Struct('<II')
+INTEGER = struct.Struct('<I')
+
+# Capitalization flags
+CAPITALIZED = 1
+UPPER = 2
+
+
+def _flags(type):
+    return ((CAPITALIZED if punctuation.is_capitalized(type) else 0) |
+            (UPPER if type.isupper() else 0))
+
+
+class Vocabulary(object):
+    """
+    A two-way mapping between token types and dense integer ids.
+
+    ``types`` lists the types by id and ``ids`` maps them back. ``lower``
+    and ``flags`` hold the id of the lowercase form and the capitalization
+    flags of every id. Once frozen, no ids are added and encoding an
+    unknown type raises a ``KeyError`` unless an ``unknown`` id is given.
+    """
+    def __init__(self, types=()):
+        self.types = []
+        self.ids = {}
+        self.lower = array('i')
+        self.flags = array('B')
+        self.frozen = False
+        for t in types:
+            self.add(t)
+
+    def __len__(self):
+        return len(self.types)
+
+    def __iter__(self):
+        return iter(self.types)
+
+    def __contains__(self, type):
+        return type in self.ids
+
+    def __getitem__(self, type):
+        return self.ids[type]
+
+    def get(self, type, default=None):
+        return self.ids.get(type, default)
+
+    def add(self, type):
+        """
+        Return the id of ``type``, adding it and its lowercase form.
+        """
+        try:
+            return self.ids[type]
+        except KeyError:
+            if self.frozen:
+                raise KeyError('%r is not in the frozen vocabulary' % type)
+
+        i = self.ids[type] = len(self.types)
+        self.types.append(type)
+        self.lower.append(i)
+        self.flags.append(_flags(type))
+        lower = type.lower()
+        if lower != type:
+            self.lower[i] = self.add(lower)
+        return i
+
+    def lookup(self, type):
+        """
+        Return the id of ``type``, adding it unless the vocabulary is
+        frozen, in which case unknown types have the id None.
+        """
+        if self.frozen:
+            return self.ids.get(type)
+        return self.add(type)
+
+    def freeze(self):
+        self.frozen = True
+        return self
+
+    def is_capitalized(self, i):
+        return bool(self.flags[i] & CAPITALIZED)
+
+    def encode(self, tokens, lower=False, unknown=None, as_numpy=False):
+        """
+        Return the ids of a sequence of types or ``Token`` objects.
+
+        Ids are returned in an ``array('i')``, or a NumPy array sharing its
+        memory if ``as_numpy``. With ``lower`` every token is mapped to the
+        id of its lowercase form.
+        """
+        ids = array('i', self.iter_encode(tokens, lower, unknown))
+        if as_numpy:
+            import numpy as np
+            return np.frombuffer(ids, dtype=np.intc)
+        return ids
+
+    def iter_encode(self, tokens, lower=False, unknown=None):
+        """
+        Generate the ids of a sequence of types or ``Token`` objects.
+        """
+        get, add = self.ids.get, self.add
+        lowercase = self.lower
+        for t in tokens:
+            if not isinstance(t, basestring):
+                t = t.type
+            i = get(t)
+            if i is None:
+                if self.frozen and unknown is not None:
+                    yield unknown
+                    continue
+                i = add(t)
+            yield lowercase[i] if lower else i
+
+    def decode(self, ids):
+        """
+        Return the types of a sequence of ids.
+        """
+        types = self.types
+        return [types[i] for i in ids]
+
+    def lower_ids(self, ids):
+        """
+        Return the ids of the lowercase forms of a sequence of ids.
+        """
+        lower = self.lower
+        return array('i', (lower[i] for i in ids))
+
+    def save(self, file_name):
+        types = [t.encode('utf-8') for t in self.types]
+        offsets, size = [0], 0
+        for t in types:
+            size += len(t)
+            offsets.append(size)
+        order = sorted(xrange(len(types)), key=types.__getitem__)
+
+        n = len(types)
+        with open(file_name, 'wb') as f:
+            f.write(HEADER.pack(MAGIC, VERSION, n, size))
+            f.write(struct.pack('<%dI' % (n + 1), *offsets))
+            f.write(struct.pack('<%dI' % n, *self.lower))
+            f.write(struct.pack('<%dI' % n, *self.flags))
+            f.write(struct.pack('<%dI' % n, *order))
+            f.write(''.join(types))
+
+    @classmethod
+    def load(cls, file_name, mmap=False):
+        """
+        Load a saved vocabulary, or map it read-only if ``mmap``.
+        """
+        if mmap:
+            return MappedVocabulary(file_name)
+
+        with open(file_name, 'rb') as f:
+            data = f.read()
+        n, size = _header(data, file_name)
+        columns = struct.unpack_from('<%dI' % (4 * n + 1), data, HEADER.size)
+        offsets = columns[:n + 1]
+        strings = HEADER.size + (4 * n + 1) * INTEGER.size
+
+        vocabulary = cls()
+        vocabulary.types = [
+            data[strings + offsets[i]:strings + offsets[i + 1]].decode('utf-8')
+            for i in xrange(n)]
+        vocabulary.ids = dict((t, i) for i, t in enumerate(vocabulary.types))
+        vocabulary.lower = array('i', columns[n + 1:2 * n + 1])
+        vocabulary.flags = array('B', columns[2 * n + 1:3 * n + 1])
+        return vocabulary
+
+
+def _header(data, file_name):
+    magic, version, n, size = HEADER.unpack_from(data, 0)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError('%s is not a version %d vocabulary' %
+                         (file_name, VERSION))
+    return n, size
+
+
+class _MappedColumn(object):
+    """
+    A column of integers read in place from a mapped vocabulary.
+    """
+    def __init__(self, map, position, length):
+        self.map = map
+        self.position = position
+        self.length = length
+
+    def __len__(self):
+        return self.length
+
+    def __getitem__(self, i):
+        if not 0 <= i < self.length:
+            raise IndexError('vocabulary id out of range')
+        return INTEGER.unpack_from(self.map, self.position + 4 * i)[0]
+
+
+class _MappedTypes(_MappedColumn):
+    def __init__(self, map, position, length, strings):
+        super(_MappedTypes, self).__init__(map, position, length)
+        self.strings = strings
+
+    def raw(self, i):
+        """
+        Return the UTF-8 bytes of type ``i``.
+        """
+        start, end = OFFSETS.unpack_from(self.map, self.position + 4 * i)
+        return self.map[self.strings + start:self.strings + end]
+
+    def __getitem__(self, i):
+        if not 0 <= i < self.length:
+            raise IndexError('vocabulary id out of range')
+        return self.raw(i).decode('utf-8')
+
+    def __iter__(self):
+        for i in xrange(self.length):
+            yield self[i]
+
+
+class _MappedIndex(object):
+    """
+    Look up the id of a type by binary search of the sorted order column.
+    """
+    def __init__(self, types, order):
+        self.types = types
+        self.order = order
+
+    def get(self, type, default=None):
+        # The order column is sorted by UTF-8 bytes, so compare the mapped
+        # bytes without decoding them
+        key = type.encode('utf-8')
+        raw, order = self.types.raw, self.order
+        lo, hi = 0, len(order)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if raw(order[mid]) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < len(order) and raw(order[lo]) == key:
+            return order[lo]
+        return default
+
+    def __getitem__(self, type):
+        i = self.get(type)
+        if i is None:
+            raise KeyError(type)
+        return i
+
+    def __contains__(self, type):
+        return self.get(type) is not None
+
+
+class MappedVocabulary(Vocabulary):
+    """
+    A frozen vocabulary read in place from a memory-mapped file.
+
+    Worker processes mapping the same file share its pages. Lookups of
+    types binary search the file, so encode with an in-memory
+    ``Vocabulary`` when speed matters more than memory. It pickles as its
+    file name, which is mapped again when it is unpickled.
+    """
+    def __init__(self, file_name):
+        self.file_name = file_name
+        self._open()
+
+    def _open(self):
+        file_name = self.file_name
+        with open(file_name, 'rb') as f:
+            self.map = _mmap.mmap(f.fileno(), 0, access=_mmap.ACCESS_READ)
+        try:
+            n, _ = _header(self.map, file_name)
+        except ValueError:
+            self.map.close()
+            raise
+
+        position = HEADER.size
+        strings = position + (4 * n + 1) * INTEGER.size
+        self.types = _MappedTypes(self.map, position, n, strings)
+        position += (n + 1) * INTEGER.size
+        self.lower = _MappedColumn(self.map, position, n)
+        position += n * INTEGER.size
+        self.flags = _MappedColumn(self.map, position, n)
+        position += n * INTEGER.size
+        order = _MappedColumn(self.map, position, n)
+        self.ids = _MappedIndex(self.types, order)
+        self.frozen = True
+
+    def close(self):
+        self.map.close()
+
+    def __getstate__(self):
+        return {'file_name': self.file_name}
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._open()
@@ -0,0 +1,7 @@
+from nlp.registry import Registry
+
+registry = Registry('tokenizer')
+registry.register('nlp.tokenizers.es', 'spanish', iso2='es', iso3='spa',
+                  aliases=('esp',))
+
+get_for_language = registry.get_for_language
@@ -1,10 +1,17 @@
 #-*- coding: utf-8 -*
 import re
 import os
+from functools import partial
 
-from nlp import punctuation
+from nlp import parallel, punctuation
+from nlp.corpus import Corpus
 from nlp.encoding import decode
-from nlp.statistics.tokens import Token, EMPTY_TOKEN, TokenClassifier
+from nlp.statistics.tokens import (
+    Token, TokenArray, TokenClassifier, contexts, ABBREVIATION, PROPER_NOUN,
+    WORD, NUMBER, URL, ABBR, PUNCT, NEWLINE, TAG
+)
+
+CHUNK_SIZE = 64 * 1024
 
 ROOT = os.path.dirname(__file__)
 CLASS_FILE = os.path.join(ROOT, 'pickle', 'spanish.pickle')
@@ -24,12 +31,12 @@ except IOError:
 """
 
 URL_PATTERN = r"""
-([a-z]{2,4}\:\/\/)?                      # Protocol
-([a-z][a-z0-9_\-]*\.)+                   # Domains
+(?:[a-z]{2,4}\:\/\/)?                    # Protocol
+(?:[a-z][a-z0-9_\-]*\.)+                 # Domains
 [a-z]{2,4}                               # TLD
-(\/[a-z0-9_\-]+)*                        # Path
-(\/|\.[a-z]{2,5})?                       # Extension
-(\?[a-z0-9\_\-]+\=[a-z0-9\_\-\\\%]+)?    # Parameters
+(?:\/[a-z0-9_\-]+)*                      # Path
+(?:\/|\.[a-z]{2,5})?                     # Extension
+(?:\?[a-z0-9\_\-]+\=[a-z0-9\_\-\\\%]+)?  # Parameters
 (?:\&[a-z0-9\_\-]+\=[a-z0-9_\-\\\%]+)*   # Parameters
 """
 
@@ -43,36 +50,106 @@ ABBREVIATIONS = map(decode, [
     'Dr.', 'Dra.', 'Prof.'
     'vs.', 'etc.',
 ])
-ABBREVIATION_PATTERN = r'(%s|([BCDFGKLMNPQRSTVXZ]{1,2}\.)+)' % u'|'.join(
+ABBREVIATION_PATTERN = r'(?:%s|(?:[BCDFGKLMNPQRSTVXZ]{1,2}\.)+)' % u'|'.join(
     [re.escape(a) for a in ABBREVIATIONS])
 ABBREVIATION_RE = re.compile(ABBREVIATION_PATTERN)
 
 SENTENCE_OPENERS_PATTERN = r'[%s]' % re.escape('¡¿')
 SENTENCE_OPENERS_RE = re.compile(SENTENCE_OPENERS_PATTERN)
 
+NUMERAL_PATTERN = r"(?:(?:US)?\$|\#)?\d+(?:[\.\,\-]\d+)?(?:%|\b)"
+WORD_PATTERN = r"\w+(?:-\w+)*(?:\'s|\xb4s)?"
+
 TOKEN_RE = re.compile(r"""
 %s|%s|%s|                                # Abbreviations, URLs, and tags
-((US)?\$|\#)?\d+([\.\,\-]\d+)?(%%|\b)|   # Numerals, money and percentages
-\w+(-\w+)*(\'s|\xb4s)?|                  # Words (possibly hyphenated)
+%s|                                      # Numerals, money and percentages
+%s|                                      # Words (possibly hyphenated)
 \n|\r\n|%s                               # Newlines and punctuation
 """ % (
     ABBREVIATION_PATTERN,
     URL_PATTERN,
     TAG_PATTERN,
+    NUMERAL_PATTERN,
+    WORD_PATTERN,
     punctuation.PUNCTUATION_PATTERN
 ), re.U | re.X | re.I)
 
 TOKEN_RE_NO_ABBR = re.compile(r"""
-%s|%s|                                   # Abbreviations, URLs, and tags
-((US)?\$|\#)?\d+([\.\,\-]\d+)?(%%|\b)|   # Numerals, money and percentages
-\w+(-\w+)*(\'s|\xb4s)?|                  # Words (possibly hyphenated)
+%s|%s|                                   # URLs and tags
+%s|                                      # Numerals, money and percentages
+%s|                                      # Words (possibly hyphenated)
 \n|\r\n|%s                               # Newlines and punctuation
 """ % (
     URL_PATTERN,
     TAG_PATTERN,
+    NUMERAL_PATTERN,
+    WORD_PATTERN,
     punctuation.PUNCTUATION_PATTERN
 ), re.U | re.X | re.I)
 
+# TOKEN_RE tries every branch at every position, and the URL branch
+# backtracks through each word looking for a domain. The dispatch patterns
+# below match the same tokens, but first try two specialised matchers for
+# the common cases, each guarded so that it only fires where no earlier
+# branch of TOKEN_RE could match:
+#
+#   * a run of letters not followed by anything that could continue a
+#     word, abbreviation, URL or amount (US$) is a plain word;
+#   * a punctuation character that cannot start a tag, an amount, an
+#     ellipsis or a word, or a period not followed by another, is a plain
+#     punctuation token.
+#
+# Anything else falls through to the branches of TOKEN_RE in their order,
+# where abbreviations and URLs are only attempted when the prefilter, a
+# condition all of them satisfy, matches.
+PLAIN_WORD_PATTERN = r"[^\W\d_]+(?![\w\-\.\:\$\'\xb4])"
+PLAIN_PUNCTUATION_PATTERN = r'%s|\.(?!\.)' % punctuation.character_class(
+    [], [c for c in punctuation.PUNCTUATION
+         if not re.match(r'[\w\<\$\#\.]', c, re.U | re.I)])
+DOMAIN_PREFILTER_PATTERN = r"(?=[a-z][a-z0-9_\-]*[\.\:])"
+
+
+def _dispatch_re(abbreviations=True):
+    """
+    Compile a dispatch pattern with one named group per branch.
+
+    The name of the group that matched gives the kind of the token through
+    ``BRANCH_KINDS``.
+    """
+    return re.compile(r"""
+(?P<plain_word>%s)|(?P<plain_punctuation>%s)|  # Plain words and punctuation
+%s(?:%s(?P<url>%s))|(?P<tag>%s)|         # Abbreviations, URLs, and tags
+(?P<numeral>%s)|                         # Numerals, money and percentages
+(?P<word>%s)|                            # Words (possibly hyphenated)
+(?P<newline>\n|\r\n)|(?P<punctuation>%s)  # Newlines and punctuation
+""" % (
+        PLAIN_WORD_PATTERN,
+        PLAIN_PUNCTUATION_PATTERN,
+        DOMAIN_PREFILTER_PATTERN,
+        r'(?P<abbreviation>%s)|' % ABBREVIATION_PATTERN
+        if abbreviations else u'',
+        URL_PATTERN,
+        TAG_PATTERN,
+        NUMERAL_PATTERN,
+        WORD_PATTERN,
+        punctuation.PUNCTUATION_PATTERN
+    ), re.U | re.X | re.I)
+
+DISPATCH_RE = _dispatch_re()
+DISPATCH_RE_NO_ABBR = _dispatch_re(abbreviations=False)
+
+BRANCH_KINDS = {
+    'plain_word': WORD,
+    'plain_punctuation': PUNCT,
+    'abbreviation': ABBR,
+    'url': URL,
+    'tag': TAG,
+    'numeral': NUMBER,
+    'word': WORD,
+    'newline': NEWLINE,
+    'punctuation': PUNCT,
+}
+
 STACK_PUNCTUATION = punctuation.STACK_PUNCTUATION + (
     (decode('¿'), u'?'),
     (decode('¡'), u'!'),
@@ -85,16 +162,42 @@ class SpanishPunctuationStack(punctuation.PunctuationStack):
             punctuation=STACK_PUNCTUATION)
 
 
-def tokenize(text, ignore_abbreviations=False, as_unicode=False):
-    regex = TOKEN_RE_NO_ABBR if ignore_abbreviations else TOKEN_RE
-    tokens, last = [], EMPTY_TOKEN
+def _branch_kinds(regex):
+    """
+    Return the token kinds of the groups of a dispatch pattern by index.
+    """
+    kinds = [None] * (regex.groups + 1)
+    for name, i in regex.groupindex.iteritems():
+        kinds[i] = BRANCH_KINDS[name]
+    return kinds
+
+
+def _tokens(regex, text, offset=0):
+    """
+    Generate the tokens of ``text`` matched by a dispatch pattern.
+
+    Each token gets its kind from the branch that matched. Newlines and
+    <br> tags become BR tokens of kind NEWLINE that keep their offsets.
+    """
+    kinds = _branch_kinds(regex)
     for m in regex.finditer(text):
-        t = Token(m.group(0), m.start(0), m.end(0))
-        if t.match(punctuation.NEWLINE_RE):
-            t = Token(punctuation.BR)
-        if t:
-            last = t
-            tokens.append(t)
+        kind = kinds[m.lastindex]
+        start, end = m.span()
+        token = m.group()
+        if kind == NEWLINE or kind == TAG and token == punctuation.BR:
+            yield Token(punctuation.BR, start + offset, end + offset, NEWLINE)
+        else:
+            yield Token(token, start + offset, end + offset, kind)
+
+
+def tokenize(text, ignore_abbreviations=False, as_unicode=False,
+             as_array=False):
+    regex = DISPATCH_RE_NO_ABBR if ignore_abbreviations else DISPATCH_RE
+    if as_array:
+        tokens = TokenArray(_tokens(regex, text))
+        return tokens.as_unicode() if as_unicode else tokens
+
+    tokens = list(_tokens(regex, text))
 
     if as_unicode:
         return [t.type for t in tokens]
@@ -102,28 +205,67 @@ def tokenize(text, ignore_abbreviations=False, as_unicode=False):
         return tokens
 
 
-def segment(text_or_tokens, raw=False, classifier=CLASSIFIER):
-    tokens = tokenize(text_or_tokens) if raw else text_or_tokens
-    n_tokens = len(tokens)
-
-    # Classify tokens for abbreviation and proper noun detection
-    if not classifier:
+def _split_point(text, start=0):
+    """
+    Return the position after the last whitespace character of ``text``,
+    searching no further back than ``start``, or 0 if there is none.
+
+    A carriage return is not a split point since it may start a CRLF.
+    """
+    for i in xrange(len(text) - 1, start - 1, -1):
+        if text[i].isspace() and text[i] != u'\r':
+            return i + 1
+    return 0
+
+
+def iter_tokenize(stream, chunk_size=CHUNK_SIZE,
+                  ignore_abbreviations=False, as_unicode=False):
+    """
+    Generate the tokens of a file-like object that reads unicode text.
+
+    No token extends over whitespace other than a newline, so each chunk is
+    tokenized up to its last whitespace character and the remainder is
+    carried over to the next chunk. Tokens and offsets are the same as
+    ``tokenize(stream.read())``, while memory is bounded by ``chunk_size``
+    plus the longest run of text without whitespace.
+    """
+    regex = DISPATCH_RE_NO_ABBR if ignore_abbreviations else DISPATCH_RE
+    offset, pending = 0, u''
+    while True:
+        chunk = stream.read(chunk_size)
+        text = pending + chunk
+        split = _split_point(text, len(pending)) if chunk else len(text)
+        for t in _tokens(regex, text[:split], offset):
+            yield t.type if as_unicode else t
+        offset, pending = offset + split, text[split:]
+        if not chunk:
+            break
+
+
+def iter_segment(tokens, classifier=CLASSIFIER):
+    """
+    Generate sentences, as lists of tokens, from any iterable of tokens.
+
+    Only one token of lookahead is kept besides the current sentence, so
+    each sentence is yielded as soon as it closes. Unlike ``segment``, the
+    classifier is not trained on the input when none is given.
+    """
+    if classifier is None:
         classifier = TokenClassifier()
-        classifier.train(tokens)
+    observe = getattr(classifier, 'observe', None)
 
-    sentences, cache = [], []
+    cache = []
     closing = False
     stack = SpanishPunctuationStack()
 
-    for i, t in enumerate(tokens):
-        # Always segment on a newline
-        if t.match(punctuation.NEWLINE_RE):  # Newline
+    for _, t, next_token in contexts(tokens):
+        # Always segment on a newline. Tokens without a kind (not from
+        # the tokenizer) are recognised by their type instead
+        kind = t.kind
+        if kind == NEWLINE or kind is None and \
+           t.match(punctuation.NEWLINE_RE):  # Newline
             if cache:
-                if raw:
-                    start, end = cache[0].start, cache[-1].end
-                    sentences.append(text_or_tokens[start:end])
-                else:
-                    sentences.append(cache)
+                yield cache
                 cache = []
                 stack = SpanishPunctuationStack()
                 closing = False
@@ -131,22 +273,22 @@ def segment(text_or_tokens, raw=False, classifier=CLASSIFIER):
 
         stack.feed(t.type)
         cache.append(t)
-
-        # Classify local context
-        current_class = classifier.classify(t)
-        next_token = tokens[i + 1] if i < n_tokens - 1 else EMPTY_TOKEN
-        next_class = classifier.classify(next_token)
+        if observe is not None:
+            observe(t)
 
         # Look for the next sentence segment marker
-        # The candidates are abbreviations and literal markers
+        # The candidates are abbreviations and literal markers. Each
+        # decision is only asked of the classifier when it is needed
         if not closing:
-            if t.type.endswith(u'.') or current_class.is_abbreviation:
+            if t.type.endswith(u'.') or classifier.decide(t, ABBREVIATION):
                 # Segment on this abbreviation
                 # if the the next token is capitalized and not a proper noun
                 if punctuation.is_capitalized(next_token.type) \
-                   and not next_class.is_proper_noun:
+                   and not classifier.decide(next_token, PROPER_NOUN):
                     closing = True
-            elif t.match(punctuation.SEGMENT_RE):
+            elif (kind == PUNCT and t.type[0] in punctuation.SEGMENT_MARKS
+                  if kind is not None
+                  else t.match(punctuation.SEGMENT_RE)):
                 # Segment at this literal segment marker
                 # if punctuation.is_capitalized(next_token):
                 closing = True
@@ -155,37 +297,92 @@ def segment(text_or_tokens, raw=False, classifier=CLASSIFIER):
         # check for any remaining tokens then end the sentence
         if closing or not next_token:
             if not stack.pending() or not next_token:
-                if raw:
-                    start, end = cache[0].start, cache[-1].end
-                    sentences.append(text_or_tokens[start:end])
-                else:
-                    sentences.append(cache)
+                yield cache
                 cache = []
                 stack = SpanishPunctuationStack()
                 closing = False
 
+
+def segment(text_or_tokens, raw=False, classifier=CLASSIFIER):
+    tokens = tokenize(text_or_tokens) if raw else text_or_tokens
+
+    # Classify tokens for abbreviation and proper noun detection
+    if classifier is None:
+        classifier = TokenClassifier()
+        classifier.train(tokens)
+
+    sentences = []
+    for cache in iter_segment(tokens, classifier):
+        if raw:
+            start, end = cache[0].start, cache[-1].end
+            sentences.append(text_or_tokens[start:end])
+        else:
+            sentences.append(cache)
+
     return sentences
 
-if __name__ == '__main__':
-    import corpus.text
-    import corpus.db
+_worker_classifier = None
+
+
+def _init_worker(classifier):
+    global _worker_classifier
+    if isinstance(classifier, basestring):
+        classifier = TokenClassifier(classifier)
+    _worker_classifier = classifier
+
+
+def _segment_worker(text):
+    return segment(text, raw=True, classifier=_worker_classifier)
+
+
+def tokenize_many(texts, workers=1, chunksize=16, ordered=True, **kwargs):
+    """
+    Tokenize many texts with a pool of ``workers`` processes.
+
+    Keyword arguments are passed on to ``tokenize``. Token lists are
+    generated in input order, or as ``(index, tokens)`` pairs as soon as
+    they are ready if ``ordered`` is false. A ``Corpus`` is sent to the
+    workers as slices that they read from their own mapping of its files.
+    """
+    function = partial(tokenize, **kwargs)
+    if isinstance(texts, Corpus):
+        return texts.imap(function, workers=workers, chunksize=chunksize,
+                          ordered=ordered)
+    return parallel.imap(function, texts,
+                         workers=workers, chunksize=chunksize, ordered=ordered)
+
+
+def segment_many(texts, workers=1, chunksize=16, ordered=True,
+                 classifier=CLASSIFIER):
+    """
+    Segment many texts into raw sentences with a pool of ``workers``.
+
+    ``classifier`` is a ``TokenClassifier`` or the file name of a saved
+    one. It is loaded (or inherited by forking) once per worker rather than
+    pickled with every task. Sentences are generated in input order, or as
+    ``(index, sentences)`` pairs as soon as they are ready if ``ordered``
+    is false. A ``Corpus`` is sent to the workers as slices, like in
+    ``tokenize_many``.
+    """
+    if isinstance(texts, Corpus):
+        return texts.imap(_segment_worker, workers=workers,
+                          chunksize=chunksize, ordered=ordered,
+                          initializer=_init_worker, initargs=(classifier,))
+    return parallel.imap(_segment_worker, texts,
+                         workers=workers, chunksize=chunksize, ordered=ordered,
+                         initializer=_init_worker, initargs=(classifier,))
 
-    text = corpus.text.articles(limit=None)
-    #sentences = segment(text, raw=True, classifier=None)
-    #text = corpus.text.books()
+if __name__ == '__main__':
+    import sys
 
     import nltk.data
     segmenter = nltk.data.load('tokenizers/punkt/spanish.pickle')
-    sentences = segmenter.tokenize(text, realign_boundaries=True)
-    sentences = list(set(s for s in sentences if len(s) <= 100 and '\n' not in s))
-    sentences.sort(key=lambda s: len(s))
 
-    for s in sentences:
-        print s
-
-    # db = corpus.db.connect()
-    #     if 'sentences' in db.collection_names():
-    #         db.drop_collection('sentences')
+    sentences = set()
+    for text in Corpus(sys.argv[1]):
+        sentences.update(s for s in segmenter.tokenize(
+            text, realign_boundaries=True) if len(s) <= 100 and '\n' not in s)
+    sentences = sorted(sentences, key=lambda s: len(s))
 
-
-    # db.sentences.ensure_index('tokens')
+    for s in sentences:
+        print s.encode('utf-8')
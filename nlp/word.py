@@ -5,6 +5,8 @@ from nlp.punctuation import PUNCTUATION_RE
 WORD_RE = re.compile(r'\w+(\-\w+)?', re.U)  # Sorry, "Yahoo!"
 NUMBER_RE = re.compile(r'\d*\.?\d+\.?\d*')
 
+CACHE_SIZE = 100000
+
 
 def is_es_word(token):
     if not WORD_RE.match(token):
@@ -21,6 +23,10 @@ LANGUAGE_WORD_LIB = {
 
 
 def is_word(token, language=None, exclude_numbers=True):
+    return _is_word(token, language, exclude_numbers)
+
+
+def _is_word(token, language, exclude_numbers, test_word=None):
     # Match numbers
     if NUMBER_RE.match(token):
         return False if exclude_numbers else True
@@ -30,8 +36,107 @@ def is_word(token, language=None, exclude_numbers=True):
         return False
 
     # Match words by language
-    if language:
+    if test_word:
+        return test_word(token)
+    elif language:
         test_word = LANGUAGE_WORD_LIB[language.upper()]
         return test_word(token)
     else:
         return True if WORD_RE.match(token) else False
+
+
+class WordFilter(object):
+    """
+    Classify tokens as words like ``is_word``, memoizing each type.
+
+    Tokens are unicode types or ``Token`` objects. Since a corpus repeats
+    a few types constantly, most tokens are answered by a dict lookup and
+    the regular expressions only run once per distinct type. The cache is
+    cleared when it holds ``cache_size`` types, which keeps it bounded
+    without the bookkeeping of an LRU cache on every hit; frequent types
+    are back in it right away.
+    """
+    def __init__(self, language=None, exclude_numbers=True,
+                 cache_size=CACHE_SIZE):
+        self.language = language
+        self.exclude_numbers = exclude_numbers
+        self.test_word = LANGUAGE_WORD_LIB.get(language.upper()) \
+            if language else None
+        self.cache_size = cache_size
+        self.cache = {}
+
+    def _classify(self, token):
+        result = _is_word(token, self.language, self.exclude_numbers,
+                          self.test_word)
+        if len(self.cache) >= self.cache_size:
+            self.cache.clear()
+        self.cache[token] = result
+        return result
+
+    def is_word(self, token):
+        if not isinstance(token, basestring):
+            token = token.type
+        try:
+            return self.cache[token]
+        except KeyError:
+            return self._classify(token)
+
+    def mask(self, tokens):
+        """
+        Return a list of booleans, true for the tokens that are words.
+        """
+        cache, classify = self.cache, self._classify
+        mask = []
+        for t in tokens:
+            if not isinstance(t, basestring):
+                t = t.type
+            try:
+                mask.append(cache[t])
+            except KeyError:
+                mask.append(classify(t))
+        return mask
+
+    def filter(self, tokens):
+        """
+        Return the tokens that are words, in order.
+        """
+        cache, classify = self.cache, self._classify
+        words = []
+        for t in tokens:
+            key = t if isinstance(t, basestring) else t.type
+            try:
+                keep = cache[key]
+            except KeyError:
+                keep = classify(key)
+            if keep:
+                words.append(t)
+        return words
+
+
+_filters = {}
+
+
+def word_filter(language=None, exclude_numbers=True):
+    """
+    Return the shared ``WordFilter`` for a language and number policy.
+    """
+    key = (language.upper() if language else None, exclude_numbers)
+    try:
+        return _filters[key]
+    except KeyError:
+        f = _filters[key] = WordFilter(language, exclude_numbers)
+        return f
+
+
+def filter_words(tokens, language=None, exclude_numbers=True):
+    """
+    Return the tokens that are words, as ``is_word`` would decide.
+    """
+    return word_filter(language, exclude_numbers).filter(tokens)
+
+
+def word_mask(tokens, language=None, exclude_numbers=True):
+    """
+    Return a list of booleans, true where ``is_word`` would be.
+    """
+    return word_filter(language, exclude_numbers).mask(tokens)
@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+from __future__ import division
+
+import os
+import shutil
+import tempfile
+import unittest
+from collections import Counter
+
+from nlp.punctuation import find_abbreviations
+from nlp.statistics.abbreviations import AbbreviationMiner, read_files
+from nlp.statistics.vocabulary import Vocabulary
+from nlp.tokenizers import es
+
+TEXTS = [
+    u'El Sr. Pérez llegó ayer.\nLa Sra. López y el Sr. García no.',
+    u'Lo dijo el Dr. Ruiz en la pág. 3.',
+    u'Vive en la Av. de Mayo, cerca del Sr. Gómez',
+]
+
+
+def reference(texts, n=100):
+    tokens = es.tokenize(u'\n'.join(texts), ignore_abbreviations=True,
+                         as_unicode=True)
+    fd, fd_abbr, fd_n_abbr = Counter(), Counter(), Counter()
+    for i, t in enumerate(tokens):
+        fd[t] += 1
+        if i < len(tokens) - 1 and tokens[i + 1] == u'.':
+            fd_abbr[t] += 1
+        else:
+            fd_n_abbr[t] += 1
+
+    f_avg = len(fd) / len(tokens)
+    adjusted = {}
+    for t, n_abbr in fd_abbr.items():
+        f = fd[t] / len(tokens)
+        adjusted[t] = n_abbr * (1 + (f - f_avg)) / \
+            fd_n_abbr.get(t, 1) / len(t)
+    return sorted(adjusted.items(), key=lambda i: i[1], reverse=True)[:n]
+
+
+class TestAbbreviationMiner(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def assertScores(self, found, expected):
+        expected = dict(expected)
+        self.assertEqual(sorted(t for t, _ in found), sorted(expected))
+        for t, score in found:
+            self.assertAlmostEqual(score, expected[t])
+
+    def test_top(self):
+        miner = AbbreviationMiner()
+        for text in TEXTS:
+            miner.feed_text(text)
+        self.assertScores(miner.top(), reference(TEXTS))
+        self.assertEqual(miner.top(1)[0][0], u'Sr')
+        self.assertEqual(miner.abbr_counts[u'Sr'], 3)
+
+    def test_vocabulary(self):
+        vocabulary = Vocabulary()
+        miner = AbbreviationMiner(vocabulary)
+        for text in TEXTS:
+            miner.feed_text(text)
+        self.assertScores(miner.top(), reference(TEXTS))
+        self.assertEqual(miner.abbr_counts[vocabulary[u'Sr']], 3)
+        self.assertScores(find_abbreviations(TEXTS, vocabulary=Vocabulary()),
+                          reference(TEXTS))
+
+    def test_frozen_vocabulary(self):
+        documents = [[u'Sr', u'.', u'Hola']] * 2
+        vocabulary = Vocabulary([u'Sr', u'.', u'Hola']).freeze()
+        miner = AbbreviationMiner(vocabulary)
+        expected = AbbreviationMiner()
+        for document in documents:
+            miner.feed(vocabulary.encode(document))
+            expected.feed(document)
+        self.assertEqual(len(vocabulary), 5)
+        self.assertEqual(miner.top(), expected.top())
+        self.assertEqual(miner.abbr_counts[vocabulary[u'Sr']], 2)
+
+    def test_checkpoint_mapped_vocabulary(self):
+        vocabulary_file = os.path.join(self.directory, 'vocabulary.bin')
+        tokens = es.tokenize(u'\n'.join(TEXTS), ignore_abbreviations=True,
+                             as_unicode=True)
+        Vocabulary(tokens).save(vocabulary_file)
+        vocabulary = Vocabulary.load(vocabulary_file, mmap=True)
+
+        file_name = os.path.join(self.directory, 'miner.pickle')
+        miner = AbbreviationMiner(vocabulary)
+        miner.feed_text(TEXTS[0])
+        miner.save(file_name)
+        miner = AbbreviationMiner.load(file_name)
+        for text in TEXTS[1:]:
+            miner.feed_text(text)
+        self.assertScores(miner.top(), reference(TEXTS))
+        miner.vocabulary.close()
+        vocabulary.close()
+
+    def test_checkpoint(self):
+        file_name = os.path.join(self.directory, 'miner.pickle')
+        miner = AbbreviationMiner()
+        miner.feed_text(TEXTS[0])
+        miner.save(file_name)
+
+        miner = AbbreviationMiner.load(file_name)
+        for text in TEXTS[1:]:
+            miner.feed_text(text)
+        self.assertScores(miner.top(), reference(TEXTS))
+
+    def test_find_abbreviations(self):
+        file_names = []
+        for i, text in enumerate(TEXTS):
+            file_names.append(os.path.join(self.directory, '%d.txt' % i))
+            with open(file_names[-1], 'w') as f:
+                f.write(text.encode('utf-8'))
+        self.assertScores(find_abbreviations(read_files(file_names), n=2),
+                          reference(TEXTS, n=2))
+
+
+if __name__ == '__main__':
+    unittest.main()
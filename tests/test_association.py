@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+import math
+import unittest
+
+from nlp.statistics import collocations
+from nlp.statistics.association import BigramStatistics
+from nlp.statistics import association
+from nlp.statistics.vocabulary import Vocabulary
+
+TOKENS = (u'Nueva York y el perro de Nueva York y el gato de '
+          u'la casa de nueva york').split()
+
+
+class TestAssociation(unittest.TestCase):
+    def test_counts(self):
+        statistics = BigramStatistics.from_tokens(TOKENS)
+        self.assertEqual(statistics.n, len(TOKENS))
+        bigrams = dict(statistics.top(statistics.counts))
+        self.assertEqual(bigrams[(u'nueva', u'york')], 3)
+        self.assertEqual(bigrams[(u'y', u'el')], 2)
+        self.assertEqual(sum(bigrams.values()), len(TOKENS) - 1)
+
+    def test_chance(self):
+        self.assertEqual(sorted(association.collocations(TOKENS)),
+                         sorted(collocations(TOKENS)))
+
+    def test_ids(self):
+        vocabulary = Vocabulary()
+        ids = vocabulary.encode(TOKENS)
+        self.assertEqual(
+            sorted(association.collocations(ids, vocabulary=vocabulary)),
+            sorted(association.collocations(TOKENS)))
+        ranked = association.collocations(ids, measure='likelihood_ratio',
+                                          vocabulary=vocabulary)
+        self.assertEqual(ranked[0][0], (u'nueva', u'york'))
+
+    def test_measures(self):
+        top = association.collocations(TOKENS, measure='pmi', top=1)
+        self.assertEqual(top[0][0], (u'la', u'casa'))
+        self.assertAlmostEqual(top[0][1], math.log(len(TOKENS), 2))
+
+        ranked = association.collocations(TOKENS, measure='likelihood_ratio')
+        self.assertEqual(ranked[0][0], (u'nueva', u'york'))
+        scores = [s for _, s in ranked]
+        self.assertEqual(scores, sorted(scores, reverse=True))
+        self.assertRaises(ValueError, association.collocations, TOKENS,
+                          measure='dice')
+
+    def test_edge_cases(self):
+        self.assertEqual(association.collocations([]), [])
+        self.assertEqual(association.collocations([u'sola']), [])
+
+        ranked = association.collocations(TOKENS, measure='likelihood_ratio')
+        self.assertEqual(
+            association.collocations(TOKENS, measure='likelihood_ratio',
+                                     top=2),
+            ranked[:2])
+        self.assertEqual(
+            association.collocations(TOKENS, min_count=3),
+            [(b, n) for b, n in association.collocations(TOKENS) if n >= 3])
+
+        vocabulary = Vocabulary()
+        ids = vocabulary.encode(TOKENS, as_numpy=True)
+        self.assertEqual(ids.tolist(), list(vocabulary.encode(TOKENS)))
+        self.assertEqual(
+            association.collocations(ids, vocabulary=vocabulary),
+            association.collocations(vocabulary.encode(TOKENS),
+                                     vocabulary=vocabulary))
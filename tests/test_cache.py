@@ -0,0 +1,24 @@
+# -*- coding: utf-8 -*-
+import unittest
+
+from nlp.cache import LRUCache
+
+
+class TestLRUCache(unittest.TestCase):
+    def test_eviction(self):
+        cache = LRUCache(2)
+        cache['a'] = 1
+        cache['b'] = 2
+        self.assertEqual(cache['a'], 1)
+        cache['c'] = 3
+        self.assertFalse('b' in cache)
+        self.assertEqual(sorted(cache.entries), ['a', 'c'])
+        self.assertEqual(len(cache), 2)
+        self.assertEqual(cache.evictions, 1)
+
+    def test_counters(self):
+        cache = LRUCache(1)
+        self.assertEqual(cache.get('a'), None)
+        cache['a'] = 1
+        self.assertEqual(cache.get('a'), 1)
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
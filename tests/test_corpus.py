@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*-
+import os
+import pickle
+import shutil
+import tempfile
+import unittest
+
+from nlp.corpus import Corpus, CorpusWriter, is_corpus
+from nlp.statistics.tokens import TokenClassifier
+from nlp.tokenizers import es
+
+DOCUMENTS = [
+    u'El Sr. García vive en Madrid.',
+    u'',
+    u'¿Dónde está el ñandú? En la pampa.',
+    u'La Dra. López llegó a EE.UU. en 2.013.',
+    u'Fin.',
+]
+
+
+def length(text):
+    return len(text)
+
+
+class TestCorpus(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'corpus')
+        with CorpusWriter(self.path) as writer:
+            for i, document in enumerate(DOCUMENTS):
+                writer.add(document, {'url': u'http://example.com/%d' % i})
+        self.corpus = Corpus(self.path)
+
+    def tearDown(self):
+        self.corpus.close()
+        shutil.rmtree(self.directory)
+
+    def test_read(self):
+        self.assertTrue(is_corpus(self.path))
+        self.assertFalse(is_corpus(self.directory))
+        self.assertEqual(len(self.corpus), len(DOCUMENTS))
+        self.assertEqual(list(self.corpus), DOCUMENTS)
+        self.assertEqual([self.corpus[i] for i in xrange(len(DOCUMENTS))],
+                         DOCUMENTS)
+        self.assertEqual(self.corpus[-1], DOCUMENTS[-1])
+        self.assertEqual(str(self.corpus.raw(2)),
+                         DOCUMENTS[2].encode('utf-8'))
+        self.assertRaises(IndexError, self.corpus.__getitem__, 5)
+        self.assertEqual(str(self.corpus.raw(-1)),
+                         DOCUMENTS[-1].encode('utf-8'))
+        self.assertRaises(IndexError, self.corpus.raw, -6)
+
+    def test_metadata(self):
+        self.assertEqual(self.corpus.metadata(3),
+                         {'url': u'http://example.com/3'})
+        self.assertEqual(self.corpus.metadata(-1),
+                         {'url': u'http://example.com/4'})
+        self.assertEqual([m['url'] for _, m in self.corpus.items()],
+                         [u'http://example.com/%d' % i
+                          for i in xrange(len(DOCUMENTS))])
+
+    def test_slices(self):
+        view = self.corpus[1:4]
+        self.assertEqual(list(view), DOCUMENTS[1:4])
+        self.assertEqual(view[0], DOCUMENTS[1])
+        self.assertEqual(view.metadata(0), {'url': u'http://example.com/1'})
+        self.assertEqual(list(view[1:]), DOCUMENTS[2:4])
+        self.assertEqual(list(self.corpus[4:2]), [])
+        self.assertRaises(ValueError, self.corpus.__getitem__, slice(0, 4, 2))
+
+        shards = [self.corpus.shard(i, 3) for i in xrange(3)]
+        self.assertEqual([len(s) for s in shards], [1, 2, 2])
+        self.assertEqual(sum((list(s) for s in shards), []), DOCUMENTS)
+        self.assertEqual([list(c) for c in self.corpus.chunks(2)],
+                         [DOCUMENTS[0:2], DOCUMENTS[2:4], DOCUMENTS[4:]])
+
+    def test_close_view(self):
+        with self.corpus[1:3] as view:
+            self.assertEqual(view[-1], DOCUMENTS[2])
+        self.corpus.shard(0, 2).close()
+        self.assertEqual(list(self.corpus), DOCUMENTS)
+
+    def test_pickle(self):
+        shard = pickle.loads(pickle.dumps(self.corpus.shard(1, 2)))
+        self.assertEqual(list(shard), DOCUMENTS[2:])
+        self.assertEqual(shard.metadata(0), {'url': u'http://example.com/2'})
+        shard.close()
+
+    def test_empty(self):
+        path = os.path.join(self.directory, 'empty')
+        CorpusWriter(path).close()
+        corpus = Corpus(path)
+        self.assertEqual(len(corpus), 0)
+        self.assertEqual(list(corpus), [])
+
+    def test_imap(self):
+        for workers in (1, 2):
+            self.assertEqual(
+                list(self.corpus.imap(length, workers=workers, chunksize=2)),
+                map(length, DOCUMENTS))
+            self.assertEqual(
+                sorted(self.corpus.imap(length, workers=workers, chunksize=2,
+                                        ordered=False)),
+                list(enumerate(map(length, DOCUMENTS))))
+
+    def test_entry_points(self):
+        for workers in (1, 2):
+            self.assertEqual(
+                list(es.tokenize_many(self.corpus, workers=workers,
+                                      chunksize=2, as_unicode=True)),
+                list(es.tokenize_many(DOCUMENTS, as_unicode=True)))
+            self.assertEqual(
+                list(es.segment_many(self.corpus, workers=workers,
+                                     chunksize=2, classifier=None)),
+                list(es.segment_many(DOCUMENTS, classifier=None)))
+
+        def counts(classifier):
+            return sorted((k, c.count, c.upper_count, c.abbr_count)
+                          for k, c in classifier.classes.iteritems())
+        expected = TokenClassifier()
+        for document in DOCUMENTS:
+            expected.train(es.tokenize(document))
+        for workers in (1, 2):
+            classifier = TokenClassifier()
+            classifier.train_parallel(self.corpus, workers=workers,
+                                      tokenize=es.tokenize, shard_size=2)
+            self.assertEqual(counts(classifier), counts(expected))
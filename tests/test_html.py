@@ -1,7 +1,11 @@
 # -*- coding: utf-8 -*-
+import io
+import threading
 import unittest
 
-from nlp.html import get_text, sanitize
+from nlp.html import (BatchStats, get_text, iter_readable_blocks,
+                      iter_sentences, iter_tokens, sanitize, sanitize_many)
+from nlp.statistics.tokens import NEWLINE
 
 
 TEST_DOCUMENT = u"""
@@ -40,3 +44,122 @@ class TestPunctuation(unittest.TestCase):
         sanitized_html = sanitize(TEST_DOCUMENT)
         text = get_text(sanitized_html)
         self.assertEqual(text, u"Header\n\nText")
+
+    def test_streaming_sanitize(self):
+        html = sanitize(TEST_DOCUMENT, streaming=True)
+        self.assertEqual(html, sanitize(TEST_DOCUMENT))
+
+    def test_streaming_sanitize_scripts_and_styles(self):
+        # html5lib keeps script code and escaped styles as text, the
+        # streaming parser drops them
+        html = (u'<html><head><script>var x = 1;</script></head><body>'
+                u'<p>A<script>alert(1)</script>B</p>'
+                u'<style>p { color: red }</style><p>C</p></body></html>')
+        self.assertEqual(sanitize(html), (
+            u'<p>var x = 1;</p>\n\n<p>Aalert(1)B</p>\n\n'
+            u'<p>&lt;style&gt;p { color: red }&lt;/style&gt;</p>\n\n'
+            u'<p>C</p>\n\n'))
+        self.assertEqual(sanitize(html, streaming=True),
+                         u'<p>AB</p>\n\n<p>C</p>\n\n')
+
+    def test_iter_readable_blocks(self):
+        html = u"""
+        <html><head><title>Title</title><script>var p = "<p>";</script>
+        </head><body>
+        <div><p class="lead" onclick="go()">Some <a title="a b">text</a>
+        &amp; more.</p><style>p { color: red }</style>
+        <ul><li>One</li><li>Two</li></ul></div>
+        </body></html>
+        """
+        self.assertEqual(list(iter_readable_blocks(html)), [
+            (u'<p class=lead>Some <a title="a b">text</a>\n'
+             u'        &amp; more.</p>', u'Some text\n        & more.'),
+            (u'<ul><li>One</li><li>Two</li></ul>', u'OneTwo'),
+        ])
+        for chunk_size in (1, 7, 64):
+            self.assertEqual(list(iter_readable_blocks(
+                io.StringIO(html), chunk_size=chunk_size)),
+                list(iter_readable_blocks(html)))
+
+    def test_iter_readable_blocks_incremental(self):
+        stream = io.BytesIO(u'<p>caf\xe9</p>'.encode('utf-8') * 10000)
+        blocks = iter_readable_blocks(stream, chunk_size=1024)
+        self.assertEqual(next(blocks), (u'<p>caf\xe9</p>', u'caf\xe9'))
+        self.assertTrue(stream.tell() < 4096)
+        self.assertEqual(len(list(blocks)), 9999)
+
+    def test_sanitize_many(self):
+        for workers in (1, 2):
+            results = sanitize_many([TEST_DOCUMENT] * 3, workers=workers)
+            self.assertEqual([r.html for r in results],
+                             [sanitize(TEST_DOCUMENT)] * 3)
+
+    def test_sanitize_many_errors(self):
+        pages = [TEST_DOCUMENT, 42, TEST_DOCUMENT]
+        for workers in (1, 2):
+            stats = BatchStats()
+            results = list(sanitize_many(pages, workers=workers,
+                                         streaming=True, stats=stats))
+            self.assertEqual([r.ok for r in results], [True, False, True])
+            self.assertTrue(results[1].error.startswith('TypeError'))
+            self.assertEqual((stats.pages, stats.errors, stats.timeouts),
+                             (3, 1, 0))
+
+    def test_sanitize_many_timeout(self):
+        page = u'<p>Text</p>' * 100000
+        for workers in (1, 2):
+            stats = BatchStats()
+            results = list(sanitize_many(
+                [TEST_DOCUMENT, page, TEST_DOCUMENT], workers=workers,
+                timeout=0.5, streaming=True, stats=stats))
+            self.assertEqual([r.timed_out for r in results],
+                             [False, True, False])
+            self.assertEqual(results[1].html, None)
+            self.assertEqual(results[2].html,
+                             sanitize(TEST_DOCUMENT, streaming=True))
+            self.assertEqual((stats.pages, stats.timeouts, stats.timed_out),
+                             (3, 1, [1]))
+
+    def test_sanitize_many_timeout_in_thread(self):
+        results = []
+        thread = threading.Thread(target=lambda: results.extend(
+            sanitize_many([TEST_DOCUMENT], timeout=5)))
+        thread.start()
+        thread.join()
+        self.assertEqual([r.html for r in results], [sanitize(TEST_DOCUMENT)])
+
+    def test_iter_sentences(self):
+        html = (u'<html><head><title>T\xedtulo</title>'
+                u'<script>var p = "<p>x</p>";</script></head><body>'
+                u'<p>Hola &amp; adi\xf3s. Vive en <b>Nueva</b> York.<br>'
+                u'Otra l\xednea\nsigue aqu\xed</p><p>caf&eacute;</p>')
+        expected = [
+            (u'Hola & adi\xf3s .', u'Hola &amp; adi\xf3s.'),
+            (u'Vive en Nueva York .', u'Vive en <b>Nueva</b> York.'),
+            (u'Otra l\xednea sigue aqu\xed', u'Otra l\xednea\nsigue aqu\xed'),
+            (u'caf\xe9', u'caf&eacute;'),
+        ]
+        for source in (html, html.encode('utf-8')):
+            sentences = [(u' '.join(t.type for t in s),
+                          source[s[0].start:s[-1].end])
+                         for s in iter_sentences(source)]
+            if isinstance(source, str):
+                sentences = [(s, raw.decode('utf-8')) for s, raw in sentences]
+            self.assertEqual(sentences, expected)
+
+    def test_escaped_line_breaks(self):
+        html = u'<p>Usa &lt;br&gt; o &lt;BR&gt; aqu\xed.'
+        tokens = list(iter_tokens(html))
+        self.assertFalse([t for t in tokens if t.kind == NEWLINE])
+        self.assertEqual([(t.type, html[t.start:t.end]) for t in tokens], [
+            (u'Usa', u'Usa'), (u'br', u'br'), (u'o', u'o'), (u'<BR>', u'&lt;BR&gt;'),
+            (u'aqu\xed', u'aqu\xed'), (u'.', u'.')])
+        self.assertEqual(len(list(iter_sentences(html))), 1)
+
+    def test_quoted_attributes(self):
+        html = (u'<p title="a > b" data-x=\'<br>\'>Hola.</p>'
+                u'<p title="sin cerrar>Adi\xf3s.</p>')
+        tokens = list(iter_tokens(html))
+        self.assertEqual([(t.type, html[t.start:t.end]) for t in tokens], [
+            (u'Hola', u'Hola'), (u'.', u'.'), (u'<br>', u'</p>'),
+            (u'Adi\xf3s', u'Adi\xf3s'), (u'.', u'.'), (u'<br>', u'</p>')])
@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+import os
+import threading
+import time
+import unittest
+
+from nlp import parallel
+
+
+def square(x):
+    return x * x
+
+
+def sleep(seconds):
+    time.sleep(seconds)
+    return seconds
+
+
+def exit_on_negative(x):
+    if x < 0:
+        os._exit(3)
+    return x
+
+
+class TestParallel(unittest.TestCase):
+    def test_ordered(self):
+        for workers in (1, 2):
+            results = parallel.imap(square, xrange(20), workers=workers,
+                                    chunksize=3)
+            self.assertEqual(list(results), [x * x for x in xrange(20)])
+
+    def test_unordered(self):
+        for workers in (1, 2):
+            results = parallel.imap(square, xrange(20), workers=workers,
+                                    ordered=False)
+            self.assertEqual(sorted(results),
+                             [(x, x * x) for x in xrange(20)])
+
+
+class TestTimeout(unittest.TestCase):
+    def test_ordered(self):
+        for workers in (1, 2):
+            results = parallel.imap_timeout(square, xrange(20), 5,
+                                            workers=workers)
+            self.assertEqual(list(results), [x * x for x in xrange(20)])
+
+    def test_timeout(self):
+        for workers in (1, 2):
+            results = list(parallel.imap_timeout(
+                sleep, [0, 10, 0, 0], 0.5, workers=workers))
+            self.assertEqual(results[0], 0)
+            self.assertTrue(isinstance(results[1], parallel.WorkerFailure))
+            self.assertTrue(results[1].timed_out)
+            self.assertEqual(results[2:], [0, 0])
+
+    def test_dead_worker(self):
+        results = list(parallel.imap_timeout(exit_on_negative, [1, -1, 2], 5))
+        self.assertEqual(results[0], 1)
+        self.assertFalse(results[1].timed_out)
+        self.assertEqual(results[1].error, 'worker exited with code 3')
+        self.assertEqual(results[2], 2)
+
+    def test_exception(self):
+        results = parallel.imap_timeout(square, [1, None], 5)
+        self.assertEqual(next(results), 1)
+        self.assertRaises(TypeError, next, results)
+
+    def test_thread(self):
+        results = []
+        thread = threading.Thread(target=lambda: results.extend(
+            parallel.imap_timeout(sleep, [0, 10], 0.5)))
+        thread.start()
+        thread.join()
+        self.assertEqual(results[0], 0)
+        self.assertTrue(results[1].timed_out)
@@ -1,7 +1,9 @@
 # -*- coding: utf-8 -*-
 import unittest
+import unicodedata
 
-from nlp.punctuation import collapse
+from nlp import punctuation_table
+from nlp.punctuation import collapse, PUNCTUATION, PUNCTUATION_RE
 
 
 class TestPunctuation(unittest.TestCase):
@@ -23,3 +25,16 @@ class TestPunctuation(unittest.TestCase):
 
         # These should be unchanged
         self.assertEqual(collapse(sub3), sub3)
+
+    def test_table(self):
+        if unicodedata.unidata_version != punctuation_table.UNIDATA_VERSION:
+            self.skipTest('punctuation table needs regenerating')
+        self.assertEqual(punctuation_table.scan(),
+                         punctuation_table.PUNCTUATION_RANGES)
+
+    def test_regex(self):
+        for p in PUNCTUATION:
+            self.assertEqual(PUNCTUATION_RE.match(p).group(0), p)
+        self.assertEqual(PUNCTUATION_RE.match(u'...!').group(0), u'...')
+        for c in (u'a', u'1', u' ', u'\xe9'):
+            self.assertEqual(PUNCTUATION_RE.match(c), None)
@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+import threading
+import time
+import unittest
+
+from nlp import tokenizers
+from nlp.registry import Registry
+
+
+class TestRegistry(unittest.TestCase):
+    def setUp(self):
+        self.loads = []
+        self.registry = Registry('model')
+        self.registry.register(lambda: self.load('es'), 'spanish',
+                               iso2='es', iso3='spa')
+        self.registry.register(lambda: self.load('es-twitter'), 'spanish',
+                               register='twitter')
+        self.registry.register(lambda: self.load('en'), 'english',
+                               iso2='en', iso3='eng')
+
+    def load(self, name):
+        time.sleep(0.01)
+        self.loads.append(name)
+        return name
+
+    def test_get_for_language(self):
+        get = self.registry.get_for_language
+        self.assertEqual(self.loads, [])
+        self.assertEqual(get('Spanish'), 'es')
+        self.assertEqual(get(iso2='es'), 'es')
+        self.assertEqual(get(iso3='spa'), 'es')
+        self.assertEqual(get(iso2='es', register='twitter'), 'es-twitter')
+        self.assertEqual(get(iso2='es', register='headlines'), 'es')
+        self.assertEqual(self.loads, ['es', 'es-twitter'])
+        self.assertEqual(len(self.registry.load_times), 2)
+        self.assertRaises(LookupError, get, iso2='fr')
+
+    def test_threads(self):
+        results = []
+        threads = [threading.Thread(
+            target=lambda: results.append(
+                self.registry.get_for_language(iso2='en')))
+            for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(results, ['en'] * 8)
+        self.assertEqual(self.loads, ['en'])
+
+    def test_preload(self):
+        self.registry.preload('es')
+        self.assertEqual(sorted(self.loads), ['es', 'es-twitter'])
+        self.registry.preload()
+        self.assertEqual(sorted(self.loads), ['en', 'es', 'es-twitter'])
+        self.assertTrue(
+            self.registry.load_times['english', ()] >= 0.01)
+
+    def test_tokenizers(self):
+        from nlp.tokenizers import es
+        self.assertTrue(tokenizers.get_for_language(iso2='es') is es)
+        self.assertTrue(tokenizers.get_for_language(name='spanish') is es)
+
+
+if __name__ == '__main__':
+    unittest.main()
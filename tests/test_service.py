@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+import threading
+import unittest
+
+from nlp.service import (Client, LatencyStats, SegmentationServer,
+                         SegmentationService)
+from nlp.statistics.tokens import TokenClassifier
+from nlp.tokenizers import es
+
+TEXTS = [
+    u'El Sr. P\xe9rez lleg\xf3 ayer. Dijo que volver\xeda pronto.',
+    u'\xbfQui\xe9n es? No lo s\xe9. Vive en Nueva York.',
+    u'Una sola frase sin punto final',
+] * 4
+
+
+def classifier():
+    c = TokenClassifier()
+    c.train(es.tokenize(u'\n'.join(TEXTS)))
+    return c
+
+
+class TestLatencyStats(unittest.TestCase):
+    def test_percentiles(self):
+        stats = LatencyStats(window=100)
+        for i in range(200):
+            stats.record(i / 1000.0)
+        summary = stats.summary()
+        self.assertEqual(summary['count'], 200)
+        self.assertAlmostEqual(summary['p50'], 0.150, places=2)
+        self.assertAlmostEqual(summary['p99'], 0.199, places=2)
+
+
+class TestSegmentationService(unittest.TestCase):
+    def setUp(self):
+        self.classifier = classifier()
+        self.expected = [es.segment(t, raw=True, classifier=self.classifier)
+                         for t in TEXTS]
+
+    def test_concurrent(self):
+        for workers in (1, 2):
+            service = SegmentationService(self.classifier, workers=workers)
+            results = [None] * len(TEXTS)
+
+            def run(i):
+                results[i] = service.segment(TEXTS[i])
+            threads = [threading.Thread(target=run, args=(i,))
+                       for i in range(len(TEXTS))]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+            self.assertEqual(results, self.expected)
+            self.assertEqual(service.segment_many(TEXTS), self.expected)
+            self.assertEqual(service.latency()['count'], 2 * len(TEXTS))
+            self.assertRaises(Exception, service.segment_many,
+                              [TEXTS[0], None])
+            self.assertEqual(service.segment(TEXTS[1]), self.expected[1])
+            service.close()
+
+    def test_empty_classifier(self):
+        # Without a model the service uses an empty classifier rather than
+        # training one on each request
+        text = u'El Sr. L\xf3pez vino. Luego el Sr. L\xf3pez se fue.'
+        expected = es.segment(text, raw=True,
+                              classifier=TokenClassifier().compile())
+        self.assertNotEqual(expected, es.segment(text, raw=True,
+                                                 classifier=None))
+        for workers in (1, 2):
+            service = SegmentationService(workers=workers)
+            self.assertEqual(service.segment(text), expected)
+            service.close()
+
+    def test_server(self):
+        service = SegmentationService(self.classifier)
+        server = SegmentationServer(('127.0.0.1', 0), service)
+        thread = threading.Thread(target=server.serve_forever)
+        thread.daemon = True
+        thread.start()
+        try:
+            client = Client(*server.server_address)
+            self.assertEqual([client.segment(t) for t in TEXTS],
+                             self.expected)
+            self.assertEqual(client.latency()['count'], len(TEXTS))
+            self.assertRaises(RuntimeError, client.segment, None)
+            client.close()
+        finally:
+            server.shutdown()
+            server.server_close()
+            service.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
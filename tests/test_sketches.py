@@ -0,0 +1,167 @@
+# -*- coding: utf-8 -*-
+from __future__ import division
+
+import pickle
+import random
+import unittest
+from collections import Counter
+
+from nlp.statistics.sketches import (AbbreviationCounter, CollocationCounter,
+                                     CountMinSketch, HyperLogLog, SpaceSaving)
+from nlp.statistics.vocabulary import Vocabulary
+
+TOKENS = (u'El Sr . Pérez y el Sr . García viven en Nueva York , '
+          u'y la Sra . López vive en Nueva York .').split()
+
+
+def stream(n=5000, seed=0):
+    r = random.Random(seed)
+    return [u'w%d' % int(r.paretovariate(1.2)) for _ in xrange(n)]
+
+
+class TestCountMinSketch(unittest.TestCase):
+    def test_estimates(self):
+        items = stream()
+        sketch = CountMinSketch(epsilon=0.01, delta=0.01)
+        sketch.update(items)
+        self.assertEqual(sketch.n, len(items))
+        for item, count in Counter(items).items():
+            self.assertTrue(count <= sketch[item] <= count + sketch.error)
+        self.assertEqual(sketch[u'unseen'], 0)
+
+        sketch.add((u'nueva', u'york'), 3)
+        self.assertEqual(sketch[(u'nueva', u'york')], 3)
+
+    def test_merge(self):
+        items = stream()
+        whole, left, right = [CountMinSketch(0.01, 0.01) for _ in range(3)]
+        whole.update(items)
+        left.update(items[:2000])
+        right.update(pickle.loads(pickle.dumps(items[2000:])))
+        right = pickle.loads(pickle.dumps(right, pickle.HIGHEST_PROTOCOL))
+        left.merge(right)
+        self.assertEqual(left.table, whole.table)
+        self.assertEqual(left.n, whole.n)
+        self.assertRaises(ValueError, left.merge, CountMinSketch(0.1, 0.01))
+        self.assertRaises(ValueError, left.merge,
+                          CountMinSketch(0.01, 0.01, seed=1))
+
+    def test_distinct(self):
+        items = stream()
+        sketch = CountMinSketch(epsilon=0.001)
+        sketch.update(items)
+        distinct = len(set(items))
+        self.assertAlmostEqual(sketch.distinct() / distinct, 1, delta=0.1)
+
+
+class TestHyperLogLog(unittest.TestCase):
+    def test_distinct(self):
+        for n in (10, 1000, 50000):
+            estimator = HyperLogLog()
+            estimator.update(u'w%d' % i for i in xrange(n))
+            estimator.update(u'w%d' % i for i in xrange(n))
+            self.assertAlmostEqual(estimator.distinct() / n, 1, delta=0.03)
+
+    def test_merge(self):
+        left, right, whole = HyperLogLog(), HyperLogLog(), HyperLogLog()
+        left.update(xrange(0, 6000))
+        right.update(xrange(4000, 10000))
+        whole.update(xrange(0, 10000))
+        right = pickle.loads(pickle.dumps(right, pickle.HIGHEST_PROTOCOL))
+        left.merge(right)
+        self.assertEqual(left.registers, whole.registers)
+        self.assertRaises(ValueError, left.merge, HyperLogLog(precision=10))
+
+
+class TestSpaceSaving(unittest.TestCase):
+    def test_heavy_hitters(self):
+        items = stream()
+        counts = Counter(items)
+        summary = SpaceSaving(capacity=50)
+        summary.update(items)
+        self.assertEqual(len(summary), 50)
+        self.assertEqual(summary.n, len(items))
+        for item, count in summary.counts.items():
+            self.assertTrue(summary.guaranteed(item) <= counts[item] <= count)
+        for item, count in counts.items():
+            if count > len(items) / 50:
+                self.assertTrue(item in summary)
+        self.assertEqual([i for i, _ in summary.top(5)],
+                         [i for i, _ in counts.most_common(5)])
+
+    def test_exact_below_capacity(self):
+        summary = SpaceSaving(capacity=100)
+        summary.update(TOKENS)
+        self.assertEqual(summary.counts, dict(Counter(TOKENS)))
+        self.assertEqual(summary.minimum, 0)
+
+    def test_merge(self):
+        items = stream()
+        counts = Counter(items)
+        left, right = SpaceSaving(50), SpaceSaving(50)
+        left.update(items[:2500])
+        right.update(items[2500:])
+        left.merge(right)
+        self.assertEqual(len(left), 50)
+        self.assertEqual(left.n, len(items))
+        for item, count in left.counts.items():
+            self.assertTrue(left.guaranteed(item) <= counts[item] <= count)
+        self.assertEqual([i for i, _ in left.top(3)],
+                         [i for i, _ in counts.most_common(3)])
+
+
+class TestCollocationCounter(unittest.TestCase):
+    def test_collocations(self):
+        from nlp.statistics import collocations
+        counter = CollocationCounter(epsilon=0.001, capacity=1000)
+        counter.feed(TOKENS)
+        found = counter.collocations()
+        self.assertTrue(((u'nueva', u'york'), 2) in found)
+        self.assertEqual(sorted(found), sorted(collocations(TOKENS)))
+
+        vocabulary = Vocabulary()
+        counter = CollocationCounter(epsilon=0.001, capacity=1000,
+                                     vocabulary=vocabulary)
+        counter.feed(vocabulary.encode(TOKENS))
+        self.assertEqual(sorted(counter.collocations()), sorted(found))
+
+    def test_merge(self):
+        left, right = CollocationCounter(0.001), CollocationCounter(0.001)
+        left.feed(TOKENS[:14])
+        right.feed(TOKENS[14:])
+        left.merge(right)
+        self.assertEqual(left.unigrams.n, len(TOKENS))
+        self.assertTrue(((u'nueva', u'york'), 2) in left.collocations())
+        self.assertEqual(len(left.collocations(top=2)), 2)
+
+
+class TestAbbreviationCounter(unittest.TestCase):
+    def test_abbreviations(self):
+        counter = AbbreviationCounter(epsilon=0.001, capacity=100)
+        counter.feed(TOKENS)
+        top = counter.top(2)
+        self.assertEqual([t for t, _ in top], [u'Sr', u'Sra'])
+        self.assertEqual(counter.abbreviations[u'Sr'], 2)
+        self.assertEqual(counter.non_abbreviations[u'Sr'], 0)
+        self.assertAlmostEqual(counter.types.distinct(), len(set(TOKENS)),
+                               delta=0.5)
+
+        vocabulary = Vocabulary()
+        counter = AbbreviationCounter(epsilon=0.001, capacity=100,
+                                      vocabulary=vocabulary)
+        counter.feed(vocabulary.encode(TOKENS))
+        self.assertEqual([t for t, _ in counter.top(2)], [u'Sr', u'Sra'])
+        self.assertEqual(counter.abbreviations[vocabulary[u'Sr']], 2)
+
+    def test_types_beyond_sketch_width(self):
+        # A narrow sketch saturates long before a realistic vocabulary
+        items = [u'w%d' % i for i in xrange(20000)]
+        counter = AbbreviationCounter(epsilon=0.01, capacity=100)
+        counter.feed(items)
+        self.assertTrue(counter.tokens.distinct() < 2000)
+        self.assertAlmostEqual(counter.types.distinct() / len(items), 1,
+                               delta=0.03)
+
+
+if __name__ == '__main__':
+    unittest.main()
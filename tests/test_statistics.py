@@ -0,0 +1,44 @@
+# -*- coding: utf-8 -*-
+import unittest
+
+from nlp.statistics import (bigrams, collocations, ngrams, ngram_ids,
+                            trigrams, unpack_ngram)
+from nlp.statistics.vocabulary import Vocabulary
+
+TOKENS = [u'el', u'perro', u'y', u'el', u'gato']
+
+
+class TestNgrams(unittest.TestCase):
+    def test_ngrams(self):
+        self.assertEqual(list(ngrams(TOKENS)), [(t,) for t in TOKENS])
+        self.assertEqual(list(bigrams(TOKENS)), [
+            (u'el', u'perro'), (u'perro', u'y'),
+            (u'y', u'el'), (u'el', u'gato')])
+        self.assertEqual(list(trigrams(t for t in TOKENS)), [
+            (u'el', u'perro', u'y'), (u'perro', u'y', u'el'),
+            (u'y', u'el', u'gato')])
+        self.assertEqual(list(ngrams(TOKENS, n=6)), [])
+
+    def test_ngram_ids(self):
+        vocabulary = {}
+        codes = list(ngram_ids(TOKENS, n=2, vocabulary=vocabulary))
+        self.assertEqual(vocabulary,
+                         {u'el': 0, u'perro': 1, u'y': 2, u'gato': 3})
+        self.assertEqual([unpack_ngram(c, n=2) for c in codes],
+                         [(0, 1), (1, 2), (2, 0), (0, 3)])
+        self.assertEqual(list(ngram_ids([5, 6, 7], n=3, bits=4)),
+                         [5 << 8 | 6 << 4 | 7])
+        self.assertRaises(ValueError, list, ngram_ids([16], bits=4))
+
+        vocabulary = Vocabulary()
+        self.assertEqual(list(ngram_ids(TOKENS, n=2, vocabulary=vocabulary)),
+                         codes)
+        self.assertEqual(vocabulary.types, [u'el', u'perro', u'y', u'gato'])
+
+    def test_collocations(self):
+        tokens = (u'Nueva York y el perro de Nueva York y el gato de '
+                  u'la casa de nueva york').split()
+        vocabulary = Vocabulary()
+        ids = vocabulary.encode(tokens)
+        self.assertEqual(sorted(collocations(ids, vocabulary=vocabulary)),
+                         sorted(collocations(tokens)))
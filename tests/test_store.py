@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+import os
+import shutil
+import tempfile
+import unittest
+
+from nlp.statistics import collocations
+from nlp.statistics.store import FrequencyStore
+
+DOCUMENTS = [
+    u'el sr . pérez vive en nueva york .'.split(),
+    u'la sra . lópez vive en nueva york .'.split(),
+    u'el sr . garcía vive en madrid .'.split(),
+]
+
+
+class TestFrequencyStore(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.file_name = os.path.join(self.directory, 'ngrams.db')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_counts(self):
+        store = FrequencyStore()
+        store.add_documents(DOCUMENTS)
+        self.assertEqual(store.count(u'vive'), 3)
+        self.assertEqual(store.count((u'nueva', u'york')), 2)
+        self.assertEqual(store.count((u'vive', u'en', u'nueva')), 2)
+        self.assertEqual(store.count((u'york', u'.', u'la')), 0)
+        self.assertEqual(store.count(u'unseen'), 0)
+        self.assertEqual(store.total(1), sum(len(d) for d in DOCUMENTS))
+        self.assertEqual(store.total(2), sum(len(d) - 1 for d in DOCUMENTS))
+        self.assertEqual(store.documents, 3)
+
+    def test_incremental(self):
+        store = FrequencyStore(self.file_name)
+        store.add_documents(DOCUMENTS[:2], flush_size=1)
+        store.close()
+
+        store = FrequencyStore(self.file_name)
+        store.add_documents(DOCUMENTS[2:])
+        whole = FrequencyStore()
+        whole.add_documents(DOCUMENTS)
+        for n in (1, 2, 3):
+            self.assertEqual(sorted(store.iter_ngrams(n)),
+                             sorted(whole.iter_ngrams(n)))
+            self.assertEqual(store.total(n), whole.total(n))
+        self.assertEqual(store.documents, 3)
+        store.close()
+
+    def test_prefix(self):
+        store = FrequencyStore()
+        store.add_documents(DOCUMENTS)
+        self.assertEqual(list(store.prefix((u'vive',))),
+                         [((u'vive', u'en'), 3)])
+        self.assertEqual(list(store.prefix((u'vive', u'en'))),
+                         [((u'vive', u'en', u'madrid'), 1),
+                          ((u'vive', u'en', u'nueva'), 2)])
+        self.assertEqual(list(store.prefix((u'en',), n=3)),
+                         [((u'en', u'madrid', u'.'), 1),
+                          ((u'en', u'nueva', u'york'), 2)])
+        self.assertEqual(list(store.prefix((u've',))), [])
+        self.assertEqual(list(store.prefix(u'vive')),
+                         list(store.prefix((u'vive',))))
+
+    def test_top(self):
+        store = FrequencyStore()
+        store.add_documents(DOCUMENTS)
+        self.assertEqual(store.top(1, k=2), [((u'.',), 6), ((u'vive',), 3)])
+        self.assertEqual(store.top(2, k=1, score=lambda g, c: -c)[0][1], -1)
+
+    def test_collocations(self):
+        store = FrequencyStore()
+        store.add_documents(DOCUMENTS)
+        tokens = [t for d in DOCUMENTS for t in d]
+        expected = [(b, n) for b, n in collocations(tokens)
+                    if b != (u'.', u'la') and b != (u'.', u'el')]
+        self.assertEqual(sorted(store.collocations()), sorted(expected))
+        self.assertEqual(len(store.collocations(top=2)), 2)
+        self.assertEqual(store.collocations(top=2),
+                         store.collocations()[:2])
+        self.assertEqual(store.collocations(min_count=2),
+                         [(b, n) for b, n in store.collocations() if n >= 2])
+
+    def test_collocations_without_unigrams(self):
+        store = FrequencyStore(orders=(2, 3))
+        self.assertEqual(store.collocations(), [])
+        store.add_documents(DOCUMENTS)
+        self.assertRaises(ValueError, store.collocations)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,9 +1,34 @@
 # -*- coding: utf-8 -*-
+import io
+import random
 import unittest
 
+from nlp import punctuation
 from nlp.encoding import decode
+from nlp.statistics.tokens import (
+    Token, TokenClassifier, WORD, NUMBER, URL, ABBR, PUNCT, NEWLINE, TAG
+)
 from nlp.tokenizers import es
 
+CONFORMANCE_TEXT = decode(
+    "Según EE.UU. el 24% de http://www.bbc.co.uk/mundo/a_b/c.shtml?x=1&y=2 "
+    "y twitter.com... <b>Sr.</b> Uds. Srta. Dr. Prof.vs. etc. BC.DF. mk.\r\n"
+    "¿Qué? ¡Sí! US$38.000 us$3 $5 #12 2.113,5 3M (C-17) McDonald´s Ann's "
+    "DE-LIO x:y e.g. a.b.c _x_ ñandú-Kiosco <br> <BR> \n..")
+CONFORMANCE_ALPHABET = list(decode(
+    "aAbBcCsSuUrRkK0123456789.,:;-_/$#%?=&'´<>¿¡ \n\r\téñ")) + [
+    u'http://', u'www.', u'.com', u'EE.UU.', u'Sr.', u'US$', u'<br>', u'...']
+
+
+def reference_tokens(regex, text):
+    tokens = []
+    for m in regex.finditer(text):
+        if punctuation.NEWLINE_RE.match(m.group(0)):
+            tokens.append((punctuation.BR, m.start(0), m.end(0)))
+        else:
+            tokens.append((m.group(0), m.start(0), m.end(0)))
+    return tokens
+
 
 class TestSpanishTokenizer(unittest.TestCase):
     def test_simple(self):
@@ -49,3 +74,95 @@ class TestSpanishTokenizer(unittest.TestCase):
     def test_compounds_regression(self):
         tokens = es.tokenize(decode("3M y McDonald´s."), as_unicode=True)
         self.assertEqual(len(tokens), 4)
+
+    def test_iter_tokenize(self):
+        text = decode("Según EE.UU. el 24% de http://www.bbc.co.uk/mundo...\r\n"
+                      "¿Qué? ¡Sí! US$38.000 (C-17)\n")
+        tokens = [(t.type, t.start, t.end) for t in es.tokenize(text)]
+        for chunk_size in (1, 2, 3, 5, 8, 13, 1024):
+            stream = io.StringIO(text)
+            streamed = es.iter_tokenize(stream, chunk_size=chunk_size)
+            self.assertEqual([(t.type, t.start, t.end) for t in streamed],
+                             tokens)
+
+    def test_dispatch_conformance(self):
+        rnd = random.Random(0)
+        texts = [CONFORMANCE_TEXT, u' '.join(
+            u'%s a%sb 1%s2 US%s %s.' % ((unichr(c),) * 5)
+            for c in range(0xd800) + range(0xe000, 0x10000))]
+        for _ in range(2000):
+            texts.append(u''.join(rnd.choice(CONFORMANCE_ALPHABET)
+                                  for _ in range(rnd.randint(1, 20))))
+
+        for ignore_abbreviations, regex in ((False, es.TOKEN_RE),
+                                            (True, es.TOKEN_RE_NO_ABBR)):
+            for text in texts:
+                tokens = es.tokenize(
+                    text, ignore_abbreviations=ignore_abbreviations)
+                self.assertEqual([(t.type, t.start, t.end) for t in tokens],
+                                 reference_tokens(regex, text))
+
+    def test_kinds(self):
+        text = decode("¿EE.UU.? US$38 en twitter.com<b>\r\nC-17<br>...")
+        tokens = es.tokenize(text)
+        self.assertEqual([(t.type, t.kind) for t in tokens], [
+            (u'\xbf', PUNCT), (u'EE.UU.', ABBR), (u'?', PUNCT),
+            (u'US$38', NUMBER), (u'en', WORD), (u'twitter.com', URL),
+            (u'<b>', TAG), (u'<br>', NEWLINE), (u'C-17', WORD),
+            (u'<br>', NEWLINE), (u'...', PUNCT)])
+        self.assertEqual([(t.start, t.end) for t in tokens
+                          if t.kind == NEWLINE], [(32, 34), (38, 42)])
+
+        tokens = es.tokenize(text, ignore_abbreviations=True)
+        self.assertEqual([(t.type, t.kind) for t in tokens[1:3]], [
+            (u'EE.UU', URL), (u'.', PUNCT)])
+
+    def test_segment_without_kinds(self):
+        text = decode("El Sr. García llegó ayer... ¿Y el Sr. López?\n"
+                      "No lo sé. ¡Vamos!\r\nAdiós")
+        tokens = es.tokenize(text)
+        plain = [Token(t.type, t.start, t.end) for t in tokens]
+        classifier = TokenClassifier()
+        classifier.train(tokens)
+        spans = lambda sentences: [[(t.type, t.start) for t in s]
+                                   for s in sentences]
+        self.assertEqual(spans(es.segment(tokens, classifier=classifier)),
+                         spans(es.segment(plain, classifier=classifier)))
+
+
+SEGMENTER_TEXT = decode(
+    "Aquí está mí primera frase. Aquí está la segunda.\n"
+    "¿Qué? ¡Qué! Escribo frases muy sencillas. El Sr. García llegó ayer.")
+
+
+class TestSpanishSegmenter(unittest.TestCase):
+    def setUp(self):
+        self.classifier = TokenClassifier()
+        self.classifier.train(es.tokenize(SEGMENTER_TEXT))
+
+    def test_iter_segment(self):
+        text = decode("Aquí está mí primera frase. Aquí está la segunda.\n"
+                      "¿Qué? ¡Qué! Escribo frases muy sencillas.")
+        sentences = es.segment(es.tokenize(text), classifier=self.classifier)
+        streamed = es.iter_segment(iter(es.tokenize(text)),
+                                   classifier=self.classifier)
+        self.assertEqual([[t.type for t in s] for s in streamed],
+                         [[t.type for t in s] for s in sentences])
+        self.assertEqual(len(sentences), 4)
+
+    def test_segment_many(self):
+        texts = map(decode, [
+            "Aquí está mí primera frase. Aquí está la segunda.",
+            "¿Qué? ¿Qué? ¿Qué?",
+            "Aquí está mí\nprimera frase.",
+        ])
+        expected = [es.segment(t, raw=True, classifier=self.classifier)
+                    for t in texts]
+        for workers in (1, 2):
+            sentences = es.segment_many(texts, workers=workers, chunksize=1,
+                                        classifier=self.classifier)
+            self.assertEqual(list(sentences), expected)
+            unordered = es.segment_many(texts, workers=workers, chunksize=2,
+                                        ordered=False,
+                                        classifier=self.classifier)
+            self.assertEqual(sorted(unordered), list(enumerate(expected)))
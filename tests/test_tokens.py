@@ -0,0 +1,243 @@
+# -*- coding: utf-8 -*-
+import os
+import pickle
+import shutil
+import tempfile
+import unittest
+
+from nlp.encoding import decode
+from nlp.statistics.tokens import (
+    Token, TokenArray, TokenClassifier, UNKNOWN_CLASS, ABBREVIATION,
+    PROPER_NOUN, ABBR
+)
+from nlp.tokenizers import es
+
+TEXT = decode("El Sr. García llegó a EE.UU. ayer.\n¿Y el Sr. López? No.")
+
+
+def spans(tokens):
+    return [(t.type, t.start, t.end, t.kind) for t in tokens]
+
+
+class TestTokenArray(unittest.TestCase):
+    def test_tokenize(self):
+        tokens = es.tokenize(TEXT)
+        array = es.tokenize(TEXT, as_array=True)
+        self.assertEqual(len(array), len(tokens))
+        self.assertEqual(spans(array), spans(tokens))
+        self.assertEqual(es.tokenize(TEXT, as_unicode=True, as_array=True),
+                         es.tokenize(TEXT, as_unicode=True))
+
+    def test_pickle(self):
+        token = Token(u'Sr.', 3, 6, ABBR)
+        for protocol in xrange(pickle.HIGHEST_PROTOCOL + 1):
+            loaded = pickle.loads(pickle.dumps(token, protocol))
+            self.assertEqual(spans([loaded]), spans([token]))
+
+    def test_interning(self):
+        array = TokenArray([Token(u'a', 0, 1), Token(u'b', 2, 3),
+                            Token(u'a', 4, 5), Token(u'<br>')])
+        self.assertEqual(array.types, [u'a', u'b', u'<br>'])
+        self.assertEqual(list(array.ids), [0, 1, 0, 2])
+        self.assertEqual(spans([array[-1]]), [(u'<br>', None, None, None)])
+        self.assertRaises(IndexError, lambda: array[4])
+
+    def test_slicing(self):
+        tokens = es.tokenize(TEXT)
+        array = es.tokenize(TEXT, as_array=True)
+        self.assertEqual(spans(array[2:5]), spans(tokens[2:5]))
+        self.assertEqual(spans(array[::-2]), spans(tokens[::-2]))
+        self.assertTrue(array[2:5].types is array.types)
+
+    def test_train_and_segment(self):
+        tokens = es.tokenize(TEXT)
+        array = es.tokenize(TEXT, as_array=True)
+
+        classifier = TokenClassifier()
+        classifier.train(tokens)
+        array_classifier = TokenClassifier()
+        array_classifier.train(array)
+        self.assertEqual(sorted(classifier.classes),
+                         sorted(array_classifier.classes))
+        self.assertEqual(len(classifier), len(array_classifier))
+
+        sentences = es.segment(tokens, classifier=classifier)
+        array_sentences = es.segment(array, classifier=array_classifier)
+        self.assertEqual([spans(s) for s in array_sentences],
+                         [spans(s) for s in sentences])
+
+
+class TestTokenClassifier(unittest.TestCase):
+    def assertSameClasses(self, a, b):
+        def counts(classifier):
+            return sorted((k, c.count, c.upper_count, c.abbr_count,
+                           sorted(c.types))
+                          for k, c in classifier.classes.iteritems())
+        self.assertEqual(counts(a), counts(b))
+        self.assertEqual(len(a), len(b))
+
+    def test_merge(self):
+        documents = [es.tokenize(line) for line in TEXT.split(u'\n')]
+        sequential = TokenClassifier()
+        for tokens in documents:
+            sequential.train(tokens)
+
+        merged = TokenClassifier()
+        for tokens in documents:
+            shard = TokenClassifier()
+            shard.train(tokens)
+            merged.merge(shard)
+        self.assertSameClasses(merged, sequential)
+
+    def test_compile(self):
+        classifier = TokenClassifier()
+        classifier.train(es.tokenize(TEXT * 3))
+        compiled = classifier.compile()
+        for key, c in classifier.classes.items():
+            token = Token(key)
+            self.assertEqual(compiled.decide(token), c.decisions)
+            self.assertEqual(compiled.capitalize(token), c.capitalized)
+        self.assertEqual(compiled.decide(Token(u'desconocido')), 0)
+        self.assertFalse(u'desconocido' in compiled.decisions)
+
+        tokens = es.tokenize(TEXT)
+        self.assertEqual(
+            [spans(s) for s in es.segment(tokens, classifier=compiled)],
+            [spans(s) for s in es.segment(tokens, classifier=classifier)])
+
+    def test_decide_flags(self):
+        classifier = TokenClassifier()
+        classifier.train(es.tokenize(TEXT * 3))
+        compiled = classifier.compile()
+        for key, c in classifier.classes.items():
+            token = Token(key)
+            for flags in (ABBREVIATION, PROPER_NOUN):
+                self.assertEqual(classifier.decide(token, flags),
+                                 c.decisions & flags)
+                self.assertEqual(compiled.decide(token, flags),
+                                 c.decisions & flags)
+
+    def test_empty_compiled_classifier(self):
+        # An empty compiled classifier is falsy, but must still be used
+        # rather than replaced by one trained on the input
+        text = u'El Sr. López vino. Luego el Sr. López se fue.'
+        empty = TokenClassifier().compile()
+        self.assertEqual(len(empty), 0)
+        self.assertEqual(
+            es.segment(text, raw=True, classifier=empty),
+            [u'El Sr.', u'López vino.', u'Luego el Sr.', u'López se fue.'])
+        self.assertEqual(
+            es.segment(text, raw=True),
+            [u'El Sr. López vino.', u'Luego el Sr. López se fue.'])
+
+    def test_read_only(self):
+        classifier = TokenClassifier(read_only=True)
+        classifier.train(es.tokenize(TEXT))
+        n_classes = len(classifier.classes)
+        self.assertTrue(classifier.classify(Token(u'Nuevo')) is UNKNOWN_CLASS)
+        self.assertEqual(classifier.decide(Token(u'Nuevo')), 0)
+        self.assertEqual(classifier.classify(Token(u'sr.')).count, 2)
+        self.assertEqual(len(classifier.classes), n_classes)
+        self.assertRaises(TypeError, UNKNOWN_CLASS.record, Token(u'a'))
+
+    def test_unknown_cache(self):
+        classifier = TokenClassifier(read_only=True, unknown_cache_size=2)
+        self.assertTrue(classifier.classify(Token(u'Ana')) is UNKNOWN_CLASS)
+        for word in (u'Ana', u'Ana', u'Beto', u'Carla'):
+            classifier.observe(Token(word))
+        c = classifier.classify(Token(u'Carla'))
+        self.assertEqual(classifier.classes, {})
+        self.assertEqual(c.count, 1)
+        self.assertEqual(sorted(classifier.unknown.entries),
+                         [u'beto', u'carla'])
+        self.assertEqual(classifier.unknown.evictions, 1)
+
+        classifier.observe(Token(u'Carla'))
+        c = classifier.classify(Token(u'Carla'))
+        self.assertTrue(classifier.classify(Token(u'carla')) is c)
+        self.assertEqual((c.count, c.upper_count), (2, 2))
+        self.assertTrue(c.is_proper_noun)
+
+    def test_unknown_cache_segment(self):
+        # Tokens are looked up more than once around abbreviations, but
+        # each occurrence is recorded once
+        text = u'Lo dijo el Sr. Ruiz ayer. Hoy no.'
+        classifier = TokenClassifier(read_only=True, unknown_cache_size=100)
+        es.segment(text, raw=True, classifier=classifier)
+        counts = dict((key, c.count)
+                      for key, c in classifier.unknown.entries.iteritems())
+        self.assertEqual((counts[u'ruiz'], counts[u'hoy'], counts[u'.']),
+                         (1, 1, 2))
+        self.assertEqual(sum(counts.values()), len(es.tokenize(text)))
+
+    def test_train_parallel(self):
+        texts = TEXT.split(u'\n') * 5
+        sequential = TokenClassifier()
+        for text in texts:
+            sequential.train(es.tokenize(text))
+
+        for workers in (1, 2):
+            classifier = TokenClassifier()
+            classifier.train_parallel(texts, workers=workers,
+                                      tokenize=es.tokenize, shard_size=3)
+            self.assertSameClasses(classifier, sequential)
+
+
+class TestBinaryModel(unittest.TestCase):
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.classifier = TokenClassifier()
+        self.classifier.train(es.tokenize(TEXT * 3))
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def test_round_trip(self):
+        file_name = os.path.join(self.path, 'model.bin')
+        self.classifier.save(file_name, binary=True)
+        loaded = TokenClassifier(file_name)
+
+        self.assertEqual(sorted(loaded.classes), sorted(self.classifier.classes))
+        self.assertEqual(len(loaded), len(self.classifier))
+        for key, c in self.classifier.classes.iteritems():
+            mapped = loaded.classes[key]
+            self.assertEqual((mapped.count, mapped.upper_count,
+                              mapped.abbr_count, mapped.types),
+                             (c.count, c.upper_count, c.abbr_count, c.types))
+            self.assertEqual(bool(mapped.is_abbreviation),
+                             bool(c.is_abbreviation))
+            self.assertEqual(mapped.is_proper_noun, c.is_proper_noun)
+
+    def test_decide(self):
+        file_name = os.path.join(self.path, 'model.bin')
+        self.classifier.save(file_name, binary=True)
+        loaded = TokenClassifier(file_name)
+
+        for key, c in self.classifier.classes.iteritems():
+            self.assertEqual(loaded.classes.decide(key), c.decisions)
+            self.assertEqual(loaded.decide(Token(key.upper())), c.decisions)
+        self.assertEqual(loaded.classes.decide(u'desconocido'), None)
+        self.assertEqual(loaded.decide(Token(u'Desconocido')), 0)
+        self.assertEqual(loaded.classes.decide(u'desconocido'), None)
+        self.assertEqual(loaded.classes[u'desconocido'].count, 1)
+
+    def test_classify_and_train(self):
+        file_name = os.path.join(self.path, 'model.bin')
+        self.classifier.save(file_name, binary=True)
+        loaded = TokenClassifier(file_name)
+
+        self.assertEqual(loaded.classify(Token(u'sr.')).count,
+                         self.classifier.classes[u'sr.'].count)
+        unknown = loaded.classify(Token(u'Desconocido'))
+        self.assertEqual(unknown.count, 1)
+        self.assertTrue(loaded.classify(Token(u'desconocido')) is unknown)
+
+        loaded.train(es.tokenize(TEXT))
+        self.classifier.train(es.tokenize(TEXT))
+        self.assertEqual(loaded.classes[u'sr.'].count,
+                         self.classifier.classes[u'sr.'].count)
+
+        pickled = os.path.join(self.path, 'model.pickle')
+        TokenClassifier(file_name).save(pickled)
+        self.assertEqual(sorted(TokenClassifier(pickled).classes),
+                         sorted(self.classifier.classes))
@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+import os
+import shutil
+import tempfile
+import unittest
+
+from nlp.statistics.tokens import Token
+from nlp.statistics.vocabulary import (CAPITALIZED, UPPER, MappedVocabulary,
+                                       Vocabulary)
+
+TOKENS = (u'El perro de Nueva York y el gato de NUEVA york ¿ ñandú '
+          u'Ñandú').split()
+
+
+class TestVocabulary(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_encode(self):
+        vocabulary = Vocabulary()
+        ids = vocabulary.encode(TOKENS)
+        self.assertEqual(ids.typecode, 'i')
+        self.assertEqual(vocabulary.decode(ids), TOKENS)
+        self.assertEqual(list(ids), [vocabulary[t] for t in TOKENS])
+        self.assertEqual(sorted(set(vocabulary.types)),
+                         sorted(set(TOKENS) | set(t.lower() for t in TOKENS)))
+        self.assertEqual(vocabulary.decode(vocabulary.lower_ids(ids)),
+                         [t.lower() for t in TOKENS])
+        self.assertEqual(vocabulary.encode(TOKENS, lower=True),
+                         vocabulary.lower_ids(ids))
+
+        tokens = [Token(t, i, i + 1) for i, t in enumerate(TOKENS)]
+        self.assertEqual(vocabulary.encode(tokens), ids)
+
+    def test_flags(self):
+        vocabulary = Vocabulary(TOKENS)
+        self.assertTrue(vocabulary.is_capitalized(vocabulary[u'Nueva']))
+        self.assertTrue(vocabulary.is_capitalized(vocabulary[u'\xd1and\xfa']))
+        self.assertFalse(vocabulary.is_capitalized(vocabulary[u'york']))
+        self.assertFalse(vocabulary.is_capitalized(vocabulary[u'\xbf']))
+        self.assertEqual(vocabulary.flags[vocabulary[u'NUEVA']],
+                         CAPITALIZED | UPPER)
+
+    def test_freeze(self):
+        vocabulary = Vocabulary(TOKENS).freeze()
+        size = len(vocabulary)
+        self.assertEqual(vocabulary.add(u'perro'), vocabulary[u'perro'])
+        self.assertRaises(KeyError, vocabulary.add, u'gata')
+        self.assertRaises(KeyError, vocabulary.encode, [u'gata'])
+        self.assertEqual(list(vocabulary.encode([u'gata', u'perro'],
+                                                unknown=-1)),
+                         [-1, vocabulary[u'perro']])
+        self.assertEqual(len(vocabulary), size)
+
+    def test_save_and_load(self):
+        vocabulary = Vocabulary(TOKENS)
+        file_name = os.path.join(self.directory, 'vocabulary')
+        vocabulary.save(file_name)
+
+        for mmap in (False, True):
+            loaded = Vocabulary.load(file_name, mmap=mmap)
+            self.assertEqual(list(loaded), vocabulary.types)
+            self.assertEqual(len(loaded), len(vocabulary))
+            self.assertEqual(list(loaded.encode(TOKENS)),
+                             list(vocabulary.encode(TOKENS)))
+            self.assertEqual(list(loaded.lower_ids(range(len(loaded)))),
+                             list(vocabulary.lower))
+            self.assertEqual([loaded.flags[i] for i in range(len(loaded))],
+                             list(vocabulary.flags))
+            self.assertFalse(u'gata' in loaded)
+            self.assertEqual(loaded.get(u'gata'), None)
+        self.assertTrue(isinstance(loaded, MappedVocabulary))
+        self.assertRaises(KeyError, loaded.add, u'gata')
+        loaded.close()
+
+        with open(file_name, 'wb') as f:
+            f.write('not a vocabulary' * 4)
+        self.assertRaises(ValueError, Vocabulary.load, file_name)
+        self.assertRaises(ValueError, Vocabulary.load, file_name, mmap=True)
+
+
+if __name__ == '__main__':
+    unittest.main()
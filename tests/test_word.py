@@ -2,7 +2,8 @@
 import unittest
 
 from nlp.encoding import decode
-from nlp.word import is_word
+from nlp.statistics.tokens import Token
+from nlp.word import WordFilter, filter_words, is_word, word_mask
 from nlp.punctuation import PUNCTUATION_ES
 
 
@@ -23,3 +24,43 @@ class TestWord(unittest.TestCase):
     def test_es_words(self):
         for letter in 'bcdfghijklmnpqrstvwxz':
             self.assertEqual(is_word(letter, language='es'), False)
+
+    def test_unknown_language(self):
+        # Numbers and punctuation are decided before the language is used
+        self.assertEqual(is_word(u'24', 'fr'), False)
+        self.assertEqual(is_word(u'.', 'fr'), False)
+        self.assertRaises(KeyError, is_word, u'bonjour', 'fr')
+        self.assertEqual(word_mask([u'24', u'.'], 'fr'), [False, False])
+
+
+class TestWordFilter(unittest.TestCase):
+    TOKENS = map(decode, ['el', 'socio-politico', '24', '1.23', '¿', 'b',
+                          'a', 'política', '...', 'el', 'b', '24'])
+
+    def test_same_as_is_word(self):
+        for language in (None, 'es', 'ES'):
+            for exclude_numbers in (True, False):
+                expected = [is_word(t, language, exclude_numbers)
+                            for t in self.TOKENS]
+                self.assertEqual(word_mask(self.TOKENS, language,
+                                           exclude_numbers), expected)
+                self.assertEqual(
+                    filter_words(self.TOKENS, language, exclude_numbers),
+                    [t for t, w in zip(self.TOKENS, expected) if w])
+
+    def test_tokens(self):
+        tokens = [Token(t, i, i + len(t)) for i, t in enumerate(self.TOKENS)]
+        words = filter_words(tokens, language='es')
+        self.assertTrue(words[0] is tokens[0])
+        self.assertEqual([t.type for t in words],
+                         filter_words(self.TOKENS, language='es'))
+        self.assertEqual(word_mask(tokens, language='es'),
+                         word_mask(self.TOKENS, language='es'))
+
+    def test_cache_bound(self):
+        f = WordFilter(cache_size=3)
+        self.assertEqual(f.mask(self.TOKENS),
+                         [is_word(t) for t in self.TOKENS])
+        self.assertTrue(len(f.cache) <= 3)
+        self.assertEqual(f.is_word(u'hola'), True)
+        self.assertEqual(f.is_word(Token(u'24')), False)